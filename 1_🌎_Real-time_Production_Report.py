@@ -1,55 +1,75 @@
+from functools import lru_cache
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
-# Load and preprocess the production data
-@st.cache_data
+from capiv.figure_cache import get_figure_cache
+from capiv.memory import ENABLED_KEY, render_memory_panel, start_memory_accounting, track_memory
+from capiv.operators import add_operator_names
+from capiv.pipeline import PRODUCTION_COLUMNS, add_production_rates
+from capiv.sources import production_url
+from capiv.snapshot import snapshot_id
+from capiv.snapshot_store import record_snapshot
+from capiv.timing import render_timing_panel, stage, start_rerun, timed
+from capiv.versions import get_snapshot_versions, newer_version_available, pin_session, repin_session
+
+# Time every stage of this rerun and measure memory when enabled (sidebar panels at the end of the page)
+start_rerun('produccion')
+start_memory_accounting(st.session_state.get(ENABLED_KEY, False))
+
+# Load and preprocess the production data. Not cached by Streamlit: the frame
+# is owned by the published versions (capiv.versions), which free it once no
+# session reads it any more
 def load_and_sort_data(dataset_url):
-    try:
-        df = pd.read_csv(dataset_url, usecols=[
-            'sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua',
-            'tef', 'empresa', 'areayacimiento', 'coordenadax', 'coordenaday',
-            'formprod', 'sub_tipo_recurso', 'tipopozo'
-        ])
-        df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
-        df['gas_rate'] = df['prod_gas'] / df['tef']
-        df['oil_rate'] = df['prod_pet'] / df['tef']
-        df['water_rate'] = df['prod_agua'] / df['tef']
-        df['Np'] = df.groupby('sigla')['prod_pet'].cumsum()
-        df['Gp'] = df.groupby('sigla')['prod_gas'].cumsum()
-        df['Wp'] = df.groupby('sigla')['prod_agua'].cumsum()
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+    with stage('descarga CSV producción'):
+        df = pd.read_csv(dataset_url, usecols=PRODUCTION_COLUMNS)
+    add_production_rates(df)
+    with stage('empresaNEW'):
+        return add_operator_names(df)
 
 # URLs for datasets
-dataset_url = "http://datos.energia.gob.ar/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+dataset_url = production_url()
 
 
 # --- Load the production data (Session State) ---
+# Every session pins one published version of the data (see capiv.versions):
+# it keeps that view on every page until it asks for the new data.
+snapshot_versions = get_snapshot_versions()
+
+
+def load_current_version():
+    with stage('carga producción'):
+        df = load_and_sort_data(dataset_url)
+    with stage('snapshot_id'):
+        snapshot = snapshot_id(df)
+    # Keep the download in the snapshot history (once per snapshot, see capiv.snapshot_store)
+    with stage('historial de snapshots'):
+        record_snapshot(df, 'produccion', snapshot)
+    return snapshot, df
+
+
 if 'df' not in st.session_state:
     with st.spinner("🔄 Sincronizando los últimos datos oficiales de la Secretaría de Energía..."):
         # Guardamos el resultado en el estado de la sesión
-        st.session_state['df'] = load_and_sort_data(dataset_url)
+        try:
+            pin_session(st.session_state, snapshot_versions, load_current_version)
+        except Exception as e:
+            st.error(f"Error loading data: {e}")
+            st.stop()
         st.success("✅ Datos cargados correctamente. La sesión está activa para todas las páginas.")
+elif newer_version_available(st.session_state, snapshot_versions, load_current_version):
+    st.sidebar.info("Hay datos oficiales más recientes.")
+    if st.sidebar.button("Cargar datos nuevos"):
+        repin_session(st.session_state, snapshot_versions)
+        st.rerun()
 
 # Acceso local para esta página
 data_sorted = st.session_state['df']
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
+# Operator names (empresaNEW) are unified at load time with the alias registry (see capiv.operators)
 
 # Sidebar filters
 st.header(f":blue[Reporte de Producción No Convencional]")
@@ -58,6 +78,7 @@ st.sidebar.image(image)
 
 # Filter out rows where TEF is zero for calculating metrics
 data_filtered = data_sorted[(data_sorted['tef'] > 0)]
+track_memory('data_filtered', data_filtered)
 
 # Find the latest date in the dataset
 latest_date = data_filtered['date'].max()
@@ -93,22 +114,6 @@ oil_rate_bpd_rounded = round(oil_rate_bpd, 1)
 
 print(total_gas_rate_rounded,total_oil_rate_rounded,oil_rate_bpd_rounded)
 
-# Group and aggregate data for plotting
-company_summary = data_filtered.groupby(['empresaNEW', 'date']).agg(
-    total_gas_rate=('gas_rate', 'sum'),
-    total_oil_rate=('oil_rate', 'sum')
-).reset_index()
-
-# Determine top 10 companies by total oil production
-top_companies = company_summary.groupby('empresaNEW')['total_oil_rate'].sum().nlargest(10).index
-
-# Aggregate data for top companies and "Others"
-company_summary['empresaNEW'] = company_summary['empresaNEW'].apply(lambda x: x if x in top_companies else 'Otros')
-company_summary_aggregated = company_summary.groupby(['empresaNEW', 'date']).agg(
-    total_gas_rate=('total_gas_rate', 'sum'),
-    total_oil_rate=('total_oil_rate', 'sum')
-).reset_index()
-
 # Count wells per company
 well_count = data_filtered.groupby('empresaNEW')['sigla'].nunique().reset_index()
 well_count.columns = ['empresaNEW', 'well_count']
@@ -119,22 +124,6 @@ top_wells_companies = well_count.nlargest(10, 'well_count')['empresaNEW']
 # Filter well_count to include only top companies
 well_count_top = well_count[well_count['empresaNEW'].isin(top_wells_companies)]
 
-# Determine the starting year for each well
-well_start_year = data_filtered.groupby('sigla')['anio'].min().reset_index()
-well_start_year.columns = ['sigla', 'start_year']
-
-# Merge the start year back to the original data
-data_with_start_year = pd.merge(data_filtered, well_start_year, on='sigla')
-
-# Group data by start year and date for stacked area plots
-yearly_summary = data_with_start_year.groupby(['start_year', 'date']).agg(
-    total_gas_rate=('gas_rate', 'sum'),
-    total_oil_rate=('oil_rate', 'sum')
-).reset_index()
-
-# Filter out rows where cumulative gas and oil production are zero or less
-yearly_summary = yearly_summary[(yearly_summary['total_gas_rate'] > 0) & (yearly_summary['total_oil_rate'] > 0)]
-
 st.write("Fecha de Última Alocación Finalizada y Consolidada*: ", latest_date.date())
 st.caption("*A mediados de cada mes se realiza el cierre oficial \
 de los datos correspondientes al mes anterior. Para garantizar la \
@@ -154,26 +143,131 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
-# Plot gas rate by company
-fig_gas_company = px.area(
-    company_summary_aggregated, 
-    x='date', y='total_gas_rate', color='empresaNEW', 
-    title="Caudal de Gas por Empresa"
-)
-fig_gas_company.update_layout(
-    xaxis_title="Fecha",
-    yaxis_title="Caudal de Gas (km³/d)",
-    legend_title="Empresa",
-    legend=dict(
-        orientation="h",  # Horizontal legend
-        yanchor="top",  # Position the legend at the top
-        y=-0.3,  # Position the legend further above the plot area
-        xanchor="center",  # Center the legend horizontally
-        x=0.5,  # Center the legend horizontally
-        font=dict(size=10)  # Adjust font size to fit space
-    ),
-  
-)
+# Figures are cached per (snapshot, figure, toggles) so that ticking a checkbox
+# or coming back to the page does not rebuild them from the raw data
+figure_cache = get_figure_cache()
+current_snapshot = st.session_state.get('snapshot_id') or snapshot_id(data_sorted)
+
+# Group and aggregate data for plotting (only evaluated when a figure is not cached)
+@lru_cache(maxsize=1)
+@timed('agregado por empresa')
+def get_company_summary_aggregated():
+    company_summary = data_filtered.groupby(['empresaNEW', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index()
+
+    # Determine top 10 companies by total oil production
+    top_companies = company_summary.groupby('empresaNEW')['total_oil_rate'].sum().nlargest(10).index
+
+    # Aggregate data for top companies and "Others"
+    company_summary['empresaNEW'] = company_summary['empresaNEW'].where(
+        company_summary['empresaNEW'].isin(top_companies), 'Otros'
+    )
+    return company_summary.groupby(['empresaNEW', 'date']).agg(
+        total_gas_rate=('total_gas_rate', 'sum'),
+        total_oil_rate=('total_oil_rate', 'sum')
+    ).reset_index()
+
+@lru_cache(maxsize=1)
+@timed('agregado por campaña')
+def get_yearly_summary():
+    # Determine the starting year for each well
+    well_start_year = data_filtered.groupby('sigla')['anio'].min().reset_index()
+    well_start_year.columns = ['sigla', 'start_year']
+
+    # Merge the start year back to the original data
+    data_with_start_year = pd.merge(data_filtered, well_start_year, on='sigla')
+
+    # Group data by start year and date for stacked area plots
+    yearly_summary = data_with_start_year.groupby(['start_year', 'date']).agg(
+        total_gas_rate=('gas_rate', 'sum'),
+        total_oil_rate=('oil_rate', 'sum')
+    ).reset_index()
+
+    # Filter out rows where cumulative gas and oil production are zero or less
+    return yearly_summary[(yearly_summary['total_gas_rate'] > 0) & (yearly_summary['total_oil_rate'] > 0)]
+
+def build_fig_gas_company(log_scale):
+    # Plot gas rate by company
+    fig_gas_company = px.area(
+        get_company_summary_aggregated(), 
+        x='date', y='total_gas_rate', color='empresaNEW', 
+        title="Caudal de Gas por Empresa"
+    )
+    fig_gas_company.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title="Caudal de Gas (km³/d)",
+        legend_title="Empresa",
+        legend=dict(
+            orientation="h",  # Horizontal legend
+            yanchor="top",  # Position the legend at the top
+            y=-0.3,  # Position the legend further above the plot area
+            xanchor="center",  # Center the legend horizontally
+            x=0.5,  # Center the legend horizontally
+            font=dict(size=10)  # Adjust font size to fit space
+        ),
+      
+    )
+
+    # If the checkbox for log scale is selected, update y-axis to log scale
+    if log_scale:
+        fig_gas_company.update_layout(
+            yaxis=dict(type='log',dtick=1)
+        )
+    return fig_gas_company
+
+def build_fig_oil_company(log_scale):
+    # Plot oil rate by company
+    fig_oil_company = px.area(
+        get_company_summary_aggregated(), 
+        x='date', y='total_oil_rate', color='empresaNEW', 
+        title="Caudal de Petróleo por Empresa"
+    )
+    fig_oil_company.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title="Caudal de Petróleo (m³/d)",
+        legend_title="Empresa",
+        legend=dict(
+            orientation="h",  # Horizontal legend
+            yanchor="top",  # Position the legend at the top
+            y=-0.3,  # Position the legend further above the plot area
+            xanchor="center",  # Center the legend horizontally
+            x=0.5,  # Center the legend horizontally
+            font=dict(size=10)  # Adjust font size to fit space
+        )
+    )  
+
+    # If the checkbox for log scale is selected, update y-axis to log scale
+    if log_scale:
+        fig_oil_company.update_layout(
+            yaxis=dict(type='log',dtick=1)
+        )
+    return fig_oil_company
+
+def build_fig_year(column, title, yaxis_title):
+    # Plot for rate by start year
+    fig_year = px.area(
+        get_yearly_summary(), 
+        x='date', y=column, color='start_year', 
+        title=title
+    )
+    fig_year.update_layout(
+        legend_title="Campaña",
+        legend=dict(
+            orientation="h",  # Horizontal legend
+            yanchor="top",  # Position the legend at the top
+            y=-0.3,  # Position the legend further above the plot area
+            xanchor="center",  # Center the legend horizontally
+            x=0.5,  # Center the legend horizontally
+            font=dict(size=10)  # Adjust font size to fit space
+        ),
+        
+        xaxis_title="Fecha",
+        yaxis_title=yaxis_title
+        
+    )
+    return fig_year
 
 # Checkbox for logarithmic scale for gas
 log_scale_gas = st.checkbox('Escala semilog Caudal de Gas')
@@ -181,95 +275,35 @@ st.caption("Nota: Activar la escala semilog facilita la detección rápida \
 de tendencias lineales en los datos, permitiendo identificar patrones de \
 crecimiento exponencial en la producción de manera más efectiva.")
 
-# If the checkbox for log scale is selected, update y-axis to log scale
-if log_scale_gas:
-    fig_gas_company.update_layout(
-        yaxis=dict(type='log',dtick=1)
-    )
-
 # Display the chart with the log scale adjustment (if applicable)
-st.plotly_chart(fig_gas_company)
-
-# Plot oil rate by company
-fig_oil_company = px.area(
-    company_summary_aggregated, 
-    x='date', y='total_oil_rate', color='empresaNEW', 
-    title="Caudal de Petróleo por Empresa"
+fig_gas_company = figure_cache.get_or_build(
+    current_snapshot, 'main.gas_company', lambda: build_fig_gas_company(log_scale_gas),
+    toggles={'log_scale': log_scale_gas}
 )
-fig_oil_company.update_layout(
-    xaxis_title="Fecha",
-    yaxis_title="Caudal de Petróleo (m³/d)",
-    legend_title="Empresa",
-    legend=dict(
-        orientation="h",  # Horizontal legend
-        yanchor="top",  # Position the legend at the top
-        y=-0.3,  # Position the legend further above the plot area
-        xanchor="center",  # Center the legend horizontally
-        x=0.5,  # Center the legend horizontally
-        font=dict(size=10)  # Adjust font size to fit space
-    )
-)  
+st.plotly_chart(fig_gas_company)
 
 # Checkbox for logarithmic scale for oil
 log_scale_oil = st.checkbox('Escala semilog Caudal de Petróleo')
 
-# If the checkbox for log scale is selected, update y-axis to log scale
-if log_scale_oil:
-    fig_oil_company.update_layout(
-        yaxis=dict(type='log',dtick=1)
-    )
-
 # Display the chart with the log scale adjustment (if applicable)
-st.plotly_chart(fig_oil_company)
-
-# Plot for gas rate by start year
-fig_gas_year = px.area(
-    yearly_summary, 
-    x='date', y='total_gas_rate', color='start_year', 
-    title="Caudal de Gas por Campaña"
-)
-fig_gas_year.update_layout(
-    legend_title="Campaña",
-    legend=dict(
-        orientation="h",  # Horizontal legend
-        yanchor="top",  # Position the legend at the top
-        y=-0.3,  # Position the legend further above the plot area
-        xanchor="center",  # Center the legend horizontally
-        x=0.5,  # Center the legend horizontally
-        font=dict(size=10)  # Adjust font size to fit space
-    ),
-    
-    xaxis_title="Fecha",
-    yaxis_title="Caudal de Gas (km³/d)"
-    
+fig_oil_company = figure_cache.get_or_build(
+    current_snapshot, 'main.oil_company', lambda: build_fig_oil_company(log_scale_oil),
+    toggles={'log_scale': log_scale_oil}
 )
+st.plotly_chart(fig_oil_company)
 
-# Plot for oil rate by start year
-fig_oil_year = px.area(
-    yearly_summary, 
-    x='date', y='total_oil_rate', color='start_year', 
-    title="Caudal de Petróleo por Campaña"
+fig_gas_year = figure_cache.get_or_build(
+    current_snapshot, 'main.gas_year',
+    lambda: build_fig_year('total_gas_rate', "Caudal de Gas por Campaña", "Caudal de Gas (km³/d)")
 )
-fig_oil_year.update_layout(
-    legend_title="Campaña",
-    legend=dict(
-        orientation="h",  # Horizontal legend
-        yanchor="top",  # Position the legend at the top
-        y=-0.3,  # Position the legend further above the plot area
-        xanchor="center",  # Center the legend horizontally
-        x=0.5,  # Center the legend horizontally
-        font=dict(size=10)  # Adjust font size to fit space
-    ),
-    
-    xaxis_title="Fecha",
-    yaxis_title="Caudal de Petróleo (m³/d)"
+fig_oil_year = figure_cache.get_or_build(
+    current_snapshot, 'main.oil_year',
+    lambda: build_fig_year('total_oil_rate', "Caudal de Petróleo por Campaña", "Caudal de Petróleo (m³/d)")
 )
 
 # Plot the charts
 st.plotly_chart(fig_gas_year)
 st.plotly_chart(fig_oil_year)
 
-
-
-
-
+render_timing_panel()
+render_memory_panel()
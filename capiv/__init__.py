@@ -0,0 +1 @@
+# Shared helpers for the Capítulo IV dashboards (caching, data pipeline, tooling)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from capiv.quantiles import grouped_quantiles
+
+# Production aggregates served by capiv.api, built by capiv.precompute once per
+# production snapshot and stored with the other artifacts (see capiv.tables):
+# company × month totals, type curves and the KPIs of the last consolidated
+# month.
+
+API_TABLES = 'api_tables'
+
+# Months on production of the type curves
+TYPE_CURVE_MONTHS = 60
+TYPE_CURVE_METRICS = ['oil_rate', 'gas_rate', 'water_rate']
+
+
+def _company_month(df):
+    return df.groupby(['empresaNEW', 'date'], sort=True).agg(
+        pozos=('sigla', 'count'),
+        prod_pet=('prod_pet', 'sum'),
+        prod_gas=('prod_gas', 'sum'),
+        prod_agua=('prod_agua', 'sum'),
+        oil_rate=('oil_rate', 'sum'),
+        gas_rate=('gas_rate', 'sum'),
+        water_rate=('water_rate', 'sum'),
+    ).reset_index()
+
+
+# P10/P50/P90 of the daily rates per fluid type, campaign and month on
+# production (1 = first month with TEF)
+def _type_curves(df):
+    df = df.sort_values(['sigla', 'date'], kind='stable')
+    df = df.assign(
+        campania=df.groupby('sigla')['anio'].transform('min'),
+        mes_produccion=df.groupby('sigla').cumcount() + 1,
+    )
+    df = df[df['mes_produccion'] <= TYPE_CURVE_MONTHS]
+    rates = df[TYPE_CURVE_METRICS].replace([np.inf, -np.inf], np.nan)
+    curves = grouped_quantiles(
+        pd.concat([df[['tipopozo', 'campania', 'mes_produccion']], rates], axis=1),
+        ['tipopozo', 'campania', 'mes_produccion'],
+        TYPE_CURVE_METRICS,
+        quantiles=(0.1, 0.5, 0.9),
+        stats=('count',),
+    )
+    return curves.reset_index()
+
+
+# Totals of the last consolidated month (the month before the latest one, as on page 1)
+def _latest_kpis(df):
+    latest_date = df['date'].max() - relativedelta(months=1)
+    latest = df[df['date'] == latest_date]
+    oil_rate = latest['oil_rate'].sum() / 1000
+    return {
+        'fecha': latest_date.date().isoformat(),
+        'fecha_en_progreso': df['date'].max().date().isoformat(),
+        'caudal_gas_MMm3d': round(latest['gas_rate'].sum() / 1000, 1),
+        'caudal_petroleo_km3d': round(oil_rate, 1),
+        'caudal_petroleo_kbpd': round(oil_rate * 6.28981, 1),
+        'pozos_activos': int(latest['sigla'].nunique()),
+        'empresas_activas': int(latest['empresaNEW'].nunique()),
+    }
+
+
+# {'empresa_mes', 'curvas_tipo', 'kpis'} from the production frame of a snapshot
+def build_api_tables(df):
+    df = df[df['tef'] > 0]
+    return {
+        'empresa_mes': _company_month(df),
+        'curvas_tipo': _type_curves(df),
+        'kpis': _latest_kpis(df),
+    }
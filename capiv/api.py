@@ -0,0 +1,287 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from capiv.aggregates import API_TABLES, TYPE_CURVE_METRICS
+from capiv.precompute import read_status
+from capiv.quantiles import quantile_column
+from capiv.ranking import all_rankings
+from capiv.report import DEFAULT_CACHE_DIR
+from capiv.tables import TABLE_CACHE_ENV, load_artifact
+
+# Read-only JSON API over the precomputed artifacts, for other dashboards.
+#
+#   CAPIV_TABLE_CACHE=/var/cache/capiv python -m capiv.api --port 8767
+#
+# Serves the artifacts capiv.precompute leaves in the cache directory for the
+# last ready snapshot (the previous one while a new snapshot is warming), so
+# consumers never trigger a page rerun:
+#
+#   GET /api/v1/snapshot                          snapshot ids and precompute state
+#   GET /api/v1/kpis                              last consolidated month (page 1)
+#   GET /api/v1/empresa-mes?empresa=&desde=&hasta=  company × month production
+#   GET /api/v1/curvas-tipo?tipopozo=&campania=&metrica=  P10/P50/P90 rate by month on production
+#   GET /api/v1/pozos?empresa=&tipopozo=&campania=  well-master table (one row per sigla)
+#   GET /api/v1/rankings?id=&excluir_outliers=1   rankings of the Ranking page
+#
+# Table endpoints are paginated (page, page_size). Artifacts never change for a
+# snapshot, so the ETag is derived from the snapshot and the request: a
+# matching If-None-Match answers 304 and response bodies are kept in an LRU.
+
+DEFAULT_PORT = 8767
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+RESPONSE_CACHE_SIZE = 256
+
+class APIError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Request handling ---
+
+# Artifacts never change for a snapshot: keep the last ones read from disk
+@lru_cache(maxsize=8)
+def _artifact(name, snapshot):
+    value = load_artifact(name, snapshot)
+    if value is None:
+        raise APIError(404, f"Artefacto {name} no disponible para {snapshot}")
+    return value
+
+
+def _query_value(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def _int_param(query, name, default, minimum=1, maximum=None):
+    text = _query_value(query, name)
+    if text is None:
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise APIError(400, f"{name} debe ser un entero")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise APIError(400, f"{name} fuera de rango")
+    return value
+
+
+# Rows matching the equality filters {query parameter: column}
+def _filter(table, query, filters):
+    mask = np.ones(len(table), dtype=bool)
+    for name, column in filters.items():
+        values = query.get(name)
+        if values:
+            column_values = table[column]
+            if pd.api.types.is_numeric_dtype(column_values):
+                try:
+                    values = [float(v) for v in values]
+                except ValueError:
+                    raise APIError(400, f"{name} debe ser numérico")
+            mask &= column_values.isin(values).to_numpy()
+    return table[mask]
+
+
+def _date_range(table, query, column='date'):
+    for name, keep in (('desde', lambda d, v: d >= v), ('hasta', lambda d, v: d <= v)):
+        text = _query_value(query, name)
+        if text:
+            try:
+                value = pd.Timestamp(text)
+            except ValueError:
+                raise APIError(400, f"{name} debe ser una fecha (AAAA-MM)")
+            table = table[keep(table[column], value)]
+    return table
+
+
+def _records(table):
+    return json.loads(table.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+def _page(table, query):
+    page = _int_param(query, 'page', 1)
+    page_size = _int_param(query, 'page_size', DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+    total = len(table)
+    start = (page - 1) * page_size
+    return {
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'pages': -(-total // page_size),
+        'data': _records(table.iloc[start:start + page_size]),
+    }
+
+
+class ArtifactAPI:
+
+    def __init__(self, cache_dir, cache_size=RESPONSE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        # Artifacts are read through capiv.tables
+        os.environ[TABLE_CACHE_ENV] = cache_dir
+        self.cache_size = cache_size
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self.routes = {
+            '/api/v1/snapshot': self.snapshot,
+            '/api/v1/kpis': self.kpis,
+            '/api/v1/empresa-mes': self.company_month,
+            '/api/v1/curvas-tipo': self.type_curves,
+            '/api/v1/pozos': self.wells,
+            '/api/v1/rankings': self.rankings,
+        }
+
+    # (snapshot, production snapshot, precompute status) served now
+    def served_snapshot(self):
+        status = read_status(self.cache_dir)
+        if status['state'] == 'ready':
+            return status['snapshot'], status['produccion'], status
+        previous = status.get('previous') or {}
+        if previous.get('snapshot') and previous.get('produccion'):
+            return previous['snapshot'], previous['produccion'], status
+        raise APIError(503, "Todavía no hay un snapshot precalculado")
+
+    def snapshot(self, snapshot, production, status, query):
+        return {
+            'snapshot': snapshot,
+            'produccion': production,
+            'estado': status['state'],
+            'precalculo': {'snapshot': status.get('snapshot'), 'done': status.get('done'), 'total': status.get('total')},
+        }
+
+    def kpis(self, snapshot, production, status, query):
+        return {'snapshot': snapshot, **_artifact(API_TABLES, production)['kpis']}
+
+    def company_month(self, snapshot, production, status, query):
+        table = _artifact(API_TABLES, production)['empresa_mes']
+        table = _date_range(_filter(table, query, {'empresa': 'empresaNEW'}), query)
+        return {'snapshot': snapshot, **_page(table, query)}
+
+    def type_curves(self, snapshot, production, status, query):
+        table = _artifact(API_TABLES, production)['curvas_tipo']
+        table = _filter(table, query, {'tipopozo': 'tipopozo', 'campania': 'campania'})
+        metric = _query_value(query, 'metrica')
+        if metric is not None:
+            if metric not in TYPE_CURVE_METRICS:
+                raise APIError(400, f"metrica debe ser una de {', '.join(TYPE_CURVE_METRICS)}")
+            columns = [quantile_column(metric, q) for q in (0.1, 0.5, 0.9)] + [f"{metric}_count"]
+            table = table[['tipopozo', 'campania', 'mes_produccion'] + columns]
+        return {'snapshot': snapshot, **_page(table, query)}
+
+    def wells(self, snapshot, production, status, query):
+        _, df_merged_final, _ = _artifact('frac_report_tables', snapshot)
+        table = _filter(df_merged_final, query, {
+            'empresa': 'empresaNEW', 'tipopozo': 'tipopozoNEW', 'campania': 'start_year', 'sigla': 'sigla',
+        })
+        return {'snapshot': snapshot, **_page(table, query)}
+
+    def rankings(self, snapshot, production, status, query):
+        name = 'rankings-sin_outliers' if _query_value(query, 'excluir_outliers') in ('1', 'true') else 'rankings'
+        rankings = _artifact(name, snapshot)
+        wanted = set(query.get('id', []))
+        data = [
+            {'id': spec['id'], 'titulo': spec['title'], 'filas': _records(rankings[spec['id']])}
+            for spec in all_rankings()
+            if spec['id'] in rankings and (not wanted or spec['id'] in wanted)
+        ]
+        return {'snapshot': snapshot, 'data': data}
+
+    # (status code, body, etag) of a GET; bodies are cached per snapshot and request
+    def get(self, path, query_string, if_none_match=None):
+        route = self.routes.get(path.rstrip('/'))
+        if route is None:
+            return 404, _error_body("Ruta desconocida"), None
+        try:
+            snapshot, production, status = self.served_snapshot()
+            query = parse_qs(query_string)
+            canonical = json.dumps([path, sorted((k, sorted(v)) for k, v in query.items())])
+            etag = '"' + hashlib.sha1(f"{snapshot}|{canonical}".encode('utf-8')).hexdigest()[:24] + '"'
+            # The snapshot endpoint reports the precompute progress, which changes within a snapshot
+            if path.rstrip('/') != '/api/v1/snapshot':
+                if if_none_match and etag in [t.strip() for t in if_none_match.split(',')]:
+                    return 304, b'', etag
+                with self._lock:
+                    body = self._responses.get(etag)
+                    if body is not None:
+                        self._responses.move_to_end(etag)
+                        return 200, body, etag
+            else:
+                etag = None
+
+            body = json.dumps(route(snapshot, production, status, query), ensure_ascii=False).encode('utf-8')
+            if etag:
+                with self._lock:
+                    self._responses[etag] = body
+                    while len(self._responses) > self.cache_size:
+                        self._responses.popitem(last=False)
+            return 200, body, etag
+        except APIError as e:
+            return e.status, _error_body(str(e)), None
+
+
+def _error_body(message):
+    return json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+
+
+class APIHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        code, body, etag = self.server.api.get(parts.path, parts.query, self.headers.get('If-None-Match'))
+        self.send_response(code)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if code != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir):
+        super().__init__(address, APIHandler)
+        self.api = ArtifactAPI(cache_dir)
+
+
+# Serve the API on a background thread
+def serve_api(cache_dir, host='127.0.0.1', port=DEFAULT_PORT):
+    server = APIServer((host, port), cache_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON de sólo lectura sobre los artefactos precalculados")
+    parser.add_argument('--cache-dir', default=os.environ.get(TABLE_CACHE_ENV, DEFAULT_CACHE_DIR))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = APIServer((args.host, args.port), args.cache_dir)
+    print(f"API en http://{args.host}:{server.server_address[1]}/api/v1/snapshot")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from capiv.headless import REPO_ROOT, local_sources, page_errors, page_files, run_page
+from capiv.operators import add_operator_names
+from capiv.pipeline import (
+    PRODUCTION_COLUMNS,
+    add_production_rates,
+    add_quality_columns,
+    build_frac_report_tables,
+    read_frac,
+    update_production_rates,
+)
+from capiv.quantiles import grouped_quantiles
+from capiv.ranking import compute_rankings
+from capiv.stub_server import parse_rate, serve
+from capiv.synthetic import BASE_WELLS, write_dataset
+
+# Headless end-to-end benchmark of the dashboard compute pipeline.
+#
+#   python -m capiv.bench --scales 1 10 100
+#   python -m capiv.bench --scales 1 --pages 1 5 6 8
+#   python -m capiv.bench --scales 1 --pages 1 6 --http --latency 200 --bandwidth 2M
+#
+# For every scale a synthetic dataset is generated (or reused) with
+# capiv.synthetic and each stage of the pipeline is timed: load, derive,
+# update (incremental monthly refresh), merge, aggregate and build figures.
+# With --pages the real page scripts are also run with streamlit's AppTest,
+# reading the synthetic CSVs instead of the official URLs. With --http the
+# pages download them from the local stand-in server (capiv.stub_server)
+# instead, so the download path is measured too.
+# One JSON line per (scale, run) is appended to the results file.
+
+DEFAULT_DATA_DIR = os.path.join(REPO_ROOT, 'bench_data')
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, 'bench_results.jsonl')
+
+
+# Collects wall-clock seconds per named stage
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(time.perf_counter() - start, 4)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _dataset_dir(data_dir, scale):
+    return os.path.join(data_dir, f"x{scale:g}")
+
+
+# Generate the synthetic CSVs for a scale unless they are already on disk
+def ensure_dataset(data_dir, scale, seed=0):
+    out_dir = _dataset_dir(data_dir, scale)
+    production_path = os.path.join(out_dir, 'production.csv')
+    frac_path = os.path.join(out_dir, 'frac.csv')
+    if not (os.path.exists(production_path) and os.path.exists(frac_path)):
+        write_dataset(out_dir, scale=scale, seed=seed)
+    return production_path, frac_path
+
+
+# Time every stage of the shared pipeline on one dataset
+def run_pipeline(production_path, frac_path):
+    timer = StageTimer()
+
+    with timer.stage('load'):
+        data_sorted = pd.read_csv(production_path, usecols=PRODUCTION_COLUMNS)
+        df_frac = read_frac(frac_path)
+
+    with timer.stage('derive'):
+        add_production_rates(data_sorted)
+        add_operator_names(data_sorted)
+        data_filtered = data_sorted[data_sorted['tef'] > 0]
+
+    # Monthly refresh: the latest month applied to the already derived history
+    months = data_sorted['anio'] * 12 + data_sorted['mes']
+    latest = months == months.max()
+    history = add_production_rates(data_sorted.loc[~latest, PRODUCTION_COLUMNS].copy())
+    with timer.stage('update'):
+        update_production_rates(history, data_sorted.loc[latest, PRODUCTION_COLUMNS])
+
+    with timer.stage('merge'):
+        _, df_merged_final, df_merged_VMUT = build_frac_report_tables(data_filtered, df_frac)
+
+    with timer.stage('aggregate'):
+        company_summary = data_filtered.groupby(['empresaNEW', 'date']).agg(
+            total_gas_rate=('gas_rate', 'sum'),
+            total_oil_rate=('oil_rate', 'sum')
+        ).reset_index()
+        rankings = compute_rankings(df_merged_VMUT)
+        peak_quantiles = grouped_quantiles(
+            df_merged_VMUT, ['tipopozoNEW', 'start_year'], ['Qo_peak', 'Qg_peak']
+        ).reset_index()
+        df_quality = add_quality_columns(df_merged_final)
+        quality_by_company = df_quality.groupby(['empresaNEW', 'anio_inicio'])['sin_datos_frac'].mean()
+
+    # Representative figures of the main page, FracData and Data Management
+    with timer.stage('figures'):
+        figures = [
+            px.area(company_summary, x='date', y='total_gas_rate', color='empresaNEW'),
+            px.area(company_summary, x='date', y='total_oil_rate', color='empresaNEW'),
+            go.Figure([
+                go.Scatter(x=table['start_year'], y=table[column], mode='lines+markers')
+                for _, table in peak_quantiles.groupby('tipopozoNEW')
+                for column in ('Qo_peak_max', 'Qo_peak_p50', 'Qo_peak_p10', 'Qo_peak_p90')
+            ]),
+            go.Figure(go.Heatmap(z=quality_by_company.unstack().values)),
+        ]
+        for fig in figures:
+            fig.to_json()
+
+    return {
+        'rows': len(data_sorted),
+        'wells': int(data_sorted['sigla'].nunique()),
+        'frac_rows': len(df_frac),
+        'rankings': len(rankings),
+        'stages': timer.stages,
+        'total': round(sum(timer.stages.values()), 4),
+    }
+
+
+# Run the page scripts headlessly (cold caches) and time each script run.
+# http: None to read the CSVs directly, or {'latency': s, 'bandwidth': bytes/s}
+# to serve them through the local stand-in server
+def run_pages(production_path, frac_path, page_numbers, timeout=900, http=None):
+    import streamlit as st
+
+    if http is None:
+        sources = local_sources(production_path, frac_path)
+    else:
+        sources = serve(production_path, frac_path, **http)
+
+    results = {}
+    with sources:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+        # The main page loads the production data into the session
+        start = time.perf_counter()
+        main = run_page('1', timeout=timeout)
+        results['1'] = {'seconds': round(time.perf_counter() - start, 4), 'errors': page_errors(main)}
+        session_state = {
+            'df': main.session_state['df'],
+            'snapshot_id': main.session_state['snapshot_id'],
+        }
+
+        for number in page_numbers:
+            if number == '1' or number not in page_files():
+                continue
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            start = time.perf_counter()
+            page = run_page(number, dict(session_state, df=session_state['df'].copy()), timeout=timeout)
+            results[number] = {'seconds': round(time.perf_counter() - start, 4), 'errors': page_errors(page)}
+    return results
+
+
+def run(scales, data_dir=DEFAULT_DATA_DIR, results_path=DEFAULT_RESULTS, repeat=1, pages=None, seed=0,
+        http=None):
+    records = []
+    for scale in scales:
+        production_path, frac_path = ensure_dataset(data_dir, scale, seed=seed)
+        for run_index in range(repeat):
+            record = {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'scale': scale,
+                'base_wells': BASE_WELLS,
+                'run': run_index,
+            }
+            record.update(run_pipeline(production_path, frac_path))
+            if pages:
+                record['pages'] = run_pages(production_path, frac_path, pages, http=http)
+                if http is not None:
+                    record['http'] = http
+            records.append(record)
+
+            with open(results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            print(json.dumps(record, ensure_ascii=False))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de los tableros con datos sintéticos")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1], help="múltiplos de la cantidad de pozos actual")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--pages', nargs='*', help="números de página a ejecutar con AppTest (ej: 1 5 6 8)")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--results', default=DEFAULT_RESULTS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--http', action='store_true', help="descargar los CSV desde el servidor local (capiv.stub_server)")
+    parser.add_argument('--latency', type=float, default=0, help="con --http: milisegundos antes de cada respuesta")
+    parser.add_argument('--bandwidth', help="con --http: límite de ancho de banda en bytes/s (ej: 2M)")
+    args = parser.parse_args()
+
+    run(
+        args.scales,
+        data_dir=args.data_dir,
+        results_path=args.results,
+        repeat=args.repeat,
+        pages=args.pages,
+        seed=args.seed,
+        http={'latency': args.latency / 1000, 'bandwidth': parse_rate(args.bandwidth)} if args.http else None,
+    )
+
+
+if __name__ == '__main__':
+    main()
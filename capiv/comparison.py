@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Multi-well comparison (page 4): the selected wells are taken from the
+# production data in one pass and aligned by month on production with a single
+# grouped cumcount, so the cost does not grow with one mask per well and chart.
+# Month 1 is the first month with cumulative gas (Gp != 0), as in the charts.
+
+ALIGNED_METRICS = ['gas_rate', 'oil_rate', 'water_rate', 'Np', 'Gp', 'Wp']
+
+
+# wells × (metric, month) frame: one row per selected well, in selection order
+# (wells without production are all NaN); shorter histories end in NaN
+def align_wells(df, siglas, metrics=ALIGNED_METRICS):
+    siglas = list(dict.fromkeys(siglas))
+    rows = df.loc[df['sigla'].isin(siglas) & (df['Gp'] != 0), ['sigla', 'date'] + list(metrics)]
+    rows = rows.sort_values(['sigla', 'date'], kind='stable')
+    months = (rows.groupby('sigla', sort=False).cumcount() + 1).rename('mes')
+    aligned = rows.set_index(['sigla', months])[list(metrics)].unstack('mes')
+    # Every metric is kept (at least month 1, all NaN) even when no selected
+    # well has production, e.g. injectors
+    last_month = int(months.max()) if len(months) else 1
+    columns = pd.MultiIndex.from_product([list(metrics), range(1, last_month + 1)], names=['metrica', 'mes'])
+    return aligned.reindex(index=pd.Index(siglas, name='sigla'), columns=columns)
+
+
+# --- Well picker ---
+
+# Fluid type by the peak GOR (McCain): gas above this many m3/m3, or without oil
+GOR_GAS_THRESHOLD = 3000
+GOR_WITHOUT_OIL = 100000
+
+PICKER_KEYS = ['Fluido McCain', 'empresaNEW', 'campania']
+
+
+# One row per well: peak gas/oil/water rate, GOR of the peaks, McCain fluid,
+# company and campaign
+def peak_rate_table(df):
+    peaks = df.groupby('sigla')[['gas_rate', 'oil_rate', 'water_rate']].max()
+    peaks['GOR'] = (peaks['gas_rate'] / peaks['oil_rate']).fillna(GOR_WITHOUT_OIL)
+    peaks['Fluido McCain'] = np.where(
+        (peaks['oil_rate'] == 0) | (peaks['GOR'] > GOR_GAS_THRESHOLD), 'Gas', 'Petróleo'
+    )
+    peaks['empresaNEW'] = df.groupby('sigla')['empresaNEW'].first()
+    peaks['campania'] = df['anio'].where(df['tef'] > 0).groupby(df['sigla']).min()
+    return peaks.reset_index()
+
+
+# Peak-rate table indexed by (fluid, company, campaign) for the picker lookups
+def well_picker_index(peaks):
+    return peaks.set_index(PICKER_KEYS).sort_index()
+
+
+# Siglas of a fluid type, optionally of one company and campaign (None = all)
+def picker_siglas(index, fluid, empresa=None, campania=None):
+    key = tuple(slice(None) if value is None else value for value in (fluid, empresa, campania))
+    try:
+        return index.loc[key, 'sigla'].sort_values().tolist()
+    except KeyError:
+        return []
+
+
+# Options of one picker level for a fluid type (and company)
+def picker_options(index, level, fluid, empresa=None):
+    try:
+        rows = index.loc[(fluid, slice(None) if empresa is None else empresa, slice(None)), :]
+    except KeyError:
+        return []
+    return sorted(rows.index.get_level_values(level).dropna().unique())
@@ -0,0 +1,230 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from capiv.tables import TABLE_CACHE_ENV
+from capiv.timing import mark_cache_miss, stage
+
+# Bulk export of the production history of a cohort of wells.
+#
+# A cohort is every well of one or more companies, areas, campaigns (first year
+# with production), fluid types or a list of siglas. The rows are written in
+# chunks of CHUNK_ROWS, so a whole company is never encoded in memory at once:
+# CSV appends each chunk to the file, Parquet writes one row group per chunk and
+# XLSX uses xlsxwriter's constant-memory mode (new sheet every XLSX_MAX_ROWS).
+# Split exports (one file per well or per cohort value) are zipped.
+#
+# Files are kept on disk per (snapshot, selection): in CAPIV_TABLE_CACHE when
+# set (pruned with the other artifacts of old snapshots), otherwise in a temp
+# directory keeping the MAX_EXPORTS most recent ones.
+
+CHUNK_ROWS = 100_000
+XLSX_MAX_ROWS = 1_048_575  # rows per sheet, without the header
+MAX_EXPORTS = 50
+
+# Cohort type shown in the page -> column that defines it
+COHORTS = {
+    'Empresa': 'empresaNEW',
+    'Área': 'areayacimiento',
+    'Campaña': 'campania',
+    'Tipo de pozo': 'tipopozo',
+    'Pozos': 'sigla',
+}
+
+# Exported columns and their names in the file
+EXPORT_COLUMNS = {
+    'sigla': 'Sigla',
+    'empresaNEW': 'Empresa',
+    'areayacimiento': 'Área yacimiento',
+    'formprod': 'Formación',
+    'tipopozo': 'Tipo de Pozo',
+    'date': 'Fecha',
+    'tef': 'TEF',
+    'prod_pet': 'Producción de petróleo (m3)',
+    'prod_gas': 'Producción de gas (km3)',
+    'prod_agua': 'Producción de agua (m3)',
+    'oil_rate': 'Caudal de petróleo (m3/d)',
+    'gas_rate': 'Caudal de gas (km3/d)',
+    'water_rate': 'Caudal de agua (m3/d)',
+    'Np': 'Acumulada de Petróleo (m3)',
+    'Gp': 'Acumulada de Gas (km3)',
+    'Wp': 'Acumulada de Agua (m3)',
+}
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+ZIP_MIME = 'application/zip'
+
+
+# Formats that can be written here (XLSX needs xlsxwriter)
+def available_formats():
+    return [name for name in FORMATS if name != 'XLSX' or importlib.util.find_spec('xlsxwriter')]
+
+
+def export_dir():
+    cache_dir = os.environ.get(TABLE_CACHE_ENV)
+    return cache_dir or os.path.join(tempfile.gettempdir(), 'capiv-exports')
+
+
+# Campaign of every row: first year with production of its well
+def campaigns(df):
+    years = df['anio'].where(df['tef'] > 0)
+    return years.groupby(df['sigla']).transform('min')
+
+
+# Options of a cohort type, sorted
+def cohort_options(df, cohort):
+    column = COHORTS[cohort]
+    values = campaigns(df) if column == 'campania' else df[column]
+    return sorted(pd.unique(values.dropna()))
+
+
+# Row positions of the cohort, ordered by well and date
+def cohort_rows(df, cohort, values):
+    column = COHORTS[cohort]
+    keys = campaigns(df) if column == 'campania' else df[column]
+    positions = np.flatnonzero(keys.isin(list(values)).to_numpy())
+    order = df[['sigla', 'date']].iloc[positions].reset_index(drop=True).sort_values(['sigla', 'date'], kind='stable')
+    return positions[order.index.to_numpy()]
+
+
+def _chunks(df, positions, columns):
+    for start in range(0, len(positions), CHUNK_ROWS):
+        chunk = df.iloc[positions[start:start + CHUNK_ROWS]]
+        yield chunk[columns].rename(columns=EXPORT_COLUMNS)
+
+
+def _write_csv(chunks, path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            # The schema of the first chunk is kept (a later chunk may have an all-null column)
+            table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Written row by row: constant-memory mode only keeps the current row, and
+# to_excel writes column by column
+def _write_xlsx(chunks, path):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+    try:
+        sheet, row = None, XLSX_MAX_ROWS
+        for chunk in chunks:
+            # Missing and infinite values (months without TEF) are left blank
+            chunk = chunk.replace([np.inf, -np.inf], np.nan).astype(object)
+            chunk = chunk.where(chunk.notna(), None)
+            for values in chunk.itertuples(index=False, name=None):
+                if row == XLSX_MAX_ROWS:
+                    sheet = workbook.add_worksheet(f"Datos {len(workbook.worksheets()) + 1}")
+                    sheet.write_row(0, 0, list(chunk.columns))
+                    row = 0
+                row += 1
+                sheet.write_row(row, 0, values)
+    finally:
+        workbook.close()
+
+
+WRITERS = {'CSV': _write_csv, 'Parquet': _write_parquet, 'XLSX': _write_xlsx}
+
+
+def _export_key(snapshot, cohort, values, fmt, split):
+    selection = json.dumps([cohort, sorted(map(str, values)), fmt, split], ensure_ascii=False)
+    return hashlib.sha1(selection.encode('utf-8')).hexdigest()[:16]
+
+
+# File name inside the zip for one well or cohort value
+def _part_name(value, extension):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # campaigns
+    safe = ''.join(c if c.isalnum() or c in '-_.()' else '_' for c in str(value))
+    return f"{safe}.{extension}"
+
+
+def _remove_old_exports(directory):
+    exports = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.startswith('export-')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in exports[MAX_EXPORTS:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# (path, file name, MIME type) of the export of a selection
+def export_target(snapshot, cohort, values, fmt='CSV', split=None, file_name='export'):
+    extension, mime = ('zip', ZIP_MIME) if split else FORMATS[fmt]
+    key = _export_key(snapshot, cohort, values, fmt, split)
+    return os.path.join(export_dir(), f"export-{key}-{snapshot}.{extension}"), f"{file_name}.{extension}", mime
+
+
+# Write the cohort to a file (or a zip of files when split by 'sigla' or by the
+# cohort column) unless it is already on disk for this snapshot; returns
+# (path, file name, MIME type), or None when the cohort has no rows
+def export_cohort(df, snapshot, cohort, values, fmt='CSV', split=None, file_name='export'):
+    path, download_name, mime = export_target(snapshot, cohort, values, fmt, split, file_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with stage(f"exportación {fmt}", cached=True):
+        if os.path.exists(path):
+            os.utime(path)
+            return path, download_name, mime
+
+        mark_cache_miss()
+        positions = cohort_rows(df, cohort, values)
+        if not len(positions):
+            return None
+        columns = [c for c in EXPORT_COLUMNS if c in df.columns]
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        if not split:
+            WRITERS[fmt](_chunks(df, positions, columns), tmp_path)
+        else:
+            part_extension = FORMATS[fmt][0]
+            keys = campaigns(df) if split == 'campania' else df[split]
+            codes, uniques = pd.factorize(keys.to_numpy()[positions], use_na_sentinel=False)
+            # Stable sort by part: every part keeps the well/date order
+            order = np.argsort(codes, kind='stable')
+            bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+            parts_dir = tempfile.mkdtemp(prefix='capiv-export-')
+            try:
+                with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    for value, part in zip(uniques, np.split(positions[order], bounds)):
+                        part_path = os.path.join(parts_dir, _part_name(value, part_extension))
+                        WRITERS[fmt](_chunks(df, part, columns), part_path)
+                        archive.write(part_path, os.path.basename(part_path))
+                        os.remove(part_path)
+            finally:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+
+        os.replace(tmp_path, path)
+        _remove_old_exports(os.path.dirname(path))
+        return path, download_name, mime
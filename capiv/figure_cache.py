@@ -0,0 +1,135 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import streamlit as st
+
+from capiv.tables import load_artifact, store_artifact
+from capiv.timing import mark_cache_miss, stage
+
+# Memory budget for serialized figures shared by all sessions (bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Build a hashable key; params/toggles are dicts so they are normalized to JSON
+def make_key(snapshot_id, figure_id, params=None, toggles=None):
+    return (
+        snapshot_id,
+        figure_id,
+        json.dumps(params or {}, sort_keys=True, default=str),
+        json.dumps(toggles or {}, sort_keys=True, default=str),
+    )
+
+
+# Disk artifact name of a key (the snapshot is added by capiv.tables)
+def _artifact_name(key):
+    return 'figura-' + hashlib.sha1(json.dumps(key[1:]).encode()).hexdigest()[:16]
+
+
+# A builder may return one figure or a list of figures (e.g. all figures of a tab)
+def _serialize(result):
+    if isinstance(result, (list, tuple)):
+        return tuple(fig.to_json() for fig in result)
+    return result.to_json()
+
+
+def _deserialize(payload):
+    if isinstance(payload, tuple):
+        return [pio.from_json(item) for item in payload]
+    return pio.from_json(payload)
+
+
+def _payload_size(payload):
+    if isinstance(payload, tuple):
+        return sum(len(item) for item in payload)
+    return len(payload)
+
+
+# LRU cache of serialized Plotly figures with a memory budget
+class FigureCache:
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        size = _payload_size(payload)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= _payload_size(self._entries.pop(key))
+            # Figures bigger than the whole budget are not worth keeping
+            if size > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _payload_size(evicted)
+
+    # Drop every figure built from a snapshot that is no longer served
+    def drop_snapshot(self, snapshot_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == snapshot_id]:
+                self._bytes -= _payload_size(self._entries.pop(key))
+
+    # Drop the figures of a production snapshot, alone or combined with a frac
+    # snapshot ('<production>+<frac>' ids of the frac pages)
+    def drop_production(self, production_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0].split('+')[0] == production_id]:
+                self._bytes -= _payload_size(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # Return the cached figure(s) for the key, building and storing them on a miss.
+    # With CAPIV_TABLE_CACHE set, figures built by other processes (e.g. the
+    # capiv.precompute worker) are read from disk before building.
+    def get_or_build(self, snapshot_id, figure_id, build, params=None, toggles=None):
+        key = make_key(snapshot_id, figure_id, params, toggles)
+        with stage(f"figura {figure_id}", cached=True):
+            payload = self.get(key)
+            if payload is None:
+                with stage('disco'):
+                    payload = load_artifact(_artifact_name(key), snapshot_id)
+                if payload is None:
+                    mark_cache_miss()
+                    with stage('build'):
+                        result = build()
+                    with stage('plotly to_json'):
+                        payload = _serialize(result)
+                    store_artifact(_artifact_name(key), snapshot_id, payload)
+                self.put(key, payload)
+            with stage('plotly from_json'):
+                return _deserialize(payload)
+
+
+# One cache per server process, shared by every session and page
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
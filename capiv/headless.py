@@ -0,0 +1,95 @@
+import glob
+import os
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Helpers to run the page scripts without a browser (streamlit's AppTest),
+# shared by the benchmark (capiv.bench) and the batch report renderer
+# (capiv.report).
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Element types kept when collecting the outputs of a page run
+HEADING_TYPES = ('title', 'header', 'subheader')
+TEXT_TYPES = ('markdown', 'caption')
+TABLE_TYPES = ('arrow_data_frame', 'arrow_table')
+
+
+# Page scripts by their number prefix: {'1': '.../1_🌎_Real-time_Production_Report.py', ...}
+def page_files():
+    pages = {}
+    for path in glob.glob(os.path.join(REPO_ROOT, '*.py')) + glob.glob(os.path.join(REPO_ROOT, 'pages', '*.py')):
+        number = os.path.basename(path).split('_', 1)[0]
+        if number.isdigit():
+            pages[number] = path
+    return pages
+
+
+# Point every http read_csv of the pages at local files
+@contextmanager
+def local_sources(production_path, frac_path):
+    read_csv = pd.read_csv
+
+    def patched(source, *args, **kwargs):
+        if isinstance(source, str) and source.startswith('http'):
+            source = frac_path if 'fractura' in source else production_path
+        return read_csv(source, *args, **kwargs)
+
+    pd.read_csv = patched
+    try:
+        yield
+    finally:
+        pd.read_csv = read_csv
+
+
+# Run a page script once. `session_state` is set before the run (keyed widgets
+# such as the FracData section radio read their value from it); `widgets` is a
+# list of (label, value) for unkeyed widgets, set one by one with a rerun each.
+def run_page(number, session_state=None, widgets=(), timeout=900):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(page_files()[number], default_timeout=timeout)
+    for key, value in (session_state or {}).items():
+        at.session_state[key] = value
+
+    cwd = os.getcwd()
+    main_module = sys.modules.get('__main__')
+    os.chdir(REPO_ROOT)  # pages open their images with relative paths
+    try:
+        at.run()
+        for label, value in widgets:
+            widget = next(w for w in (*at.main, *at.sidebar) if getattr(w, 'label', None) == label)
+            widget.set_value(value)
+            at.run()
+    finally:
+        os.chdir(cwd)
+        # Running the main page script replaces __main__; pool workers unpickle
+        # their next task from it (python -m capiv.report / capiv.precompute)
+        sys.modules['__main__'] = main_module
+    return at
+
+
+def page_errors(at):
+    return [e.message for e in at.exception]
+
+
+# Headings, text, metrics, tables and figures of a page run, in page order:
+# [('heading', text), ('text', text), ('metric', (label, value)),
+#  ('table', DataFrame), ('figure', plotly JSON)]
+def page_outputs(at):
+    outputs = []
+    for node in at.main:
+        kind = getattr(node, 'type', None)
+        if kind in HEADING_TYPES:
+            outputs.append(('heading', node.value))
+        elif kind in TEXT_TYPES:
+            outputs.append(('text', node.value))
+        elif kind == 'metric':
+            outputs.append(('metric', (node.label, node.value)))
+        elif kind in TABLE_TYPES:
+            outputs.append(('table', node.value))
+        elif kind == 'plotly_chart':
+            outputs.append(('figure', node.proto.figure.spec))
+    return outputs
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Memory accounting: deep size of every session_state entry, of the cached
+# objects (st.cache_data entries and the figure cache), of the intermediate
+# tables of the current rerun, plus the process RSS and peak RSS.
+#
+# Pipeline code marks its intermediates with track_memory(name, df). Measuring
+# a frame with deep=True walks every string, so sizes are only taken while the
+# "Medir memoria" toggle of the sidebar panel is on; otherwise track_memory()
+# returns immediately and nothing is kept alive.
+
+ENABLED_KEY = '_capiv_memory_enabled'
+
+_local = threading.local()
+
+
+def deep_size(obj, _seen=None):
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            deep_size(k, _seen) + deep_size(v, _seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_size(item, _seen) for item in obj)
+    return sys.getsizeof(obj)
+
+
+# Resident set size of this process (bytes), None where /proc is not available
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Peak resident set size of this process (bytes)
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def start_memory_accounting(enabled):
+    _local.enabled = enabled
+    _local.tracked = []
+
+
+def tracking_enabled():
+    return getattr(_local, 'enabled', False)
+
+
+# Record the deep size of an intermediate object of this rerun (no-op unless enabled)
+def track_memory(name, obj):
+    if getattr(_local, 'enabled', False):
+        _local.tracked.append({
+            'name': name,
+            'bytes': deep_size(obj),
+            'rss': current_rss(),
+        })
+    return obj
+
+
+def session_state_sizes(session_state):
+    return sorted(
+        ((str(key), deep_size(value)) for key, value in session_state.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+# Bytes held by every st.cache_data function (pickled entries) and the figure cache
+def cache_sizes():
+    from streamlit.runtime.caching import get_data_cache_stats_provider
+
+    from capiv.figure_cache import get_figure_cache
+
+    sizes = {}
+    for stat in get_data_cache_stats_provider().get_stats():
+        sizes[stat.cache_name] = sizes.get(stat.cache_name, 0) + stat.byte_length
+
+    figure_cache = get_figure_cache()
+    sizes[f"figure_cache ({len(figure_cache)} entradas, máx {figure_cache.max_bytes / 2**20:.0f} MB)"] = (
+        figure_cache.size_bytes
+    )
+    return sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+
+
+def _mb(value):
+    return None if value is None else round(value / 2**20, 2)
+
+
+def _size_table(rows, label):
+    return pd.DataFrame({label: [name for name, _ in rows], 'MB': [_mb(size) for _, size in rows]})
+
+
+# Collapsible sidebar view. Call it at the end of the page.
+def render_memory_panel():
+    import streamlit as st
+
+    tracked = getattr(_local, 'tracked', [])
+    _local.enabled = False
+    _local.tracked = []
+
+    with st.sidebar.expander("🧠 Memoria", expanded=False):
+        st.caption(f"RSS actual: {_mb(current_rss())} MB · pico: {_mb(peak_rss())} MB")
+        enabled = st.toggle("Medir memoria (deep)", key=ENABLED_KEY)
+        if not enabled:
+            st.caption("Activar para medir session_state, cachés y tablas intermedias.")
+            return
+
+        st.markdown("**session_state**")
+        session_rows = session_state_sizes(
+            {k: v for k, v in st.session_state.items() if k != ENABLED_KEY}
+        )
+        st.dataframe(_size_table(session_rows, 'Clave'), use_container_width=True, hide_index=True)
+
+        st.markdown("**Cachés (todas las sesiones)**")
+        st.dataframe(_size_table(cache_sizes(), 'Caché'), use_container_width=True, hide_index=True)
+
+        st.markdown("**Tablas intermedias de esta ejecución**")
+        if tracked:
+            st.dataframe(
+                pd.DataFrame({
+                    'Objeto': [t['name'] for t in tracked],
+                    'MB': [_mb(t['bytes']) for t in tracked],
+                    'RSS MB': [_mb(t['rss']) for t in tracked],
+                }),
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("Sin tablas calculadas en esta ejecución (resultados servidos desde caché).")
@@ -0,0 +1,114 @@
+import argparse
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Operator alias registry: every name an operator reports under -> the name
+# shown in the app (empresaNEW). Applied once when the production data is
+# loaded (page 1, capiv.report, capiv.bench), so company totals are the same on
+# every page.
+#
+#   python -m capiv.operators production.csv   # unmapped near-duplicate names
+
+OPERATOR_ALIASES = {
+    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
+    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
+    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
+    'Vista Oil & Gas Argentina SA': 'VISTA',
+    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
+    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
+    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL',
+    'PLUSPETROL S.A.': 'PLUSPETROL',
+    'PLUSPETROL CUENCA NEUQUINA S.R.L.': 'PLUSPETROL',
+}
+
+# Words ignored when comparing names: legal forms and generic words
+NAME_STOPWORDS = {
+    'SA', 'SAU', 'SRL', 'SL', 'LLC', 'SUCURSAL', 'ARGENTINA', 'DE', 'LA', 'DEL', 'Y', 'AND',
+    'ENERGY', 'ENERGIA', 'OIL', 'GAS', 'EXPLORATION', 'CORPORATION', 'INC',
+}
+
+# Two distinct display names are reported when they share the first significant
+# word or their cleaned names are at least this similar
+SIMILARITY_THRESHOLD = 0.85
+
+
+# Display names (empresaNEW) for a column of reported names. The aliases are
+# resolved on the unique names (O(operators)) and the codes are remapped, so
+# the rows are only touched by factorize and one take.
+def canonical_operators(names, aliases=OPERATOR_ALIASES):
+    codes, uniques = pd.factorize(names)
+    canonical = pd.Index(uniques).map(lambda name: aliases.get(name, name))
+    canonical_codes, canonical_names = pd.factorize(canonical)
+    # -1 (missing name) stays missing
+    remapped = np.where(codes >= 0, canonical_codes[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(remapped, categories=canonical_names), index=names.index, name='empresaNEW'
+    )
+
+
+# Add empresaNEW to the production data. Kept as plain strings: the pages
+# group by it and a categorical would add every unobserved company to them.
+def add_operator_names(df):
+    df['empresaNEW'] = canonical_operators(df['empresa']).astype(object)
+    return df
+
+
+# 'Vista Oil & Gas Argentina SA' -> 'VISTA'
+def clean_operator_name(name):
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().upper()
+    text = re.sub(r'\([^)]*\)', ' ', text)
+    text = text.replace('.', '')  # S.A. -> SA, S.R.L. -> SRL
+    words = [w for w in re.split(r'[^A-Z0-9]+', text) if w and w not in NAME_STOPWORDS]
+    return ' '.join(words)
+
+
+# Reported names that look like the same operator but are shown under different
+# display names: one row per pair, most similar first
+def near_duplicate_operators(names, aliases=OPERATOR_ALIASES, threshold=SIMILARITY_THRESHOLD):
+    reported = pd.Series(pd.unique(pd.Series(names).dropna()))
+    table = pd.DataFrame({
+        'empresa': reported,
+        'empresaNEW': reported.map(lambda name: aliases.get(name, name)),
+        'nombre_limpio': reported.map(clean_operator_name),
+    })
+
+    pairs = []
+    for a, b in combinations(table.itertuples(index=False), 2):
+        if a.empresaNEW == b.empresaNEW or not a.nombre_limpio or not b.nombre_limpio:
+            continue
+        similarity = SequenceMatcher(None, a.nombre_limpio, b.nombre_limpio).ratio()
+        same_first_word = a.nombre_limpio.split()[0] == b.nombre_limpio.split()[0]
+        if same_first_word or similarity >= threshold:
+            pairs.append({
+                'empresa': a.empresa,
+                'empresa_similar': b.empresa,
+                'empresaNEW': a.empresaNEW,
+                'empresaNEW_similar': b.empresaNEW,
+                'similitud': round(similarity, 3),
+            })
+
+    columns = ['empresa', 'empresa_similar', 'empresaNEW', 'empresaNEW_similar', 'similitud']
+    return pd.DataFrame(pairs, columns=columns).sort_values('similitud', ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nombres de operadoras parecidos sin alias en el registro")
+    parser.add_argument('production', help="CSV de producción (ruta o URL)")
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD)
+    args = parser.parse_args()
+
+    names = pd.read_csv(args.production, usecols=['empresa'])['empresa']
+    report = near_duplicate_operators(names, threshold=args.threshold)
+    if report.empty:
+        print("Sin nombres parecidos fuera del registro de alias.")
+    else:
+        print(report.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
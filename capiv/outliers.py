@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from capiv.quantiles import grouped_quantiles, quantile_column
+
+# Robust outlier bounds per group (e.g. campaign x fluid) for many metrics at
+# once.
+#
+# Two vectorized passes over all metrics (see capiv.quantiles): Q1, median and
+# Q3 per group, then the median absolute deviation (MAD) from the group median.
+# A value is an outlier when it falls outside both the Tukey fences
+# (Q1 - 1.5 IQR, Q3 + 1.5 IQR) and the MAD band (median ± 3.5 · 1.4826 MAD),
+# so a zero IQR or MAD in a tight group does not flag every other value.
+# Zero and missing values mean "not reported": they are neither used for the
+# bounds nor flagged. Groups with fewer than MIN_GROUP_SIZE values are not
+# checked.
+
+IQR_FACTOR = 1.5
+MAD_FACTOR = 3.5
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+MIN_GROUP_SIZE = 8
+
+
+# Flag column for a metric, e.g. 'arena_total_tn' -> 'outlier_arena_total_tn'
+def outlier_column(metric):
+    return f"outlier_{metric}"
+
+
+def _reported_values(df, metrics):
+    values = df[metrics].astype(float)
+    return values.where(values > 0)
+
+
+# Row -> group position, in the (sorted) order of grouped_quantiles; -1 when a key is missing
+def _group_codes(df, by):
+    return df.groupby(by, sort=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _per_row(group_values, codes):
+    out = np.full((len(codes), group_values.shape[1]), np.nan)
+    known = codes >= 0
+    out[known] = group_values[codes[known]]
+    return out
+
+
+# Lower/upper bound and number of reported values of every metric per group
+def outlier_bounds(df, by, metrics):
+    by = [by] if isinstance(by, str) else list(by)
+    metrics = list(metrics)
+    values = _reported_values(df, metrics)
+    frame = pd.concat([df[by], values], axis=1)
+
+    quartiles = grouped_quantiles(frame, by, metrics, quantiles=(0.25, 0.5, 0.75), stats=('count',))
+    q1 = quartiles[[quantile_column(m, 0.25) for m in metrics]].to_numpy()
+    median = quartiles[[quantile_column(m, 0.5) for m in metrics]].to_numpy()
+    q3 = quartiles[[quantile_column(m, 0.75) for m in metrics]].to_numpy()
+    counts = quartiles[[f"{m}_count" for m in metrics]].to_numpy()
+
+    # Second pass: median of the absolute deviations from each row's group median
+    deviations = (values - _per_row(median, _group_codes(frame, by))).abs()
+    mad = grouped_quantiles(
+        pd.concat([df[by], deviations], axis=1), by, metrics, quantiles=(0.5,), stats=()
+    )[[quantile_column(m, 0.5) for m in metrics]].to_numpy()
+
+    iqr = q3 - q1
+    lower = np.fmin(q1 - IQR_FACTOR * iqr, median - MAD_FACTOR * MAD_SCALE * mad)
+    upper = np.fmax(q3 + IQR_FACTOR * iqr, median + MAD_FACTOR * MAD_SCALE * mad)
+    checked = counts >= MIN_GROUP_SIZE
+    lower[~checked] = np.nan
+    upper[~checked] = np.nan
+
+    bounds = {}
+    for j, metric in enumerate(metrics):
+        bounds[f"{metric}_lower"] = lower[:, j]
+        bounds[f"{metric}_upper"] = upper[:, j]
+        bounds[f"{metric}_count"] = counts[:, j]
+    return pd.DataFrame(bounds, index=quartiles.index)
+
+
+# Boolean frame aligned with df: one outlier_<metric> column per metric
+def outlier_flags(df, by, metrics):
+    by = [by] if isinstance(by, str) else list(by)
+    metrics = list(metrics)
+    bounds = outlier_bounds(df, by, metrics)
+    codes = _group_codes(df, by)
+
+    values = _reported_values(df, metrics).to_numpy()
+    lower = _per_row(bounds[[f"{m}_lower" for m in metrics]].to_numpy(), codes)
+    upper = _per_row(bounds[[f"{m}_upper" for m in metrics]].to_numpy(), codes)
+    # NaN values or bounds compare False: not flagged
+    flags = (values < lower) | (values > upper)
+
+    return pd.DataFrame(flags, index=df.index, columns=[outlier_column(m) for m in metrics])
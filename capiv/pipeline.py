@@ -0,0 +1,358 @@
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from capiv.memory import track_memory
+from capiv.outliers import outlier_flags
+from capiv.timing import stage
+
+# Shared completion + production pipeline used by the Ranking, FracData Report
+# and Data Management pages. Plain pandas (no Streamlit) so it can also be run
+# headlessly; the pages wrap it with their own caching.
+
+# Columns read from the production CSV
+PRODUCTION_COLUMNS = [
+    'sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua',
+    'tef', 'empresa', 'areayacimiento', 'coordenadax', 'coordenaday',
+    'formprod', 'sub_tipo_recurso', 'tipopozo'
+]
+
+# Critical frac fields for the per-well data quality score
+QUALITY_FIELDS = [
+    'longitud_rama_horizontal_m',
+    'cantidad_fracturas',
+    'arena_total_tn',
+]
+
+# Columns to check for outliers (using 'arena_total_tn' as the total arena)
+columns_to_check = [
+    'longitud_rama_horizontal_m',
+    'cantidad_fracturas',
+    'arena_total_tn',
+]
+
+# Outlier bounds are computed per campaign and fluid (see capiv.outliers)
+OUTLIER_GROUPS = ['start_year', 'tipopozoNEW']
+
+
+# One production row per well and month
+PRODUCTION_KEY = ['sigla', 'anio', 'mes']
+
+# Per-well cumulatives and the monthly volume they add up
+CUMULATIVES = {'Np': 'prod_pet', 'Gp': 'prod_gas', 'Wp': 'prod_agua'}
+
+
+def _add_dates_and_rates(df):
+    with stage('pd.to_datetime'):
+        df['date'] = pd.to_datetime(df['anio'].astype(str) + '-' + df['mes'].astype(str) + '-1')
+    with stage('caudales'):
+        df['gas_rate'] = df['prod_gas'] / df['tef']
+        df['oil_rate'] = df['prod_pet'] / df['tef']
+        df['water_rate'] = df['prod_agua'] / df['tef']
+    return df
+
+
+# Add the date, daily rates and per-well cumulatives (Np/Gp/Wp) to the raw production data
+def add_production_rates(df):
+    _add_dates_and_rates(df)
+    with stage('acumuladas Np/Gp/Wp'):
+        grouped = df.groupby('sigla')
+        for cumulative, volume in CUMULATIVES.items():
+            df[cumulative] = grouped[volume].cumsum()
+    return df
+
+
+# Apply new or revised monthly rows (raw production columns, one row per
+# sigla/anio/mes) to a frame built by add_production_rates. Revised months are
+# overwritten in place, new months are appended, and Np/Gp/Wp are recomputed
+# only for the wells present in `changes`: a monthly refresh groups the changed
+# wells instead of the whole history. Returns the updated frame.
+def update_production_rates(df, changes):
+    changes = _add_dates_and_rates(changes[df.columns.intersection(changes.columns)].copy())
+    if changes.empty:
+        return df
+
+    with stage('acumuladas Np/Gp/Wp (incremental)'):
+        # Rows of the wells that changed
+        affected = df.index[df['sigla'].isin(changes['sigla'].unique())]
+
+        # Revised months: same key as an existing row (only the months present
+        # in `changes` are matched)
+        months = df.loc[affected, 'anio'] * 12 + df.loc[affected, 'mes']
+        candidates = affected[months.isin(changes['anio'] * 12 + changes['mes']).to_numpy()]
+        revised = (
+            df.loc[candidates, PRODUCTION_KEY].reset_index(names='row')
+            .merge(changes[PRODUCTION_KEY].reset_index(names='change'), on=PRODUCTION_KEY)
+        )
+        columns = changes.columns.difference(PRODUCTION_KEY)
+        df.loc[revised['row'].to_numpy(), columns] = changes.loc[revised['change'].to_numpy(), columns].to_numpy()
+
+        # New months go after the existing history, as they would in the CSV
+        added = changes.drop(index=revised['change'])
+        start = df.index.max() + 1 if len(df) else 0
+        added.index = pd.RangeIndex(start, start + len(added))
+        df = pd.concat([df, added])
+
+        rows = df.loc[affected.append(added.index), ['sigla', *CUMULATIVES.values()]].sort_index()
+        grouped = rows.groupby('sigla')
+        for cumulative, volume in CUMULATIVES.items():
+            df.loc[rows.index, cumulative] = grouped[volume].cumsum()
+    return df
+
+
+# Columns of the frac CSV used by the pages, with an explicit dtype schema
+# (nullable integers so missing values still load). The measures stay float64:
+# they reach tables, hovers and the JSON API, where float32 rounding shows
+# (3188.9 -> 3188.8999), and they are a small part of the frame.
+FRAC_DTYPES = {
+    'id_base_fractura_adjiv': 'Int64',
+    'sigla': 'object',
+    'longitud_rama_horizontal_m': 'float64',
+    'cantidad_fracturas': 'float64',
+    'arena_bombeada_nacional_tn': 'float64',
+    'arena_bombeada_importada_tn': 'float64',
+    'agua_inyectada_m3': 'float64',
+    'anio': 'Int16',
+    'mes': 'Int8',
+}
+FRAC_COLUMNS = list(FRAC_DTYPES)
+
+# One row per frac record
+FRAC_KEY = ['id_base_fractura_adjiv']
+
+# Wells with more than one frac record (re-loaded or corrected reports) keep:
+#   'latest' the record with the latest anio/mes (then the highest id), i.e.
+#            the correction; records without a date count as the oldest
+#   'first'  the first record of the CSV
+#   'sum'    stages, sand and water added up, the longest lateral
+FRAC_DUPLICATE_POLICIES = ('first', 'latest', 'sum')
+FRAC_DUPLICATE_POLICY = 'latest'
+
+# Rows per chunk when streaming the frac CSV
+FRAC_CHUNK_ROWS = 20_000
+
+
+# Read the frac CSV (path or URL) with only the used columns and the compact
+# schema, applying the cut-offs of prepare_frac chunk by chunk so discarded
+# rows are never held in memory
+def read_frac(source, chunk_rows=FRAC_CHUNK_ROWS):
+    chunks = pd.read_csv(
+        source, usecols=lambda column: column in FRAC_DTYPES, dtype=FRAC_DTYPES, chunksize=chunk_rows
+    )
+    return pd.concat([prepare_frac(chunk) for chunk in chunks], ignore_index=True)
+
+
+# Add the total arena and apply the cut-off conditions to the fracture data:
+# longitud_rama_horizontal_m > 100
+# cantidad_fracturas > 6
+# arena_total_tn > 100
+def prepare_frac(df_frac):
+    df_frac = df_frac.copy()
+
+    # Create a new column for the total amount of arena (sum of national and imported arena)
+    df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
+
+    return df_frac[
+        (df_frac['longitud_rama_horizontal_m'] > 100) &
+        (df_frac['cantidad_fracturas'] > 6) &
+        (df_frac['arena_total_tn'] > 100)
+    ]
+
+
+# Per-well cumulative table with GOR/WOR/WGR and the McCain fluid classification
+def build_cum_df(data_filtered):
+    # Step 1: Create a Pivot Table with Cumulated Values
+    cum_df = data_filtered.groupby('sigla')[['Gp', 'Np', 'Wp']].max().reset_index()
+
+    # Step 2: Create a New DataFrame with GOR
+    cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
+    cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
+
+    # Step 3: Add a new column "Fluido McCain" based on conditions
+    cum_df['Fluido McCain'] = np.where(
+        (cum_df['Np'] == 0) | (cum_df['GOR'] > 3000), 'Gasífero', 'Petrolífero'
+    )
+
+    # Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
+    tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
+    cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
+
+    # Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
+    cum_df['tipopozoNEW'] = cum_df['tipopozo'].where(
+        cum_df['tipopozo'] != 'Otro tipo', cum_df['Fluido McCain']
+    )
+
+    # Step 6: Calculate WOR and WGR
+    cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
+    cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
+    cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
+    cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
+
+    # Step 7: Create the final table with the desired columns
+    return cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
+
+
+# Calculate additional metrics and create the per-well summary DataFrame
+def create_summary_dataframe(data_filtered):
+    data_filtered = data_filtered.copy(deep=False)
+
+    # Calculate Qo peak and Qg peak (maximum oil and gas rates)
+    data_filtered['Qo_peak'] = data_filtered.groupby('sigla')['oil_rate'].transform('max')
+    data_filtered['Qg_peak'] = data_filtered.groupby('sigla')['gas_rate'].transform('max')
+
+    # Determine the starting year for each well
+    data_filtered['start_year'] = data_filtered.groupby('sigla')['anio'].transform('min')
+
+    # Calculate EUR at 30, 90, and 180 days based on dates
+    def calculate_eur(group):
+        group = group.sort_values('date')  # Ensure the data is sorted by date
+
+        # Get the start date for the group
+        start_date = group['date'].iloc[0]
+
+        # Define target dates
+        target_dates = {
+            'EUR_30': start_date + relativedelta(days=30),
+            'EUR_90': start_date + relativedelta(days=90),
+            'EUR_180': start_date + relativedelta(days=180)
+        }
+
+        # Initialize EUR columns
+        for key, target_date in target_dates.items():
+            group[key] = group.loc[
+                group['date'] <= target_date,
+                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
+            ].max()
+
+        return group
+
+    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
+
+    # Create the new DataFrame with selected columns
+    summary_df = data_filtered.groupby('sigla').agg({
+        'date': 'first',
+        'start_year': 'first',
+        'empresaNEW': 'first',
+        'formprod': 'first',
+        'sub_tipo_recurso': 'first',
+        'Np': 'max',
+        'Gp': 'max',
+        'Wp': 'max',
+        'Qo_peak': 'max',
+        'Qg_peak': 'max',
+        'EUR_30': 'max',
+        'EUR_90': 'max',
+        'EUR_180': 'max'
+    }).reset_index()
+
+    return summary_df
+
+
+# One frac row per sigla following the duplicate policy, plus the number of
+# frac records of the well ('frac_registros')
+def frac_by_well(df_frac, policy=FRAC_DUPLICATE_POLICY):
+    if policy not in FRAC_DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown frac duplicate policy {policy!r}, expected one of {FRAC_DUPLICATE_POLICIES}")
+
+    counts = df_frac.groupby('sigla', sort=False).size()
+    if policy == 'first':
+        wells = df_frac.drop_duplicates('sigla', keep='first')
+    elif policy == 'latest':
+        order = [c for c in ('anio', 'mes', 'id_base_fractura_adjiv') if c in df_frac.columns]
+        wells = df_frac.sort_values(order, kind='stable', na_position='first').drop_duplicates('sigla', keep='last')
+        wells = wells.loc[df_frac.index.intersection(wells.index)]  # back to CSV order
+    else:
+        added = ['cantidad_fracturas', 'arena_bombeada_nacional_tn', 'arena_bombeada_importada_tn',
+                 'arena_total_tn', 'agua_inyectada_m3']
+        aggregations = {c: 'first' for c in df_frac.columns if c != 'sigla'}
+        aggregations.update({c: 'sum' for c in added if c in df_frac.columns})
+        aggregations['longitud_rama_horizontal_m'] = 'max'
+        wells = df_frac.groupby('sigla', sort=False).agg(aggregations).reset_index()
+
+    wells = wells.set_index('sigla')
+    wells['frac_registros'] = counts
+    return wells
+
+
+# Well-master table: frac (one row per sigla), cumulatives and production
+# summary joined on the sigla index. The three sides are unique per well, so
+# the outer join is one-to-one by construction (checked, not deduplicated).
+def join_well_master(frac_wells, cum_df, summary_df):
+    sides = [frac_wells, cum_df.set_index('sigla'), summary_df.set_index('sigla')]
+    for side in sides:
+        if not side.index.is_unique:
+            raise ValueError("Well-master join expects one row per sigla on every side")
+    # Sorted by sigla, as the outer merges it replaces, so ties rank the same
+    master = sides[0].join(sides[1:], how='outer').sort_index()
+    return master.rename_axis('sigla').reset_index()
+
+
+# Full frac + production merge: returns (cum_df, df_merged_final, df_merged_VMUT)
+# with one row per well. `data_filtered` is the production data with tef > 0
+# and `empresaNEW` already set.
+def build_frac_report_tables(data_filtered, df_frac, policy=FRAC_DUPLICATE_POLICY):
+    with stage('prepare_frac'):
+        df_frac = prepare_frac(df_frac)
+    track_memory('df_frac (cortes)', df_frac)
+    with stage('build_cum_df'):
+        cum_df = build_cum_df(data_filtered)
+    track_memory('cum_df', cum_df)
+
+    # Merge `tipopozoNEW` back into the production data
+    with stage('merge tipopozoNEW'):
+        data_filtered = data_filtered.merge(
+            cum_df[['sigla', 'tipopozoNEW']],
+            on='sigla',
+            how='left'
+        )
+    track_memory('data_filtered + tipopozoNEW', data_filtered)
+
+    with stage('frac por pozo'):
+        frac_wells = frac_by_well(df_frac, policy)
+    track_memory('frac_wells', frac_wells)
+
+    with stage('create_summary_dataframe'):
+        summary_df = create_summary_dataframe(data_filtered)
+    track_memory('summary_df', summary_df)
+
+    with stage('join pozo maestro'):
+        df_merged_final = join_well_master(frac_wells, cum_df, summary_df)
+    with stage('outliers'):
+        add_outlier_flags(df_merged_final)
+    track_memory('df_merged_final', df_merged_final)
+
+    df_merged_VMUT = filter_vmut(df_merged_final)
+    track_memory('df_merged_VMUT', df_merged_VMUT)
+
+    return cum_df, df_merged_final, df_merged_VMUT
+
+
+# Flags the frac records out of the robust bounds of their campaign and fluid:
+# one 'outlier_<column>' per column of columns_to_check, 'outlier' if any of them
+def add_outlier_flags(df_merged_final):
+    flags = outlier_flags(df_merged_final, OUTLIER_GROUPS, columns_to_check)
+    df_merged_final[flags.columns] = flags
+    df_merged_final['outlier'] = flags.any(axis=1)
+    return df_merged_final
+
+
+# Only keep VMUT as the target formation and filter for SHALE resource type
+def filter_vmut(df_merged_final):
+    return df_merged_final[
+        (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
+    ].copy()
+
+
+# Data Management columns: total production, missing frac flag, start year and
+# a 0–100 quality score (completeness of the critical frac fields)
+def add_quality_columns(df_merged_final):
+    df_merged_final = df_merged_final.copy()
+
+    df_merged_final['prod_total'] = df_merged_final['Np'].fillna(0) + df_merged_final['Gp'].fillna(0)
+    df_merged_final['sin_datos_frac'] = df_merged_final['id_base_fractura_adjiv'].isna()
+    df_merged_final['anio_inicio'] = pd.to_datetime(df_merged_final['date']).dt.year
+    df_merged_final['score_calidad'] = (
+        df_merged_final[QUALITY_FIELDS].notna().sum(axis=1) / len(QUALITY_FIELDS) * 100
+    ).round(1)
+
+    return df_merged_final
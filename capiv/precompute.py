@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from capiv.aggregates import API_TABLES, build_api_tables
+from capiv.headless import local_sources, page_errors, run_page
+from capiv.pipeline import read_frac
+from capiv.report import DEFAULT_CACHE_DIR, FRAC_PAGES, load_production
+from capiv.snapshot import snapshot_id
+from capiv.snapshot_store import SNAPSHOT_DIR_ENV, open_store
+from capiv.sources import frac_url, production_url
+from capiv.tables import TABLE_CACHE_ENV, cached_artifact, prune_artifacts
+
+# Background precompute of the page artifacts of a new snapshot.
+#
+#   CAPIV_TABLE_CACHE=/var/cache/capiv python -m capiv.precompute --production p.csv --frac f.csv --port 8766
+#   CAPIV_TABLE_CACHE=/var/cache/capiv CAPIV_SNAPSHOT_DIR=/var/lib/capiv python -m capiv.precompute --watch
+#
+# With CAPIV_TABLE_CACHE set, the pages keep their per-snapshot artifacts on
+# disk: frac report tables (well-master), rankings, quality cube and figures
+# (see capiv.tables and capiv.figure_cache). When a new snapshot lands this
+# worker runs the pages headless on a process pool in priority order, so the
+# artifacts are on disk before the first visitor opens a page and the app only
+# reads them. Progress is written to precompute-status.json in the cache
+# directory and served at GET /ready (200 when ready, 503 otherwise) and
+# GET /status.
+
+# (name, page number, keyed widget values), most visited first
+PRECOMPUTE_TASKS = [
+    ('produccion', '1', {}),
+    # First frac page: builds the shared frac report tables for the others
+    ('ranking', '5', {}),
+    ('fracdata-actividad', '6', {'frac_report_tab': "Indicadores de Actividad"}),
+    ('fracdata-completacion', '6', {'frac_report_tab': "Estrategia de Completación"}),
+    ('fracdata-productividad', '6', {'frac_report_tab': "Productividad"}),
+    ('calidad', '8', {}),
+    ('watchlist', '7', {}),
+    ('comparacion', '4', {}),
+    ('ranking-sin-outliers', '5', {'excluir_outliers': True}),
+]
+
+STATUS_FILE = 'precompute-status.json'
+DEFAULT_PORT = 8766
+DEFAULT_INTERVAL = 60
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def status_path(cache_dir):
+    return os.path.join(cache_dir, STATUS_FILE)
+
+
+def read_status(cache_dir):
+    try:
+        with open(status_path(cache_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'state': 'idle', 'snapshot': None, 'done': 0, 'total': 0, 'tasks': []}
+
+
+def _write_status(cache_dir, status):
+    tmp_path = f"{status_path(cache_dir)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, status_path(cache_dir))
+
+
+@lru_cache(maxsize=1)
+def _session_frame(session_path):
+    return pd.read_pickle(session_path)
+
+
+# Worker: run one page so its artifacts are stored in the cache directory
+def _warm_task(task, production_snapshot, session_path, production_path, frac_path, cache_dir):
+    os.environ[TABLE_CACHE_ENV] = cache_dir
+    start = time.perf_counter()
+
+    session_state = dict(task['session'], df=_session_frame(session_path).copy(), snapshot_id=production_snapshot)
+    with local_sources(production_path, frac_path):
+        at = run_page(task['page'], session_state)
+
+    return {'name': task['name'], 'seconds': round(time.perf_counter() - start, 2), 'errors': page_errors(at)}
+
+
+# Warm every page artifact of the snapshot in (production_path, frac_path);
+# returns the final status. `production` is the already derived production
+# frame, if the caller has it (capiv.refresh updates it incrementally).
+def precompute(production_path, frac_path, cache_dir=DEFAULT_CACHE_DIR, workers=None, keep_previous=True,
+               production=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ[TABLE_CACHE_ENV] = cache_dir
+    previous = read_status(cache_dir)
+    start = time.perf_counter()
+
+    df = load_production(production_path) if production is None else production
+    production_snapshot = snapshot_id(df)
+    snapshot = f"{production_snapshot}+{snapshot_id(read_frac(frac_path))}"
+    session_path = os.path.join(cache_dir, f"session-{production_snapshot}.pkl")
+    if not os.path.exists(session_path):
+        df.to_pickle(session_path)
+    # Aggregates served by capiv.api
+    cached_artifact(API_TABLES, production_snapshot, lambda: build_api_tables(df))
+    del df
+
+    tasks = [{'name': name, 'page': page, 'session': session} for name, page, session in PRECOMPUTE_TASKS]
+    status = {
+        'state': 'warming',
+        'snapshot': snapshot,
+        'produccion': production_snapshot,
+        'started_at': _now(),
+        'finished_at': None,
+        'done': 0,
+        'total': len(tasks),
+        'tasks': [
+            {'name': t['name'], 'page': t['page'], 'state': 'pending', 'seconds': None, 'errors': []}
+            for t in tasks
+        ],
+        'previous': {'snapshot': previous.get('snapshot'), 'produccion': previous.get('produccion')},
+    }
+    _write_status(cache_dir, status)
+    by_name = {entry['name']: entry for entry in status['tasks']}
+
+    def finished(future):
+        result = future.result()
+        entry = by_name[result['name']]
+        entry.update(state='error' if result['errors'] else 'done', seconds=result['seconds'], errors=result['errors'])
+        status['done'] += 1
+        _write_status(cache_dir, status)
+
+    args = (production_snapshot, session_path, production_path, frac_path, cache_dir)
+    frac_tasks = [t for t in tasks if t['page'] in FRAC_PAGES]
+    first_tasks = [t for t in tasks if t['page'] not in FRAC_PAGES or t is frac_tasks[0]]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Submitted in priority order; the other frac pages wait for the first
+        # one so the shared tables are computed only once
+        futures = {t['name']: pool.submit(_warm_task, t, *args) for t in first_tasks}
+        if frac_tasks:
+            finished(futures.pop(frac_tasks[0]['name']))
+            futures.update({t['name']: pool.submit(_warm_task, t, *args) for t in frac_tasks[1:]})
+        for future in as_completed(futures.values()):
+            finished(future)
+
+    errors = [entry for entry in status['tasks'] if entry['errors']]
+    status.update(state='error' if errors else 'ready', finished_at=_now(),
+                  seconds=round(time.perf_counter() - start, 2))
+    _write_status(cache_dir, status)
+
+    # Artifacts of older snapshots are removed; the previous one stays for
+    # sessions that still show it
+    keep = {snapshot, production_snapshot}
+    if keep_previous:
+        keep |= {s for s in status['previous'].values() if s}
+    prune_artifacts(keep)
+    return status
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path not in ('/ready', '/status'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        status = read_status(self.server.cache_dir)
+        code = 200 if path == '/status' or status['state'] == 'ready' else 503
+        body = json.dumps(status, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReadinessServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir):
+        super().__init__(address, ReadinessHandler)
+        self.cache_dir = cache_dir
+
+
+# Serve /ready and /status on a background thread
+def serve_readiness(cache_dir, host='127.0.0.1', port=DEFAULT_PORT):
+    server = ReadinessServer((host, port), cache_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Latest snapshot ids of the production and frac stores
+def _store_versions(root):
+    return tuple(open_store(root, dataset).latest() for dataset in ('produccion', 'fractura'))
+
+
+# Precompute again every time the app records a new snapshot in the store
+def watch(production_path, frac_path, cache_dir=DEFAULT_CACHE_DIR, workers=None, interval=DEFAULT_INTERVAL,
+          snapshot_dir=None):
+    snapshot_dir = snapshot_dir or os.environ[SNAPSHOT_DIR_ENV]
+    warmed = None
+    while True:
+        versions = _store_versions(snapshot_dir)
+        if all(versions) and versions != warmed:
+            status = precompute(production_path, frac_path, cache_dir, workers)
+            print(f"{status['snapshot']}: {status['state']} en {status['seconds']} s")
+            warmed = versions
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula los artefactos de las páginas para el último snapshot")
+    parser.add_argument('--production', default=None, help="CSV de producción (por defecto el dataset oficial)")
+    parser.add_argument('--frac', default=None, help="CSV de fractura (por defecto el dataset oficial)")
+    parser.add_argument('--cache-dir', default=os.environ.get(TABLE_CACHE_ENV, DEFAULT_CACHE_DIR))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--watch', action='store_true', help=f"recalcular con cada snapshot nuevo de {SNAPSHOT_DIR_ENV}")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="segundos entre revisiones (--watch)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help="servir /ready y /status en este puerto")
+    args = parser.parse_args()
+
+    production_path = args.production or production_url()
+    frac_path = args.frac or frac_url()
+    if args.watch and SNAPSHOT_DIR_ENV not in os.environ:
+        parser.error(f"--watch requiere {SNAPSHOT_DIR_ENV}")
+
+    if args.port is not None:
+        server = serve_readiness(args.cache_dir, args.host, args.port)
+        print(f"Estado en http://{args.host}:{server.server_address[1]}/ready")
+
+    if args.watch:
+        try:
+            watch(production_path, frac_path, args.cache_dir, args.workers, args.interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    status = precompute(production_path, frac_path, args.cache_dir, args.workers)
+    for entry in status['tasks']:
+        print(f"{entry['name']:<25} {entry['state']:<6} {entry['seconds']} s {'; '.join(entry['errors'])}")
+    print(f"{status['snapshot']}: {status['state']} en {status['seconds']} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import pandas as pd
+
+from capiv.pipeline import add_quality_columns
+
+# Data-quality cube of the Data Management page, built once per snapshot.
+#
+# The well-master table (one row per sigla) is reduced to additive measures per
+# empresa × año de inicio × tipo de pozo × formación: wells, wells without frac
+# data, production and production without frac data, and the sum of the quality
+# scores. Every view of the page (global KPIs, company ranking, empresa × año
+# heatmap, formation scores and the per-company drilldown) is a roll-up of the
+# cube, so choosing another company is a lookup instead of a recomputation.
+
+CUBE_DIMENSIONS = ['empresaNEW', 'anio_inicio', 'tipopozoNEW', 'formprod']
+
+# Wells without frac data listed per company in the drilldown
+WELLS_PER_COMPANY = 20
+
+
+def _quality_cube(df):
+    df = df.assign(prod_sin_frac=df['prod_total'].where(df['sin_datos_frac'], 0))
+    # Missing keys are kept so the global totals include every well
+    return df.groupby(CUBE_DIMENSIONS, dropna=False).agg(
+        pozos=('sigla', 'count'),
+        pozos_sin_frac=('sin_datos_frac', 'sum'),
+        prod_total=('prod_total', 'sum'),
+        prod_sin_frac=('prod_sin_frac', 'sum'),
+        score_suma=('score_calidad', 'sum'),
+    )
+
+
+# Sum of the cube over the given dimensions (rows with a missing key are left out)
+def rollup(cube, by):
+    table = cube.groupby(level=by).sum()
+    table['pct_incompleto'] = table['pozos_sin_frac'] / table['pozos'] * 100
+    table['pct_prod_incompleto'] = table['prod_sin_frac'] / table['prod_total'] * 100
+    table['score_medio'] = table['score_suma'] / table['pozos']
+    return table
+
+
+# Totals of the whole table
+def _global_kpis(cube):
+    totals = cube.sum()
+    return {
+        'pozos': int(totals['pozos']),
+        'pozos_sin_frac': int(totals['pozos_sin_frac']),
+        'prod_total': totals['prod_total'],
+        'prod_sin_frac': totals['prod_sin_frac'],
+        'pct_prod_incompleto': totals['prod_sin_frac'] / totals['prod_total'] * 100 if totals['prod_total'] else 0,
+        'score_medio': totals['score_suma'] / totals['pozos'] if totals['pozos'] else float('nan'),
+    }
+
+
+# {'cubo', 'global', 'empresas', 'empresa_anio', 'empresa_tipo', 'formaciones', 'pozos_sin_frac'}
+def build_quality_cube(df_merged_final):
+    df = add_quality_columns(df_merged_final)
+    cube = _quality_cube(df)
+
+    # Company ranking by production without frac data
+    empresas = rollup(cube, 'empresaNEW').sort_values('prod_sin_frac', ascending=False)
+
+    # Worst scored wells without frac data of every company
+    pozos_sin_frac = (
+        df.loc[df['sin_datos_frac'], ['empresaNEW', 'sigla', 'tipopozoNEW', 'formprod', 'score_calidad']]
+        .sort_values('score_calidad', kind='stable')
+        .groupby('empresaNEW')
+        .head(WELLS_PER_COMPANY)
+        .set_index('empresaNEW')
+        .sort_index(kind='stable')
+    )
+
+    return {
+        'cubo': cube,
+        'global': _global_kpis(cube),
+        'empresas': empresas,
+        'empresa_anio': rollup(cube, ['empresaNEW', 'anio_inicio']),
+        'empresa_tipo': rollup(cube, ['empresaNEW', 'tipopozoNEW']),
+        'formaciones': rollup(cube, 'formprod'),
+        'pozos_sin_frac': pozos_sin_frac,
+    }
+
+
+# Rows of a roll-up (or of pozos_sin_frac) for one company, without the empresaNEW level
+def company_slice(table, empresa):
+    if table.index.nlevels == 1:
+        return table[table.index == empresa]
+    if empresa not in table.index.get_level_values('empresaNEW'):
+        return table.iloc[0:0].droplevel('empresaNEW')
+    return table.xs(empresa, level='empresaNEW')
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Grouped quantiles (P10/P50/P90, ...) for many metrics at once.
+#
+# pandas falls back to Python-level aggregation for lambda percentiles. Here
+# all metrics are stacked into one long array, sorted once by (group, metric,
+# value), and every quantile is read off the sorted array by position using
+# linear interpolation (same as np.percentile / np.nanpercentile). NaNs are
+# ignored; groups with no valid values give NaN.
+
+STATS = ('min', 'max', 'count')
+
+
+# Column name for a quantile, e.g. 0.5 -> 'Qo_peak_p50'
+def quantile_column(metric, q):
+    return f"{metric}_p{round(q * 100):g}"
+
+
+def grouped_quantiles(df, by, metrics, quantiles=(0.1, 0.5, 0.9), stats=('max',)):
+    by = [by] if isinstance(by, str) else list(by)
+    metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+
+    grouper = df.groupby(by, sort=True)
+    group_index = grouper.size().index
+    # Rows with a missing key are left out of every group (as in groupby)
+    codes = grouper.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    n_groups, n_metrics = len(group_index), len(metrics)
+
+    # Stack (row, metric) into one long array keyed by group * n_metrics + metric
+    values = df[metrics].to_numpy(dtype=float).ravel()
+    keys = (codes[:, None] * n_metrics + np.arange(n_metrics)).ravel()
+    valid = (np.repeat(codes, n_metrics) >= 0) & ~np.isnan(values)
+    values, keys = values[valid], keys[valid]
+
+    # Single sort: by key, then by value inside each key
+    order = np.lexsort((values, keys))
+    values = values[order]
+
+    counts = np.bincount(keys, minlength=n_groups * n_metrics)
+    starts = np.cumsum(counts) - counts
+    has_values = counts > 0
+    last = np.maximum(counts - 1, 0)
+
+    def take(offsets):
+        out = np.full(counts.shape, np.nan)
+        out[has_values] = values[(starts + offsets)[has_values]]
+        return out
+
+    columns = {}
+    for q in quantiles:
+        position = q * last
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        low_values, high_values = take(lower), take(upper)
+        columns[q] = low_values + (position - lower) * (high_values - low_values)
+
+    result = {}
+    for j, metric in enumerate(metrics):
+        for q in quantiles:
+            result[quantile_column(metric, q)] = columns[q].reshape(n_groups, n_metrics)[:, j]
+        if 'min' in stats:
+            result[f"{metric}_min"] = take(np.zeros_like(counts)).reshape(n_groups, n_metrics)[:, j]
+        if 'max' in stats:
+            result[f"{metric}_max"] = take(last).reshape(n_groups, n_metrics)[:, j]
+        if 'count' in stats:
+            result[f"{metric}_count"] = counts.reshape(n_groups, n_metrics)[:, j]
+
+    return pd.DataFrame(result, index=group_index)
@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+
+# Declarative "Top K per campaign" rankings for the Ranking page.
+#
+# Each ranking is a config entry:
+#   id          unique key of the result table
+#   title       bold caption shown above the table
+#   metric      column to rank (see add_ranking_metrics for derived metrics)
+#   agg         'max', 'min' or 'p50' of the metric within each well/company
+#   entity      'well' (start_year, sigla, empresaNEW) or 'company' (start_year, empresaNEW)
+#   label       column header for the ranked value
+# Optional keys:
+#   fluid         'Petrolífero' / 'Gasífero' (tipopozoNEW), default all wells
+#   ascending     rank lowest first (default: True only for agg='min')
+#   top_k         rows per campaign (default 3)
+#   base          'vmut' or 'vmut_lateral' (lateral > 0, one frac record per sigla)
+#   year_from     first campaign included (start_year >= year_from)
+#   positive      only rank values > 0
+#   fmt           'int' (truncated, blank when <= 0) or 'round' (rounded to 0 decimals)
+#   frac_summary  add stage count, fracspacing and proppant per stage (well rankings)
+
+PETROLIFERO = 'Petrolífero'
+GASIFERO = 'Gasífero'
+
+AGGREGATIONS = {'max': 'max', 'min': 'min', 'p50': 'median'}
+
+ENTITY_KEYS = {
+    'well': ['start_year', 'sigla', 'empresaNEW'],
+    'company': ['start_year', 'empresaNEW'],
+}
+
+FRAC_SUMMARY_LABELS = {
+    'cantidad_fracturas': 'Cantidad de Fracturas',
+    'fracspacing': 'Fracspacing (m/etapa)',
+    'agente_etapa': 'Agente de Sosten por Etapa (tn/etapa)',
+}
+
+RANKING_SECTIONS = [
+    {
+        'subheader': "Ranking según Cantidad de Etapas",
+        'rankings': [
+            {'id': 'etapas_pozos_max', 'title': "Top 3 Pozos con Máxima Cantidad de Etapas",
+             'metric': 'cantidad_fracturas', 'agg': 'max', 'entity': 'well', 'base': 'vmut_lateral',
+             'label': "Máxima Cantidad de Etapas"},
+            {'id': 'etapas_empresas_p50', 'title': "Top 3 Empresas con Máxima Cantidad de Etapas por Pozo",
+             'metric': 'cantidad_fracturas', 'agg': 'p50', 'entity': 'company', 'base': 'vmut_lateral',
+             'label': "P50 Cantidad de Etapas"},
+        ],
+    },
+    {
+        'subheader': "Ranking según Longitud de Rama",
+        'rankings': [
+            {'id': 'longitud_pozos_max', 'title': "Top 3 Pozos con Mayor Longitud de Rama",
+             'metric': 'longitud_rama_horizontal_m', 'agg': 'max', 'entity': 'well', 'base': 'vmut_lateral',
+             'label': "Máxima Longitud de Rama (metros)"},
+            {'id': 'longitud_empresas_p50', 'title': "Top 3 Empresa con Máxima Longitud de Rama por Pozo",
+             'metric': 'longitud_rama_horizontal_m', 'agg': 'p50', 'entity': 'company', 'base': 'vmut_lateral',
+             'label': "P50 Longitud de Rama (metros)"},
+        ],
+    },
+    {
+        'subheader': "Ranking según Caudales Pico",
+        'rankings': [
+            {'id': 'caudal_pico_pozos_petroleo', 'title': "Tipo Petrolífero: Top 3 Pozos con Mayor Caudal Pico",
+             'metric': 'Qo_peak', 'agg': 'max', 'entity': 'well', 'fluid': PETROLIFERO,
+             'label': "Caudal Pico de Petróleo (m3/d)", 'fmt': 'int', 'frac_summary': True},
+            {'id': 'caudal_pico_pozos_gas', 'title': "Tipo Gasífero: Top 3 Pozos con Mayor Caudal Pico",
+             'metric': 'Qg_peak', 'agg': 'max', 'entity': 'well', 'fluid': GASIFERO,
+             'label': "Caudal Pico de Gas (km3/d)", 'fmt': 'int', 'frac_summary': True},
+            {'id': 'caudal_pico_empresas_petroleo', 'title': "Top 3 Empresas con Mayores Caudales Pico de Petróleo",
+             'metric': 'Qo_peak', 'agg': 'p50', 'entity': 'company', 'fluid': PETROLIFERO,
+             'label': "P50 Caudal Pico (m3/d)"},
+            {'id': 'caudal_pico_empresas_gas', 'title': "Top 3 Empresas con Mayores Caudales Pico de Gas",
+             'metric': 'Qg_peak', 'agg': 'p50', 'entity': 'company', 'fluid': GASIFERO,
+             'label': "P50 Caudal Pico (km3/d)"},
+        ],
+    },
+    {
+        'subheader': "Ranking según Arena Bombeada",
+        'rankings': [
+            {'id': 'arena_pozos_max', 'title': "Top 3 Pozos con Máxima Arena Bombeada",
+             'metric': 'arena_total_tn', 'agg': 'max', 'entity': 'well', 'year_from': 2012, 'positive': True,
+             'label': "Máxima Arena Bombeada (tn)", 'fmt': 'int'},
+            {'id': 'arena_empresas_p50', 'title': "Top 3 Empresas con Máxima Arena Bombeada por Pozo",
+             'metric': 'arena_total_tn', 'agg': 'p50', 'entity': 'company', 'year_from': 2012, 'positive': True,
+             'label': "P50 Arena Bombeada (tn)", 'fmt': 'int'},
+        ],
+    },
+    {
+        'subheader': "Ranking según Fracspacing",
+        'captions': [
+            "Fracspacing = longitud_rama_horizontal_m / cantidad_fracturas",
+            "Fracspacing más agresivo = Menor Fracspacing",
+        ],
+        'rankings': [
+            {'id': 'fracspacing_pozos_petroleo', 'title': "Tipo Petrolífero: Top 3 Pozos con Fracspacing más Agresivo",
+             'metric': 'fracspacing', 'agg': 'min', 'entity': 'well', 'fluid': PETROLIFERO,
+             'base': 'vmut_lateral', 'positive': True, 'label': "Mínimo Fracspacing (m)", 'fmt': 'int'},
+            {'id': 'fracspacing_empresas_petroleo',
+             'title': "Top 3 Empresas con Fracspacing más Agresivo por Pozo de Petróleo",
+             'metric': 'fracspacing', 'agg': 'p50', 'entity': 'company', 'fluid': PETROLIFERO, 'ascending': True,
+             'base': 'vmut_lateral', 'positive': True, 'label': "P50 Fracspacing (m)"},
+            {'id': 'fracspacing_pozos_gas', 'title': "Tipo Gasífero: Top 3 Pozos con Fracspacing más Agresivo",
+             'metric': 'fracspacing', 'agg': 'min', 'entity': 'well', 'fluid': GASIFERO,
+             'base': 'vmut_lateral', 'positive': True, 'label': "Fracspacing Mínimo (m)", 'fmt': 'int'},
+            {'id': 'fracspacing_empresas_gas',
+             'title': "Top 3 Empresas con Fracspacing más Agresivo por Pozo de Gas",
+             'metric': 'fracspacing', 'agg': 'p50', 'entity': 'company', 'fluid': GASIFERO, 'ascending': True,
+             'base': 'vmut_lateral', 'positive': True, 'label': "P50 Fracspacing (m)"},
+        ],
+    },
+    {
+        'subheader': "Ranking según Propante por Etapa",
+        'captions': [
+            "Prop x Etapa = arena_total_tn / cantidad_fracturas",
+            "La cantidad de arena por etapa es otro indicador de agresividad en la completacion",
+        ],
+        'rankings': [
+            {'id': 'prop_etapa_pozos_petroleo_max', 'title': "Tipo Petrolífero: Top 3 Pozos con Mayor Propante por Etapa",
+             'metric': 'prop_x_etapa', 'agg': 'max', 'entity': 'well', 'fluid': PETROLIFERO, 'positive': True,
+             'label': "Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_pozos_gas_max', 'title': "Tipo Gasífero: Top 3 Pozos con Mayor Propante por Etapa",
+             'metric': 'prop_x_etapa', 'agg': 'max', 'entity': 'well', 'fluid': GASIFERO, 'positive': True,
+             'label': "Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_empresas_petroleo_max',
+             'title': "Top 3 Empresas con Mayor Propante por Etapa por Pozo de Petróleo",
+             'metric': 'prop_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': PETROLIFERO, 'positive': True,
+             'label': "P50 Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_empresas_gas_max',
+             'title': "Top 3 Empresas con Mayor Propante por Etapa por Pozo de Gas",
+             'metric': 'prop_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': GASIFERO, 'positive': True,
+             'label': "P50 Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_pozos_petroleo_min', 'title': "Tipo Petrolífero: Top 3 Pozos con Menor Propante por Etapa",
+             'metric': 'prop_x_etapa', 'agg': 'min', 'entity': 'well', 'fluid': PETROLIFERO, 'positive': True,
+             'label': "Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_pozos_gas_min', 'title': "Tipo Gasífero: Top 3 Pozos con Menor Propante por Etapa",
+             'metric': 'prop_x_etapa', 'agg': 'min', 'entity': 'well', 'fluid': GASIFERO, 'positive': True,
+             'label': "Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_empresas_petroleo_min',
+             'title': "Top 3 Empresas con Menor Propante por Etapa por Pozo de Petróleo",
+             'metric': 'prop_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': PETROLIFERO, 'ascending': True,
+             'positive': True, 'label': "P50 Prop x Etapa (tn/etapa)"},
+            {'id': 'prop_etapa_empresas_gas_min',
+             'title': "Top 3 Empresas con Menor Propante por Etapa por Pozo de Gas",
+             'metric': 'prop_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': GASIFERO, 'ascending': True,
+             'positive': True, 'label': "P50 Prop x Etapa (tn/etapa)"},
+        ],
+    },
+    {
+        'subheader': "Ranking según Agente de Sosten por Volumen Inyectado",
+        'rankings': [
+            {'id': 'as_volumen_pozos_max',
+             'title': "Top 3 Pozos con Mayor cc de Agente de Sosten por Volumen Inyectado",
+             'metric': 'AS_x_volumen_inyectado', 'agg': 'max', 'entity': 'well', 'year_from': 2012, 'positive': True,
+             'label': "Agente de Sosten por Vol Inyectado (tn/1000m3)", 'fmt': 'int'},
+            {'id': 'as_volumen_empresas_p50',
+             'title': "Top 3 Empresas con Mayor cc de Agente de Sosten por Volumen Inyectado por Pozo",
+             'metric': 'AS_x_volumen_inyectado', 'agg': 'p50', 'entity': 'company', 'year_from': 2012, 'positive': True,
+             'label': "P50 Agente de Sosten por Vol Inyectado (tn/1000m3)", 'fmt': 'int'},
+        ],
+    },
+    {
+        'subheader': "Ranking según Caudales Pico por Etapa",
+        'rankings': [
+            {'id': 'caudal_etapa_pozos_petroleo',
+             'title': "Tipo Petrolífero: Top 3 Pozos con Mayor Caudal Pico por Etapa",
+             'metric': 'Qo_peak_x_etapa', 'agg': 'max', 'entity': 'well', 'fluid': PETROLIFERO, 'year_from': 2013,
+             'label': "Caudal Pico de Petróleo por Etapa (m3/d/etapa)", 'fmt': 'int', 'frac_summary': True},
+            {'id': 'caudal_etapa_pozos_gas',
+             'title': "Tipo Gasífero: Top 3 Pozos con Mayor Caudal Pico por Etapa",
+             'metric': 'Qg_peak_x_etapa', 'agg': 'max', 'entity': 'well', 'fluid': GASIFERO, 'year_from': 2013,
+             'label': "Caudal Pico de Gas por Etapa (km3/d/etapa)", 'fmt': 'int', 'frac_summary': True},
+            {'id': 'caudal_etapa_empresas_petroleo',
+             'title': "Top 3 Empresas con Mayores Caudales Pico de Petróleo por Etapa por Pozo",
+             'metric': 'Qo_peak_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': PETROLIFERO, 'year_from': 2013,
+             'label': "P50 Caudal Pico por Etapa (m3/d/etapa)"},
+            {'id': 'caudal_etapa_empresas_gas',
+             'title': "Top 3 Empresas con Mayores Caudales Pico de Gas por Etapa por Pozo",
+             'metric': 'Qg_peak_x_etapa', 'agg': 'p50', 'entity': 'company', 'fluid': GASIFERO, 'year_from': 2013,
+             'label': "P50 Caudal Pico por Etapa (km3/d/etapa)"},
+        ],
+    },
+]
+
+
+# Every ranking config entry, in page order
+def all_rankings(sections=RANKING_SECTIONS):
+    return [spec for section in sections for spec in section['rankings']]
+
+
+# Derived completion metrics used by the rankings (inf from zero denominators -> NaN)
+def add_ranking_metrics(df_merged_VMUT):
+    df = df_merged_VMUT.copy()
+    stages = df['cantidad_fracturas']
+    df['fracspacing'] = df['longitud_rama_horizontal_m'] / stages
+    df['prop_x_etapa'] = df['arena_total_tn'] / stages
+    df['AS_x_volumen_inyectado'] = df['arena_total_tn'] / (df['agua_inyectada_m3'].replace(0, np.nan) / 1000)
+    df['Qo_peak_x_etapa'] = df['Qo_peak'] / stages
+    df['Qg_peak_x_etapa'] = df['Qg_peak'] / stages
+    derived = ['fracspacing', 'prop_x_etapa', 'AS_x_volumen_inyectado', 'Qo_peak_x_etapa', 'Qg_peak_x_etapa']
+    df[derived] = df[derived].replace([np.inf, -np.inf], np.nan)
+    return df
+
+
+def _base_tables(df_merged_VMUT):
+    vmut = add_ranking_metrics(df_merged_VMUT)
+    # Remove rows where longitud_rama_horizontal_m is zero (one row per sigla already)
+    vmut_lateral = vmut[vmut['longitud_rama_horizontal_m'] > 0]
+    return {'vmut': vmut, 'vmut_lateral': vmut_lateral}
+
+
+def _format_values(values, fmt):
+    if fmt == 'int':
+        return np.trunc(values.where(values > 0)).astype('Int64')
+    return values.round(0)
+
+
+# Build the display table: the campaign is only shown on its first row
+def _format_ranking(top, spec):
+    year = top['start_year'].astype(int).astype(str)
+    table = pd.DataFrame({'Campaña': year.where(~year.duplicated(), '')})
+    if spec['entity'] == 'well':
+        table['Sigla'] = top['sigla']
+    table['Empresa'] = top['empresaNEW']
+    table[spec['label']] = _format_values(top[spec['id']], spec.get('fmt', 'round'))
+    if spec.get('frac_summary') and spec['entity'] == 'well':
+        for column, label in FRAC_SUMMARY_LABELS.items():
+            table[label] = _format_values(top[column], 'int')
+    return table.reset_index(drop=True)
+
+
+# Compute every ranking in one grouped aggregation per (base, entity, fluid split).
+# Per-ranking row filters are applied by masking the metric to NaN, so rankings
+# that share a grouping are aggregated together. Returns {ranking id: table}.
+def compute_rankings(df_merged_VMUT, specs=None):
+    specs = all_rankings() if specs is None else specs
+    bases = _base_tables(df_merged_VMUT)
+
+    plans = {}
+    for spec in specs:
+        plan_key = (spec.get('base', 'vmut'), spec['entity'], spec.get('fluid') is not None)
+        plans.setdefault(plan_key, []).append(spec)
+
+    results = {}
+    for (base, entity, by_fluid), plan_specs in plans.items():
+        df = bases[base]
+        keys = ENTITY_KEYS[entity] + (['tipopozoNEW'] if by_fluid else [])
+
+        columns = {}
+        aggregations = {}
+        for spec in plan_specs:
+            values = df[spec['metric']]
+            mask = values.notna()
+            if spec.get('year_from') is not None:
+                mask &= df['start_year'] >= spec['year_from']
+            if spec.get('positive'):
+                mask &= values > 0
+            columns[spec['id']] = values.where(mask)
+            aggregations[spec['id']] = (spec['id'], AGGREGATIONS[spec['agg']])
+
+        with_frac_summary = entity == 'well' and any(spec.get('frac_summary') for spec in plan_specs)
+        if with_frac_summary:
+            aggregations.update(
+                cantidad_fracturas=('cantidad_fracturas', 'median'),
+                longitud_rama_horizontal_m=('longitud_rama_horizontal_m', 'median'),
+                arena_bombeada_nacional_tn=('arena_bombeada_nacional_tn', 'sum'),
+                arena_bombeada_importada_tn=('arena_bombeada_importada_tn', 'sum'),
+            )
+            for column in ['cantidad_fracturas', 'longitud_rama_horizontal_m',
+                           'arena_bombeada_nacional_tn', 'arena_bombeada_importada_tn']:
+                columns[column] = df[column]
+
+        frame = pd.concat([df[keys], pd.DataFrame(columns, index=df.index)], axis=1)
+        grouped = frame.groupby(keys).agg(**aggregations).reset_index()
+        if with_frac_summary:
+            grouped['fracspacing'] = grouped['longitud_rama_horizontal_m'] / grouped['cantidad_fracturas']
+            grouped['agente_etapa'] = (
+                grouped['arena_bombeada_nacional_tn'] + grouped['arena_bombeada_importada_tn']
+            ) / grouped['cantidad_fracturas']
+
+        for spec in plan_specs:
+            table = grouped
+            if by_fluid:
+                table = table[table['tipopozoNEW'] == spec['fluid']]
+            table = table[table[spec['id']].notna()]
+            ascending = spec.get('ascending', spec['agg'] == 'min')
+            top = (
+                table.sort_values(['start_year', spec['id']], ascending=[True, ascending], kind='mergesort')
+                .groupby('start_year')
+                .head(spec.get('top_k', 3))
+            )
+            results[spec['id']] = _format_ranking(top, spec)
+
+    return results
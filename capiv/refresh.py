@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from capiv.operators import add_operator_names
+from capiv.pipeline import PRODUCTION_COLUMNS, add_production_rates, read_frac, update_production_rates
+from capiv.precompute import precompute
+from capiv.report import DEFAULT_CACHE_DIR
+from capiv.snapshot_store import changed_rows, record_snapshot
+from capiv.sources import frac_url, production_url
+from capiv.tables import TABLE_CACHE_ENV
+
+# Scheduled refresh of the official datasets, outside the app's request threads.
+#
+#   CAPIV_TABLE_CACHE=/var/cache/capiv python -m capiv.refresh --data-dir /var/lib/capiv/datos
+#
+# The consolidated data only changes around the official close in the middle
+# of each month (see the main page); the in-progress month is updated more
+# often but matters less. The source is therefore polled every CLOSE_INTERVAL
+# inside the close window and every BASE_INTERVAL outside it, doubling the
+# wait after every poll without changes (up to MAX_INTERVAL, and never past
+# the start of the next window).
+#
+# Polls are conditional GETs (ETag / Last-Modified), so an unchanged dataset
+# costs one 304. A new production file is ingested incrementally: only the
+# months whose digest changed are compared and the added or revised rows go
+# through update_production_rates; removed rows fall back to a full rebuild.
+# The new snapshot is recorded in CAPIV_SNAPSHOT_DIR (when set) and every page
+# artifact is precomputed (capiv.precompute) before the next poll.
+
+# Days of the month of the official close
+CLOSE_WINDOW = (10, 20)
+
+CLOSE_INTERVAL = 15 * 60
+BASE_INTERVAL = 60 * 60
+MAX_INTERVAL = 12 * 60 * 60
+
+# Local copies of the datasets and their HTTP validators, inside --data-dir
+PRODUCTION_FILE = 'production.csv'
+FRAC_FILE = 'frac.csv'
+STATE_FILE = 'refresh-state.json'
+
+
+def in_close_window(now):
+    return CLOSE_WINDOW[0] <= now.day <= CLOSE_WINDOW[1]
+
+
+# Seconds until the next close window opens
+def seconds_until_window(now):
+    start = now.replace(day=CLOSE_WINDOW[0], hour=0, minute=0, second=0, microsecond=0)
+    if now >= start:
+        start = (start.replace(day=1) + timedelta(days=32)).replace(day=CLOSE_WINDOW[0])
+    return (start - now).total_seconds()
+
+
+# Wait before the next poll after `unchanged_polls` polls without changes
+def poll_interval(now, unchanged_polls=0):
+    if in_close_window(now):
+        return CLOSE_INTERVAL
+    delay = min(BASE_INTERVAL * 2 ** min(unchanged_polls, 16), MAX_INTERVAL)
+    return max(min(delay, seconds_until_window(now)), 1)
+
+
+# Download `url` into `target` unless it has not changed since `validators`
+# ({'etag', 'last_modified'}); returns (changed, validators)
+def fetch_if_changed(url, target, validators=None):
+    validators = validators or {}
+    headers = {}
+    if os.path.exists(target):
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response, f)
+            os.replace(tmp_path, target)
+            return True, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return False, validators
+        raise
+
+
+class RefreshDaemon:
+
+    def __init__(self, data_dir, cache_dir=DEFAULT_CACHE_DIR, workers=None):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.production_path = os.path.join(data_dir, PRODUCTION_FILE)
+        self.frac_path = os.path.join(data_dir, FRAC_FILE)
+        # Raw and derived production of the last ingested file
+        self.raw = None
+        self.production = None
+        self.unchanged_polls = 0
+        self.last_status = None
+        self._stop = threading.Event()
+        os.makedirs(data_dir, exist_ok=True)
+        self.state = self._read_state()
+
+    def _read_state(self):
+        try:
+            with open(os.path.join(self.data_dir, STATE_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self):
+        path = os.path.join(self.data_dir, STATE_FILE)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(f"{path}.tmp", path)
+
+    # Derived production frame for the file on disk, updated incrementally from the previous one
+    def ingest_production(self):
+        raw = pd.read_csv(self.production_path, usecols=PRODUCTION_COLUMNS)
+        record_snapshot(raw, 'produccion')
+
+        if self.raw is not None:
+            changes, removed = changed_rows(self.raw, raw)
+            if not removed:
+                self.production = add_operator_names(update_production_rates(self.production, changes))
+                self.raw = raw
+                return 'incremental', len(changes)
+
+        self.production = add_operator_names(add_production_rates(raw.copy()))
+        self.raw = raw
+        return 'completa', len(raw)
+
+    # One poll of both datasets; ingests and precomputes if any of them changed
+    def poll(self):
+        changed = {}
+        for name, url, target in (
+            ('produccion', production_url(), self.production_path),
+            ('fractura', frac_url(), self.frac_path),
+        ):
+            changed[name], self.state[name] = fetch_if_changed(url, target, self.state.get(name))
+        self.state['last_poll'] = datetime.now().isoformat(timespec='seconds')
+
+        # First poll of this process: the derived frame has to be built even if nothing changed
+        if self.production is None:
+            changed['produccion'] = True
+
+        if not any(changed.values()):
+            self.unchanged_polls += 1
+            self._write_state()
+            return None
+
+        self.unchanged_polls = 0
+        if changed['produccion']:
+            mode, rows = self.ingest_production()
+            print(f"{_timestamp()} producción: ingesta {mode} ({rows:,} filas)")
+        if changed['fractura']:
+            record_snapshot(read_frac(self.frac_path), 'fractura')
+
+        self.last_status = precompute(
+            self.production_path, self.frac_path, self.cache_dir, self.workers, production=self.production
+        )
+        self.state['snapshot'] = self.last_status['snapshot']
+        self._write_state()
+        print(f"{_timestamp()} {self.last_status['snapshot']}: {self.last_status['state']} "
+              f"en {self.last_status['seconds']} s")
+        return self.last_status
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # A failed poll (download, truncated CSV, store, precompute)
+                # must not end the thread: the next poll downloads both files
+                # again and ingests from scratch
+                print(f"{_timestamp()} error al actualizar: {e}")
+                traceback.print_exc()
+                self.raw = None
+                self.production = None
+                for name in ('produccion', 'fractura'):
+                    self.state.pop(name, None)
+            delay = poll_interval(datetime.now(), self.unchanged_polls)
+            self._stop.wait(delay)
+
+    # Run the scheduler on a daemon thread (e.g. next to the readiness server)
+    def start(self):
+        thread = threading.Thread(target=self.run, name='capiv-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def _timestamp():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualización programada de los datasets oficiales")
+    parser.add_argument('--data-dir', required=True, help="carpeta para las copias locales de los CSV")
+    parser.add_argument('--cache-dir', default=os.environ.get(TABLE_CACHE_ENV, DEFAULT_CACHE_DIR))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--once', action='store_true', help="una sola revisión y salir")
+    args = parser.parse_args()
+
+    daemon = RefreshDaemon(args.data_dir, args.cache_dir, args.workers)
+    if args.once:
+        daemon.poll()
+        return
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == '__main__':
+    main()
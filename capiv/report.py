@@ -0,0 +1,269 @@
+import argparse
+import html
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+import plotly.io as pio
+
+from capiv.headless import local_sources, page_errors, page_outputs, run_page
+from capiv.operators import add_operator_names
+from capiv.pipeline import PRODUCTION_COLUMNS, add_production_rates, read_frac
+from capiv.snapshot import snapshot_id
+from capiv.tables import TABLE_CACHE_ENV
+
+# Headless batch renderer for the weekly management report set.
+#
+#   python -m capiv.report --production production.csv --frac frac.csv --out reports/2025-03
+#
+# Every report is a page script run with streamlit's AppTest from a stored
+# snapshot (local production + frac CSVs); its headings, metrics, tables and
+# Plotly figures are written to a static HTML file (and PNGs with --png, which
+# needs kaleido). Reports run in parallel on a process pool. The production
+# frame and the frac report tables are computed once per snapshot and kept in
+# the cache directory, so workers (and later runs) only read them.
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'capiv-report-cache')
+
+# Page-level reports: (name, page number, title, keyed widget values)
+REPORTS = [
+    ('produccion', '1', "Reporte de Producción No Convencional", {}),
+    ('ranking', '5', "Ranking", {}),
+    ('fracdata-actividad', '6', "FracData: Indicadores de Actividad", {'frac_report_tab': "Indicadores de Actividad"}),
+    ('fracdata-completacion', '6', "FracData: Estrategia de Completación", {'frac_report_tab': "Estrategia de Completación"}),
+    ('fracdata-productividad', '6', "FracData: Productividad", {'frac_report_tab': "Productividad"}),
+]
+
+# Per-company report: the Production Analysis page with the company selected
+COMPANY_PAGE = '2'
+COMPANY_WIDGET = "Seleccione la empresa"
+
+# Pages that use the shared frac report tables (capiv.tables)
+FRAC_PAGES = {'5', '6', '8'}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; font-size: 0.85em; }}
+th, td {{ border: 1px solid #ccc; padding: 0.25em 0.5em; }}
+.metric {{ display: inline-block; margin-right: 2em; }}
+.metric b {{ display: block; font-size: 1.6em; }}
+.error {{ color: #C0392B; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Snapshot {snapshot} · generado {generated}</p>
+{body}
+</body>
+</html>
+"""
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+# Streamlit markdown -> small HTML subset (colors dropped, bold kept)
+def _markdown_to_html(text):
+    text = re.sub(r':[a-z]+\[(.*?)\]', r'\1', text)
+    text = html.escape(text)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+    return re.sub(r'`(.+?)`', r'\1', text)
+
+
+# Production frame as the main page keeps it in session_state
+def load_production(production_path):
+    df = pd.read_csv(production_path, usecols=PRODUCTION_COLUMNS)
+    return add_operator_names(add_production_rates(df))
+
+
+@lru_cache(maxsize=1)
+def _session_frame(session_path):
+    return pd.read_pickle(session_path)
+
+
+def _write_report(report_dir, title, snapshot, outputs, errors, png):
+    os.makedirs(report_dir, exist_ok=True)
+    body = [f'<p class="error">{html.escape(error)}</p>' for error in errors]
+    png_errors = []
+    figure_count = 0
+
+    for kind, value in outputs:
+        if kind == 'heading':
+            body.append(f"<h2>{_markdown_to_html(value)}</h2>")
+        elif kind == 'text':
+            body.append(f"<p>{_markdown_to_html(value)}</p>")
+        elif kind == 'metric':
+            label, metric = value
+            body.append(f'<div class="metric">{_markdown_to_html(label)}<b>{html.escape(str(metric))}</b></div>')
+        elif kind == 'table':
+            body.append(value.to_html(index=False, na_rep=''))
+        elif kind == 'figure':
+            figure_count += 1
+            fig = pio.from_json(value)
+            body.append(pio.to_html(fig, full_html=False, include_plotlyjs=False))
+            if png:
+                try:
+                    fig.write_image(os.path.join(report_dir, f"figura-{figure_count:02d}.png"))
+                except (ValueError, ImportError) as e:
+                    png_errors.append(str(e))
+
+    with open(os.path.join(report_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(
+            title=html.escape(title),
+            snapshot=html.escape(snapshot),
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            body='\n'.join(body),
+        ))
+
+    return figure_count, png_errors
+
+
+# Worker: run one page script and write its static report
+def _render_task(task, snapshot, session_path, production_path, frac_path, out_dir, cache_dir, png):
+    os.environ[TABLE_CACHE_ENV] = cache_dir
+    start = time.perf_counter()
+
+    session_state = dict(task['session'], df=_session_frame(session_path).copy(), snapshot_id=snapshot)
+    with local_sources(production_path, frac_path):
+        at = run_page(task['page'], session_state, task['widgets'])
+
+    outputs = page_outputs(at)
+    errors = page_errors(at)
+    figure_count, png_errors = _write_report(
+        os.path.join(out_dir, task['name']), task['title'], snapshot, outputs, errors, png
+    )
+
+    return {
+        'name': task['name'],
+        'title': task['title'],
+        'seconds': round(time.perf_counter() - start, 2),
+        'figures': figure_count,
+        'tables': sum(kind == 'table' for kind, _ in outputs),
+        'errors': errors + sorted(set(png_errors)),
+    }
+
+
+def build_tasks(df, companies=10):
+    tasks = [
+        {'name': name, 'page': page, 'title': title, 'session': session, 'widgets': []}
+        for name, page, title, session in REPORTS
+    ]
+
+    # Companies with the most wells first (or every company)
+    well_count = df.groupby('empresa')['sigla'].nunique().sort_values(ascending=False)
+    names = well_count.index if companies is None else well_count.index[:companies]
+    for company in names:
+        tasks.append({
+            'name': f"empresa-{_slug(company)}",
+            'page': COMPANY_PAGE,
+            'title': f"Análisis de Producción: {company}",
+            'session': {},
+            'widgets': [(COMPANY_WIDGET, company)],
+        })
+    return tasks
+
+
+def _write_index(out_dir, snapshot, results, seconds):
+    rows = '\n'.join(
+        f'<tr><td><a href="{r["name"]}/index.html">{html.escape(r["title"])}</a></td>'
+        f'<td>{r["figures"]}</td><td>{r["tables"]}</td><td>{r["seconds"]}</td>'
+        f'<td class="error">{html.escape("; ".join(r["errors"]))}</td></tr>'
+        for r in results
+    )
+    body = (
+        f"<p>{len(results)} reportes en {seconds:.1f} s</p>"
+        "<table><tr><th>Reporte</th><th>Figuras</th><th>Tablas</th><th>Segundos</th><th>Errores</th></tr>"
+        f"{rows}</table>"
+    )
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(
+            title="Reportes Capítulo IV",
+            snapshot=html.escape(snapshot),
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            body=body,
+        ))
+    with open(os.path.join(out_dir, 'reports.json'), 'w', encoding='utf-8') as f:
+        json.dump({'snapshot': snapshot, 'seconds': round(seconds, 2), 'reports': results}, f, ensure_ascii=False, indent=2)
+
+
+def render_reports(production_path, frac_path, out_dir, companies=10, workers=None,
+                   png=False, cache_dir=DEFAULT_CACHE_DIR):
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if png and importlib.util.find_spec('kaleido') is None:
+        print("kaleido no está instalado: se generan sólo los HTML")
+        png = False
+
+    df = load_production(production_path)
+    production_snapshot = snapshot_id(df)
+    snapshot = f"{production_snapshot}+{snapshot_id(read_frac(frac_path))}"
+    session_path = os.path.join(cache_dir, f"session-{production_snapshot}.pkl")
+    if not os.path.exists(session_path):
+        df.to_pickle(session_path)
+
+    tasks = build_tasks(df, companies)
+    frac_tasks = [t for t in tasks if t['page'] in FRAC_PAGES]
+    other_tasks = [t for t in tasks if t['page'] not in FRAC_PAGES]
+    args = (production_snapshot, session_path, production_path, frac_path, out_dir, cache_dir, png)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # The first frac report computes and stores the shared tables while the
+        # other pages run; the remaining frac reports then only read them.
+        first = [pool.submit(_render_task, t, *args) for t in frac_tasks[:1] + other_tasks]
+        if first and frac_tasks:
+            first[0].result()
+        rest = [pool.submit(_render_task, t, *args) for t in frac_tasks[1:]]
+        results = [future.result() for future in first + rest]
+
+    order = {t['name']: i for i, t in enumerate(tasks)}
+    results.sort(key=lambda r: order[r['name']])
+    _write_index(out_dir, snapshot, results, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los reportes estáticos (HTML/PNG) de los tableros")
+    parser.add_argument('--production', required=True, help="CSV de producción del snapshot")
+    parser.add_argument('--frac', required=True, help="CSV de fractura del snapshot")
+    parser.add_argument('--out', required=True, help="carpeta de salida")
+    parser.add_argument('--companies', default='10', help="cantidad de empresas (por pozos) o 'all'")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--png', action='store_true', help="exportar también las figuras a PNG (requiere kaleido)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    results = render_reports(
+        args.production,
+        args.frac,
+        args.out,
+        companies=None if args.companies == 'all' else int(args.companies),
+        workers=args.workers,
+        png=args.png,
+        cache_dir=args.cache_dir,
+    )
+    for result in results:
+        status = 'ERROR' if result['errors'] else 'ok'
+        print(f"{result['name']:<40} {result['seconds']:>7.2f}s  {status}")
+
+
+if __name__ == '__main__':
+    # AppTest runs the page scripts as __main__ inside the workers, so the pool
+    # must reference the tasks through the importable module
+    from capiv.report import main
+    main()
@@ -0,0 +1,129 @@
+import bisect
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Server-side search over the well siglas, so the pickers only send the top
+# matches to the browser instead of every sigla.
+#
+# Siglas are normalized to upper-case letters and digits ('YPF.Nq.LLL-1(h)' ->
+# 'YPFNQLLL1H'). Prefix search covers the whole sigla and every part after a
+# separator ('LLL-1', '1(h)'): those keys are kept sorted, so the matches of a
+# prefix are one contiguous range found by binary search (a flattened trie).
+# When the prefixes give fewer than `limit` results, the rest are filled with
+# fuzzy matches ranked by the trigrams they share with the query (Jaccard).
+
+DEFAULT_LIMIT = 20
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    return re.sub(r'[^0-9A-Z]', '', str(text).upper())
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SiglaIndex:
+
+    def __init__(self, siglas):
+        self.siglas = pd.Index(pd.unique(pd.Series(siglas).dropna())).sort_values()
+        keys = [normalize(s) for s in self.siglas]
+
+        # Prefix keys: the sigla and every part that starts after a separator
+        entries = set()
+        for position, sigla in enumerate(self.siglas):
+            for part in re.finditer(r'[0-9A-Za-z]+', str(sigla)):
+                entries.add((normalize(str(sigla)[part.start():]), position))
+        entries = sorted(entries)
+        self._prefix_keys = [key for key, _ in entries]
+        self._prefix_positions = np.array([position for _, position in entries], dtype=np.int64)
+        self._lengths = np.array([len(key) for key in keys], dtype=np.int64)
+
+        # Trigram postings: trigram -> positions of the siglas containing it
+        postings = defaultdict(list)
+        for position, key in enumerate(keys):
+            for gram in _trigrams(key):
+                postings[gram].append(position)
+        self._postings = {gram: np.array(p, dtype=np.int64) for gram, p in postings.items()}
+        self._gram_counts = np.array([len(_trigrams(key)) for key in keys], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.siglas)
+
+    # Boolean mask over the index of the siglas in `allowed` (None = all)
+    def _allowed_mask(self, allowed):
+        if allowed is None:
+            return None
+        mask = np.zeros(len(self.siglas), dtype=bool)
+        positions = self.siglas.get_indexer(pd.Index(allowed))
+        mask[positions[positions >= 0]] = True
+        return mask
+
+    def _prefix_matches(self, key):
+        start = bisect.bisect_left(self._prefix_keys, key)
+        end = bisect.bisect_left(self._prefix_keys, key + '\x7f')
+        positions = pd.unique(self._prefix_positions[start:end])
+        # Shortest (closest) siglas first
+        return positions[np.lexsort((positions, self._lengths[positions]))]
+
+    def _fuzzy_matches(self, key):
+        grams = _trigrams(key)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return np.array([], dtype=np.int64)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.siglas))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(grams) + self._gram_counts[candidates] - shared[candidates])
+        keep = similarity >= MIN_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        return candidates[np.lexsort((candidates, -similarity))]
+
+    # Up to `limit` siglas matching the query: prefix matches first, then
+    # fuzzy ones; an empty query lists the first siglas. `allowed` restricts
+    # the results to some siglas (e.g. the wells of a company).
+    def search(self, query, limit=DEFAULT_LIMIT, allowed=None):
+        mask = self._allowed_mask(allowed)
+        key = normalize(query or '')
+        if not key:
+            positions = np.arange(len(self.siglas)) if mask is None else np.flatnonzero(mask)
+            return self.siglas[positions[:limit]].tolist()
+
+        results = []
+        for positions in (self._prefix_matches(key), self._fuzzy_matches(key)):
+            if mask is not None:
+                positions = positions[mask[positions]]
+            seen = set(results)
+            results.extend(p for p in positions[:limit] if p not in seen)
+            if len(results) >= limit:
+                break
+        return self.siglas[results[:limit]].tolist()
+
+
+# One index per snapshot, shared by every session
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_sigla_index(snapshot, _siglas):
+    return SiglaIndex(_siglas)
+
+
+# Search box + selectbox with only the top matches of the query
+def sigla_selectbox(index, label, allowed=None, key='sigla', container=st, limit=DEFAULT_LIMIT):
+    query = container.text_input("Buscar sigla", key=f"{key}_buscar", placeholder="p. ej. LLL-1023")
+    return container.selectbox(label, index.search(query, limit, allowed), key=key)
+
+
+# Search box + multiselect: the options are the top matches of the query plus
+# the wells already chosen, which are kept in session_state[key] while the
+# query changes
+def sigla_multiselect(index, label, allowed=None, key='siglas', container=st, limit=DEFAULT_LIMIT):
+    chosen = st.session_state.setdefault(key, [])
+    query = container.text_input("Buscar sigla", key=f"{key}_buscar", placeholder="p. ej. LLL-1023")
+    options = list(dict.fromkeys(chosen + index.search(query, limit, allowed)))
+    chosen = container.multiselect(label, options, default=chosen)
+    st.session_state[key] = chosen
+    return chosen
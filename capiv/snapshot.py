@@ -0,0 +1,17 @@
+import pandas as pd
+
+# Columns that identify a production snapshot: if any of these change, every
+# derived table and figure built from the snapshot has to be rebuilt
+FINGERPRINT_COLUMNS = ['sigla', 'anio', 'mes', 'prod_pet', 'prod_gas', 'prod_agua', 'tef']
+
+
+# Deterministic id for a loaded dataset, shared by every session that loaded the same data
+def snapshot_id(df):
+    if df.empty:
+        return 'empty'
+    if set(FINGERPRINT_COLUMNS) <= set(df.columns):
+        columns = FINGERPRINT_COLUMNS
+    else:
+        columns = list(df.columns)
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return f"{len(df):x}-{int(row_hashes.sum()) & 0xFFFFFFFFFFFFFFFF:016x}"
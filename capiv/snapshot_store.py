@@ -0,0 +1,512 @@
+import argparse
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock between writers
+    fcntl = None
+
+from capiv.pipeline import FRAC_COLUMNS, FRAC_KEY, PRODUCTION_COLUMNS, PRODUCTION_KEY, read_frac
+from capiv.snapshot import snapshot_id
+
+# On-disk history of a dataset (production or frac), one entry per fetch.
+#
+# The first snapshot is stored in full (base/); every later one only as a delta
+# against its predecessor: the added or revised rows (delta-NNNN/) and the keys
+# of the removed rows (delete-NNNN/). Rows are identified by the dataset key
+# (sigla/anio/mes for production, id_base_fractura_adjiv for frac). All of them
+# are parquet datasets partitioned by month (anio=YYYY/mes=M/), so a query for
+# a date range only opens the files of those months and a column list is read
+# as such (projection pushdown). For each snapshot the manifest keeps a digest
+# per month partition, built from the row hashes, and a small per-well index,
+# so:
+#
+# - diff() only reconstructs the months whose digest changed and compares their
+#   row hashes by key, listing added, removed and revised months, wells and rows;
+# - as_of() / load() rebuild any past snapshot from the base plus its deltas;
+# - query() / recent() read a month range or the latest months only.
+#
+#   python -m capiv.snapshot_store --store snapshots/produccion add produccion.csv
+#   python -m capiv.snapshot_store --store snapshots/fractura add fractura.csv --dataset fractura
+#   python -m capiv.snapshot_store --store snapshots/produccion diff
+#   python -m capiv.snapshot_store --store snapshots/produccion query --start 2024-07 --columns sigla prod_pet --out out.csv
+#   python -m capiv.snapshot_store --store snapshots/produccion as-of 2025-03-01 --out produccion-marzo.csv
+
+SNAPSHOT_DIR_ENV = 'CAPIV_SNAPSHOT_DIR'
+
+# Stored datasets (one store per subdirectory of CAPIV_SNAPSHOT_DIR): columns and key
+DATASETS = {
+    'produccion': (PRODUCTION_COLUMNS, PRODUCTION_KEY),
+    'fractura': (FRAC_COLUMNS, FRAC_KEY),
+}
+
+# Every dataset has them; diffs are counted per month and per well
+DESCRIBE_COLUMNS = ['sigla', 'anio', 'mes']
+
+MANIFEST = 'manifest.json'
+BASE_DIR = 'base'
+LOCK_FILE = '.lock'
+
+
+def _month(anio, mes):
+    return f"{int(anio):04d}-{int(mes):02d}"
+
+
+def _month_labels(df):
+    return df['anio'].astype(str).str.zfill(4) + '-' + df['mes'].astype(str).str.zfill(2)
+
+
+# Same dtypes on every fetch (pandas may infer int or float for the same
+# column), so unchanged rows keep their hash. Rows without anio/mes go to the
+# 0000-00 partition.
+def _normalize(df):
+    df = df.copy()
+    for column in df.columns:
+        if column in ('anio', 'mes'):
+            df[column] = df[column].astype('float64').fillna(0).astype('int64')
+        elif pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].astype('float64')
+        else:
+            df[column] = df[column].astype(object)
+    return df
+
+
+# One uint64 per row over all stored columns
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False)
+
+
+# {'2024-01': [rows, digest], ...}: order-independent digest of each month
+def partition_digests(df, hashes=None):
+    hashes = row_hashes(df) if hashes is None else hashes
+    grouped = hashes.groupby([df['anio'], df['mes']])
+    digests = grouped.sum().astype('uint64')
+    counts = grouped.size()
+    return {
+        _month(anio, mes): [int(counts[(anio, mes)]), f"{int(digest):016x}"]
+        for (anio, mes), digest in digests.items()
+    }
+
+
+def _changed_months(old_parts, new_parts):
+    return sorted(
+        month for month in set(old_parts) | set(new_parts)
+        if old_parts.get(month) != new_parts.get(month)
+    )
+
+
+# Key-by-key comparison of two frames: one row per added, removed or revised
+# key with its 'cambio', its index in `new` (not for removed keys) and its
+# sigla/anio/mes in `new` and, suffixed '_old', in `old`
+def _compare_rows(old, new, key):
+    describe = [column for column in DESCRIBE_COLUMNS if column not in key]
+    merged = new[[*key, *describe]].assign(_new=row_hashes(new).to_numpy(), _row=new.index).merge(
+        old[[*key, *describe]].assign(_old=row_hashes(old).to_numpy()),
+        on=key, how='outer', suffixes=('', '_old'), indicator=True
+    )
+    merged = merged[(merged['_merge'] != 'both') | (merged['_new'] != merged['_old'])].copy()
+    merged['cambio'] = merged['_merge'].map(
+        {'left_only': 'agregado', 'right_only': 'eliminado', 'both': 'revisado'}
+    ).astype(object)
+    for column in DESCRIBE_COLUMNS:
+        if column not in describe:
+            merged[f"{column}_old"] = merged[column]
+    return merged.drop(columns=['_new', '_old', '_merge'])
+
+
+# Rows of the fetched frame `new` that are added or revised against `old` and
+# the number of keys removed from it. Only the months whose digest changed are
+# compared row by row.
+def changed_rows(old, new, key=PRODUCTION_KEY):
+    old_rows, new_rows = _normalize(old.reset_index(drop=True)), _normalize(new.reset_index(drop=True))
+    changed = _changed_months(partition_digests(old_rows), partition_digests(new_rows))
+    changes = _compare_rows(
+        old_rows[_month_labels(old_rows).isin(changed)], new_rows[_month_labels(new_rows).isin(changed)], key
+    )
+    upserts = changes.loc[changes['cambio'] != 'eliminado', '_row'].astype('int64')
+    return new.iloc[upserts.to_numpy()], int((changes['cambio'] == 'eliminado').sum())
+
+
+def _month_filters(months):
+    return [[('anio', '==', int(m[:4])), ('mes', '==', int(m[5:]))] for m in months]
+
+
+# '2024-07', '2024-07-15', date or Timestamp -> '2024-07'
+def _as_month(value):
+    return pd.Timestamp(value).strftime('%Y-%m')
+
+
+def _write_partitioned(df, path):
+    if df.empty:
+        return
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False), path, partition_cols=['anio', 'mes']
+    )
+
+
+# Rows of a month-partitioned dataset: only the files of `months` (None = all)
+# are opened and only `columns` (None = all) are read. None if nothing stored.
+def _read_partitioned(path, months=None, columns=None):
+    if not os.path.isdir(path) or (months is not None and not months):
+        return None
+    table = pq.read_table(
+        path,
+        columns=columns,
+        filters=None if months is None else _month_filters(months),
+        partitioning='hive',
+    )
+    return table.to_pandas()
+
+
+# Changes between two snapshots of the store
+class SnapshotDiff:
+
+    def __init__(self, old, new, rows, months, wells):
+        self.old = old
+        self.new = new
+        # key, sigla, anio, mes, cambio ('agregado' | 'eliminado' | 'revisado')
+        self.rows = rows
+        # anio, mes, cambio, agregados, eliminados, revisados
+        self.months = months
+        # sigla, cambio, agregados, eliminados, revisados
+        self.wells = wells
+
+    @property
+    def empty(self):
+        return self.rows.empty
+
+    def summary(self):
+        return {
+            'old': self.old,
+            'new': self.new,
+            'rows': self.rows['cambio'].value_counts().to_dict(),
+            'months': self.months['cambio'].value_counts().to_dict(),
+            'wells': self.wells['cambio'].value_counts().to_dict(),
+        }
+
+
+def _count_changes(rows, by):
+    counts = pd.crosstab([rows[c] for c in by], rows['cambio'])
+    for column in ('agregado', 'eliminado', 'revisado'):
+        if column not in counts:
+            counts[column] = 0
+    return counts[['agregado', 'eliminado', 'revisado']].rename(
+        columns={'agregado': 'agregados', 'eliminado': 'eliminados', 'revisado': 'revisados'}
+    ).rename_axis(columns=None).reset_index()
+
+
+class SnapshotStore:
+
+    def __init__(self, root, columns=PRODUCTION_COLUMNS, key=PRODUCTION_KEY):
+        self.root = root
+        self.columns = list(columns)
+        self.key = list(key)
+        os.makedirs(root, exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read_manifest(self):
+        path = self._path(MANIFEST)
+        if not os.path.exists(path):
+            return {'columns': self.columns, 'key': self.key, 'snapshots': []}
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.columns = manifest['columns']
+        self.key = manifest['key']
+        return manifest
+
+    def _write_manifest(self):
+        tmp_path = self._path(f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self._path(MANIFEST))
+
+    # Exclusive lock of the store between writers (the app's request threads,
+    # capiv.refresh, the CLI), held from reading the manifest to replacing it
+    @contextmanager
+    def _write_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return len(self._manifest['snapshots'])
+
+    # id, fetched_at, rows, wells and delta sizes of every stored snapshot
+    def snapshots(self):
+        return pd.DataFrame(
+            [{k: v for k, v in entry.items() if k != 'partitions'} for entry in self._manifest['snapshots']],
+            columns=['id', 'fetched_at', 'rows', 'wells', 'upserts', 'deletes'],
+        )
+
+    def latest(self):
+        snapshots = self._manifest['snapshots']
+        return snapshots[-1]['id'] if snapshots else None
+
+    # Latest position of a snapshot id (the same data can be fetched again later)
+    def _entry(self, snapshot):
+        snapshots = self._manifest['snapshots']
+        for seq in range(len(snapshots) - 1, -1, -1):
+            if snapshots[seq]['id'] == snapshot:
+                return seq, snapshots[seq]
+        raise KeyError(f"Snapshot {snapshot} no está en {self.root}")
+
+    # Store a fetched frame; returns its snapshot id (no-op if it is the same
+    # data as the latest snapshot)
+    def add(self, df, fetched_at=None):
+        with self._write_lock():
+            # Another writer may have added snapshots since the store was opened
+            self._manifest = self._read_manifest()
+            return self._add(df, fetched_at)
+
+    def _add(self, df, fetched_at):
+        df = df.reindex(columns=self.columns).drop_duplicates(self.key, keep='last')
+        df = _normalize(df.reset_index(drop=True))
+        new_id = snapshot_id(df)
+        if new_id == self.latest():
+            return new_id
+
+        entry = {
+            'id': new_id,
+            'fetched_at': (fetched_at or datetime.now(timezone.utc)).isoformat(timespec='seconds'),
+            'rows': len(df),
+            'wells': int(df['sigla'].nunique()),
+            'partitions': partition_digests(df),
+        }
+        seq = len(self)
+
+        if seq == 0:
+            _write_partitioned(df, self._path(BASE_DIR))
+            entry.update(upserts=len(df), deletes=0)
+        else:
+            # Only the months whose digest changed are compared row by row
+            changed = _changed_months(self._manifest['snapshots'][-1]['partitions'], entry['partitions'])
+            old = self.load(self.latest(), months=changed)
+            changes = _compare_rows(old, df[_month_labels(df).isin(changed)], self.key)
+
+            upserts = df.loc[changes.loc[changes['cambio'] != 'eliminado', '_row'].astype('int64')]
+            # Removed keys, and revised keys that moved to another month, are
+            # deleted from the partition they were in
+            moved = (changes['cambio'] == 'revisado') & (
+                (changes['anio'] != changes['anio_old']) | (changes['mes'] != changes['mes_old'])
+            )
+            removed = changes[(changes['cambio'] == 'eliminado') | moved]
+            deletes = _normalize(pd.DataFrame(
+                {column: removed[column] for column in self.key}
+                | {column: removed[f"{column}_old"] for column in DESCRIBE_COLUMNS}
+            ))
+            _write_partitioned(upserts, self._path(f"delta-{seq:04d}"))
+            _write_partitioned(deletes, self._path(f"delete-{seq:04d}"))
+            entry.update(upserts=len(upserts), deletes=len(deletes))
+
+        df[['sigla']].value_counts().rename('rows').reset_index().to_parquet(
+            self._path(f"wells-{seq:04d}.parquet"), index=False
+        )
+        self._manifest['snapshots'].append(entry)
+        self._write_manifest()
+        return new_id
+
+    # Rebuild a stored snapshot from the base and the deltas up to it, reading
+    # only `months` ('%Y-%m', None = all) and `columns` (None = all). Rows come
+    # sorted by sigla/anio/mes.
+    def load(self, snapshot=None, months=None, columns=None):
+        seq, _ = self._entry(snapshot or self.latest())
+        columns = self.columns if columns is None else list(columns)
+        read_columns = list(dict.fromkeys([*self.key, *columns]))
+
+        frames = []
+        deleted = []
+        for i in range(seq + 1):
+            upserts = _read_partitioned(self._path(f"delta-{i:04d}" if i else BASE_DIR), months, read_columns)
+            if upserts is not None and not upserts.empty:
+                frames.append(upserts.assign(_seq=i))
+            deletes = _read_partitioned(self._path(f"delete-{i:04d}"), months, self.key) if i else None
+            # A key deleted by delta i is dropped from everything before it
+            # (a key that moved month is deleted and upserted by the same delta)
+            if deletes is not None and not deletes.empty:
+                deleted.append(deletes.assign(_seq=i))
+
+        if not frames:
+            # No rows in these months: empty frame with the stored schema (the
+            # filter matches no partition, so no data file is opened)
+            frames.append(_read_partitioned(self._path(BASE_DIR), ['0000-00'], read_columns).assign(_seq=0))
+
+        df = pd.concat(frames, ignore_index=True)[[*read_columns, '_seq']]
+        df = df.drop_duplicates(self.key, keep='last')
+        if deleted:
+            deleted = pd.concat(deleted, ignore_index=True).drop_duplicates(self.key, keep='last')
+            df = df.merge(_normalize(deleted), on=self.key, how='left', suffixes=('', '_deleted'))
+            df = df[df['_seq_deleted'].isna() | (df['_seq'] >= df['_seq_deleted'])]
+
+        df = _normalize(df[read_columns]).sort_values(self.key).reset_index(drop=True)
+        return df[columns]
+
+    # Months from `start` to `end` (inclusive, None = open) of a snapshot
+    def query(self, start=None, end=None, columns=None, snapshot=None):
+        _, entry = self._entry(snapshot or self.latest())
+        start = None if start is None else _as_month(start)
+        end = None if end is None else _as_month(end)
+        months = [
+            month for month in entry['partitions']
+            if (start is None or month >= start) and (end is None or month <= end)
+        ]
+        return self.load(entry['id'], months=months, columns=columns)
+
+    # The latest `count` months of a snapshot (e.g. the in-progress allocation month)
+    def recent(self, count=1, columns=None, snapshot=None):
+        _, entry = self._entry(snapshot or self.latest())
+        return self.load(entry['id'], months=sorted(entry['partitions'])[-count:], columns=columns)
+
+    # Snapshot that was current at `when` (datetime or ISO string)
+    def snapshot_at(self, when):
+        when = pd.Timestamp(when)
+        when = when.tz_localize('UTC') if when.tzinfo is None else when
+        current = None
+        for entry in self._manifest['snapshots']:
+            if pd.Timestamp(entry['fetched_at']) <= when:
+                current = entry['id']
+        if current is None:
+            raise KeyError(f"No hay snapshots anteriores a {when}")
+        return current
+
+    def as_of(self, when, months=None, columns=None):
+        return self.load(self.snapshot_at(when), months=months, columns=columns)
+
+    def _wells(self, snapshot):
+        seq, _ = self._entry(snapshot)
+        return pd.read_parquet(self._path(f"wells-{seq:04d}.parquet"))
+
+    # Changes from `old` to `new` (default: previous and latest snapshot)
+    def diff(self, old=None, new=None):
+        snapshots = self._manifest['snapshots']
+        new = new or self.latest()
+        new_seq, new_entry = self._entry(new)
+        if old is None:
+            old = snapshots[new_seq - 1]['id'] if new_seq > 0 else new
+        _, old_entry = self._entry(old)
+
+        old_parts, new_parts = old_entry['partitions'], new_entry['partitions']
+        changed = _changed_months(old_parts, new_parts)
+        rows = _compare_rows(self.load(old, months=changed), self.load(new, months=changed), self.key)
+        # Removed rows are listed with their last sigla/anio/mes
+        removed = rows['cambio'] == 'eliminado'
+        for column in DESCRIBE_COLUMNS:
+            rows[column] = rows[column].where(~removed, rows[f"{column}_old"])
+        rows = _normalize(rows[list(dict.fromkeys([*self.key, *DESCRIBE_COLUMNS, 'cambio']))])
+        rows = rows.sort_values(self.key).reset_index(drop=True)
+
+        months = _count_changes(rows, ['anio', 'mes'])
+        months.insert(2, 'cambio', [
+            'agregado' if m not in old_parts else 'eliminado' if m not in new_parts else 'revisado'
+            for m in _month_labels(months)
+        ])
+
+        wells = _count_changes(rows, ['sigla'])
+        old_wells = set(self._wells(old)['sigla'])
+        new_wells = set(self._wells(new)['sigla'])
+        wells.insert(1, 'cambio', [
+            'agregado' if w not in old_wells else 'eliminado' if w not in new_wells else 'revisado'
+            for w in wells['sigla']
+        ])
+
+        return SnapshotDiff(old, new, rows, months, wells)
+
+
+def open_store(root, dataset):
+    columns, key = DATASETS[dataset]
+    return SnapshotStore(os.path.join(root, dataset), columns=columns, key=key)
+
+
+# (store root, dataset, snapshot id) already recorded by this process
+_recorded = set()
+
+
+# Store a fresh download ('produccion' or 'fractura') when CAPIV_SNAPSHOT_DIR
+# is set; the dashboard keeps working if the store cannot be written. With the
+# snapshot id of the frame, each snapshot is only tried once per process.
+def record_snapshot(df, dataset, snapshot=None):
+    root = os.environ.get(SNAPSHOT_DIR_ENV)
+    if not root or df.empty:
+        return None
+    if snapshot is not None:
+        if (root, dataset, snapshot) in _recorded:
+            return snapshot
+        _recorded.add((root, dataset, snapshot))
+    try:
+        return open_store(root, dataset).add(df)
+    except Exception:
+        logging.getLogger(__name__).exception("No se pudo guardar el snapshot de %s en %s", dataset, root)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de snapshots de producción (deltas + diff + as-of)")
+    parser.add_argument('--store', default=os.environ.get(SNAPSHOT_DIR_ENV), required=SNAPSHOT_DIR_ENV not in os.environ)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="agregar un CSV como nuevo snapshot")
+    add.add_argument('csv')
+    add.add_argument('--dataset', choices=list(DATASETS), default='produccion')
+    add.add_argument('--fetched-at', help="fecha de descarga (ISO), por defecto ahora")
+
+    commands.add_parser('list', help="listar los snapshots")
+
+    diff = commands.add_parser('diff', help="cambios entre dos snapshots (por defecto los dos últimos)")
+    diff.add_argument('old', nargs='?')
+    diff.add_argument('new', nargs='?')
+    diff.add_argument('--rows', action='store_true', help="listar también las filas cambiadas")
+
+    query = commands.add_parser('query', help="leer un rango de meses / columnas de un snapshot")
+    query.add_argument('--start', help="primer mes (AAAA-MM)")
+    query.add_argument('--end', help="último mes (AAAA-MM)")
+    query.add_argument('--columns', nargs='+')
+    query.add_argument('--snapshot', help="id del snapshot (por defecto el último)")
+    query.add_argument('--out', required=True, help="CSV de salida")
+
+    as_of = commands.add_parser('as-of', help="reconstruir el snapshot vigente a una fecha")
+    as_of.add_argument('when')
+    as_of.add_argument('--out', required=True, help="CSV de salida")
+
+    args = parser.parse_args()
+    dataset = getattr(args, 'dataset', 'produccion')
+    columns, key = DATASETS[dataset]
+    store = SnapshotStore(args.store, columns=columns, key=key)
+
+    if args.command == 'add':
+        fetched_at = datetime.fromisoformat(args.fetched_at) if args.fetched_at else None
+        if fetched_at is not None and fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        df = read_frac(args.csv) if dataset == 'fractura' else pd.read_csv(args.csv, usecols=store.columns)
+        print(store.add(df, fetched_at=fetched_at))
+    elif args.command == 'list':
+        print(store.snapshots().to_string(index=False))
+    elif args.command == 'diff':
+        result = store.diff(args.old, args.new)
+        print(json.dumps(result.summary(), ensure_ascii=False, indent=2))
+        print(result.months.to_string(index=False))
+        if args.rows:
+            print(result.rows.to_string(index=False))
+    elif args.command == 'query':
+        store.query(args.start, args.end, columns=args.columns, snapshot=args.snapshot).to_csv(args.out, index=False)
+    elif args.command == 'as-of':
+        store.as_of(args.when).to_csv(args.out, index=False)
+
+
+if __name__ == '__main__':
+    main()
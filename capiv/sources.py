@@ -0,0 +1,31 @@
+import os
+
+# Official dataset URLs of the Secretaría de Energía (datos.energia.gob.ar).
+#
+# CAPIV_DATA_HOST replaces the scheme + host of both URLs, keeping the paths,
+# e.g. CAPIV_DATA_HOST=http://127.0.0.1:8765 to read the datasets from the
+# local stand-in server (python -m capiv.stub_server).
+
+DATA_HOST_ENV = 'CAPIV_DATA_HOST'
+DEFAULT_DATA_HOST = 'http://datos.energia.gob.ar'
+
+PRODUCTION_PATH = (
+    "/dataset/c846e79c-026c-4040-897f-1ad3543b407c/resource/b5b58cdc-9e07-41f9-b392-fb9ec68b0725"
+    "/download/produccin-de-pozos-de-gas-y-petrleo-no-convencional.csv"
+)
+FRAC_PATH = (
+    "/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d"
+    "/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+)
+
+
+def data_host():
+    return os.environ.get(DATA_HOST_ENV, DEFAULT_DATA_HOST).rstrip('/')
+
+
+def production_url():
+    return data_host() + PRODUCTION_PATH
+
+
+def frac_url():
+    return data_host() + FRAC_PATH
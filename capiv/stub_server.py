@@ -0,0 +1,269 @@
+import argparse
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from capiv.sources import DATA_HOST_ENV, DEFAULT_DATA_HOST, FRAC_PATH, PRODUCTION_PATH
+
+# Local stand-in for datos.energia.gob.ar: serves a recorded (or synthetic)
+# production + frac CSV pair on the same paths as the official site, so the
+# pages, capiv.bench and capiv.report can download them offline.
+#
+#   python -m capiv.stub_server --data-dir bench_data/x1 --latency 200 --bandwidth 2M
+#   CAPIV_DATA_HOST=http://127.0.0.1:8765 streamlit run 1_🌎_Real-time_Production_Report.py
+#
+# Supports ETag / Last-Modified (conditional GETs answer 304), single byte
+# Range requests (206 / 416) and throttling: a fixed latency before every
+# response and a bandwidth cap for the body.
+
+DEFAULT_PORT = 8765
+CHUNK_SIZE = 64 * 1024
+
+# File names inside a data directory (same as capiv.synthetic.write_dataset)
+PRODUCTION_FILE = 'production.csv'
+FRAC_FILE = 'frac.csv'
+
+
+class DatasetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # files: {url path: local file}; latency in seconds; bandwidth in bytes/s (None = unlimited)
+    def __init__(self, address, files, latency=0.0, bandwidth=None, verbose=False):
+        super().__init__(address, DatasetHandler)
+        self.files = files
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class DatasetHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _serve(self, send_body):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        path = self.server.files.get(urlsplit(self.path).path)
+        if path is None or not os.path.exists(path):
+            self._empty_response(404)
+            return
+
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        validators = {'ETag': etag, 'Last-Modified': last_modified, 'Accept-Ranges': 'bytes'}
+
+        if self._not_modified(etag, int(stat.st_mtime)):
+            self._empty_response(304, validators)
+            return
+
+        byte_range = self._requested_range(size, etag, last_modified)
+        if byte_range == 'invalid':
+            self._empty_response(416, {'Content-Range': f"bytes */{size}"})
+            return
+
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(length))
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        for name, value in validators.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if send_body and length:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                self._send_body(f, length)
+
+    def _empty_response(self, code, headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    # (start, end) for a single satisfiable byte range, None to send the whole
+    # file (no Range, multiple ranges or a stale If-Range) or 'invalid'
+    def _requested_range(self, size, etag, last_modified):
+        header = self.headers.get('Range')
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range not in (etag, last_modified):
+            return None
+
+        first, _, last = header[len('bytes='):].strip().partition('-')
+        try:
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                # Suffix range: the last N bytes
+                start = max(size - int(last), 0)
+                end = size - 1
+        except ValueError:
+            return None
+        if start >= size or start > end:
+            return 'invalid'
+        return start, end
+
+    def _send_body(self, f, length):
+        bandwidth = self.server.bandwidth
+        chunk_size = CHUNK_SIZE if not bandwidth else max(1024, min(CHUNK_SIZE, int(bandwidth / 20)))
+        start = time.perf_counter()
+        sent = 0
+        try:
+            while sent < length:
+                chunk = f.read(min(chunk_size, length - sent))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if bandwidth:
+                    # Sleep until the bytes sent so far fit in the bandwidth cap
+                    delay = sent / bandwidth - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def dataset_files(production_path, frac_path):
+    return {PRODUCTION_PATH: os.path.abspath(production_path), FRAC_PATH: os.path.abspath(frac_path)}
+
+
+# Run the stand-in on a background thread (port 0 = any free port) and point
+# the app's dataset URLs (CAPIV_DATA_HOST) at it while the block runs
+@contextmanager
+def serve(production_path, frac_path, host='127.0.0.1', port=0, latency=0.0, bandwidth=None):
+    server = DatasetServer((host, port), dataset_files(production_path, frac_path), latency, bandwidth)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    previous = os.environ.get(DATA_HOST_ENV)
+    os.environ[DATA_HOST_ENV] = server.url
+    try:
+        yield server
+    finally:
+        if previous is None:
+            os.environ.pop(DATA_HOST_ENV, None)
+        else:
+            os.environ[DATA_HOST_ENV] = previous
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+# Download the official datasets into data_dir, to be served later
+def record(data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    for url_path, name in ((PRODUCTION_PATH, PRODUCTION_FILE), (FRAC_PATH, FRAC_FILE)):
+        target = os.path.join(data_dir, name)
+        tmp_path = f"{target}.tmp"
+        with urllib.request.urlopen(DEFAULT_DATA_HOST + url_path) as response, open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        os.replace(tmp_path, target)
+    return os.path.join(data_dir, PRODUCTION_FILE), os.path.join(data_dir, FRAC_FILE)
+
+
+# '500K', '2M', '1.5G' -> bytes per second
+def parse_rate(text):
+    if text is None:
+        return None
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().removesuffix('B')
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que reemplaza a datos.energia.gob.ar")
+    parser.add_argument('--data-dir', help=f"carpeta con {PRODUCTION_FILE} y {FRAC_FILE}")
+    parser.add_argument('--production', help="CSV de producción (en lugar de --data-dir)")
+    parser.add_argument('--frac', help="CSV de fractura (en lugar de --data-dir)")
+    parser.add_argument('--record', action='store_true', help="descargar antes los datasets oficiales en --data-dir")
+    parser.add_argument('--synthetic', type=float, help="generar antes un dataset sintético de esta escala en --data-dir")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0, help="milisegundos antes de cada respuesta")
+    parser.add_argument('--bandwidth', help="límite de ancho de banda en bytes/s (ej: 500K, 2M)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.record or args.synthetic:
+        if not args.data_dir:
+            parser.error("--record y --synthetic requieren --data-dir")
+        if args.record:
+            record(args.data_dir)
+        else:
+            from capiv.synthetic import write_dataset
+            write_dataset(args.data_dir, scale=args.synthetic)
+
+    if args.data_dir:
+        production_path = args.production or os.path.join(args.data_dir, PRODUCTION_FILE)
+        frac_path = args.frac or os.path.join(args.data_dir, FRAC_FILE)
+    elif args.production and args.frac:
+        production_path, frac_path = args.production, args.frac
+    else:
+        parser.error("indicar --data-dir o --production y --frac")
+
+    server = DatasetServer(
+        (args.host, args.port),
+        dataset_files(production_path, frac_path),
+        latency=args.latency / 1000,
+        bandwidth=parse_rate(args.bandwidth),
+        verbose=args.verbose,
+    )
+    print(f"Sirviendo {production_path} y {frac_path} en {server.url}")
+    print(f"  {DATA_HOST_ENV}={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic production + frac datasets with the same schemas as the official
+# Secretaría de Energía CSVs, used to benchmark the dashboards at 1x / 10x / 100x
+# today's well count (see capiv.bench).
+#
+#   python -m capiv.synthetic --scale 10 --out bench_data
+#
+# Wells are generated in blocks and appended to the CSVs, so 100x does not need
+# the whole dataset in memory. Every block has its own seed: the same
+# (seed, scale) always gives the same files.
+
+# Approximate number of unconventional wells in today's production dataset
+BASE_WELLS = 4500
+
+# Production months covered by the dataset (first month, last month)
+FIRST_MONTH = (2006, 1)
+LAST_MONTH = (2025, 3)
+
+# Operators as they appear in the raw data (including the aliases that the
+# pages merge into a single empresaNEW) and their share of the wells
+OPERATORS = {
+    'YPF S.A.': 0.42,
+    'VISTA ENERGY ARGENTINA SAU': 0.06,
+    'Vista Oil & Gas Argentina SA': 0.03,
+    'PAN AMERICAN ENERGY SL': 0.05,
+    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 0.03,
+    'TECPETROL S.A.': 0.07,
+    'PLUSPETROL S.A.': 0.05,
+    'SHELL ARGENTINA S.A.': 0.05,
+    'TOTAL AUSTRAL S.A.': 0.05,
+    'CHEVRON ARGENTINA S.R.L.': 0.03,
+    'PAMPA ENERGIA S.A.': 0.03,
+    'EXXONMOBIL EXPLORATION ARGENTINA S.R.L.': 0.03,
+    'WINTERSHALL DE ARGENTINA S.A.': 0.02,
+    'WINTERSHALL ENERGÍA S.A.': 0.01,
+    'PHOENIX GLOBAL RESOURCES S.A.': 0.02,
+    'CAPEX S.A.': 0.01,
+}
+
+# Areas (yacimiento) with the short code used in the sigla
+AREAS = {
+    'LOMA CAMPANA': 'LCa',
+    'LA AMARGA CHICA': 'LACh',
+    'BANDURRIA SUR': 'BaSu',
+    'BAJADA DEL PALO OESTE': 'BPO',
+    'FORTIN DE PIEDRA': 'FdP',
+    'AGUADA PICHANA ESTE': 'APE',
+    'AGUADA PICHANA OESTE': 'APO',
+    'LINDERO ATRAVESADO': 'LAt',
+    'EL OREJANO': 'EOr',
+    'CRUZ DE LORENA': 'CdL',
+    'LA CALERA': 'LCal',
+    'RINCON DE ARANDA': 'RdA',
+}
+
+# Target formations and their share of the wells
+FORMATIONS = {'VMUT': 0.88, 'LAJAS': 0.05, 'MOLLES': 0.04, 'AGRIO': 0.03}
+
+# Share of wells reported as 'Otro tipo' (reclassified later with McCain)
+OTHER_TYPE_SHARE = 0.08
+
+# Share of VMUT horizontal wells with a frac report, and of reports that are
+# loaded twice (the official frac table has duplicated siglas)
+FRAC_SHARE = 0.85
+FRAC_DUPLICATE_SHARE = 0.02
+
+PRODUCTION_COLUMNS = [
+    'idempresa', 'anio', 'mes', 'idpozo', 'prod_pet', 'prod_gas', 'prod_agua',
+    'iny_agua', 'iny_gas', 'iny_co2', 'iny_otro', 'tef', 'vida_util',
+    'tipoextraccion', 'tipoestado', 'tipopozo', 'ubicacion', 'fecha_data',
+    'empresa', 'sigla', 'formprod', 'profundidad', 'formacion',
+    'areapermisoconcesion', 'areayacimiento', 'cuenca', 'provincia',
+    'coordenadax', 'coordenaday', 'tipo_de_recurso', 'sub_tipo_recurso',
+]
+
+FRAC_COLUMNS = [
+    'id_base_fractura_adjiv', 'idpozo', 'sigla', 'cuenca', 'areapermisoconcesion',
+    'yacimiento', 'formacion_productiva', 'tipo_reservorio', 'subtipo_reservorio',
+    'longitud_rama_horizontal_m', 'cantidad_fracturas', 'tipo_terminacion',
+    'arena_bombeada_nacional_tn', 'arena_bombeada_importada_tn', 'agua_inyectada_m3',
+    'co2_inyectado_m3', 'presion_maxima_psi', 'potencia_equipos_fractura_hp',
+    'fecha_inicio_fractura', 'fecha_fin_fractura', 'fecha_data', 'anio_if', 'mes_if',
+    'anio_ff', 'mes_ff', 'anio_carga', 'mes_carga', 'empresa_informante', 'mes', 'anio',
+]
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+# Well master table (one row per well) for wells [offset, offset + n_wells)
+def generate_wells(n_wells, seed=0, offset=0):
+    rng = np.random.default_rng([seed, offset])
+    idpozo = np.arange(offset, offset + n_wells) + 100000
+
+    operators = np.array(list(OPERATORS))
+    shares = np.array(list(OPERATORS.values()))
+    empresa = rng.choice(operators, n_wells, p=shares / shares.sum())
+
+    area_names = np.array(list(AREAS))
+    area = rng.choice(area_names, n_wells)
+    area_code = np.vectorize(AREAS.get)(area)
+
+    formations = np.array(list(FORMATIONS))
+    formation_shares = np.array(list(FORMATIONS.values()))
+    formprod = rng.choice(formations, n_wells, p=formation_shares)
+
+    # Start month: activity grows towards the latest campaigns
+    first, last = _month_index(*FIRST_MONTH), _month_index(*LAST_MONTH)
+    start = last - np.minimum(rng.exponential(60, n_wells).astype(int), last - first)
+
+    # Fluid: gas wells have a high GOR and little oil
+    gas_well = rng.random(n_wells) < 0.35
+    tipopozo = np.where(gas_well, 'Gasífero', 'Petrolífero')
+    tipopozo = np.where(rng.random(n_wells) < OTHER_TYPE_SHARE, 'Otro tipo', tipopozo)
+
+    prefix = pd.Series(empresa).str.extract(r'^(\w+)')[0].str[:4].str.upper().to_numpy()
+    sigla = [
+        f"{p}.Nq.{code}-{i}(h)" for p, code, i in zip(prefix, area_code, idpozo)
+    ]
+
+    return pd.DataFrame({
+        'idpozo': idpozo,
+        'sigla': sigla,
+        'empresa': empresa,
+        'areayacimiento': area,
+        'formprod': formprod,
+        'start': start,
+        'gas_well': gas_well,
+        'tipopozo': tipopozo,
+        'qi_oil': np.where(gas_well, rng.lognormal(1.5, 0.8, n_wells), rng.lognormal(5.0, 0.6, n_wells)),
+        'gor': np.where(gas_well, rng.lognormal(9.0, 0.5, n_wells), rng.lognormal(6.3, 0.5, n_wells)),
+        'water_cut': rng.beta(2, 8, n_wells),
+        'decline': rng.uniform(0.05, 0.25, n_wells),
+        'b_factor': rng.uniform(0.8, 1.4, n_wells),
+        'lateral': rng.normal(2600, 700, n_wells).clip(50, 4500),
+        'coordenadax': rng.uniform(-69.4, -68.2, n_wells),
+        'coordenaday': rng.uniform(-38.8, -37.6, n_wells),
+        'profundidad': rng.normal(2900, 300, n_wells).round(),
+    })
+
+
+# Monthly production rows for a block of wells (one row per well and month)
+def generate_production(wells, seed=0):
+    rng = np.random.default_rng([seed, int(wells['idpozo'].iloc[0]), 1])
+    last = _month_index(*LAST_MONTH)
+
+    months = (last - wells['start'].to_numpy() + 1).astype(int)
+    row_well = np.repeat(np.arange(len(wells)), months)
+    # Months since first production, restarting at 0 for every well
+    k = np.arange(len(row_well)) - np.repeat(np.cumsum(months) - months, months)
+    month_index = wells['start'].to_numpy()[row_well] + k
+
+    w = wells.iloc[row_well]
+    n = len(row_well)
+
+    # Days on production (tef): mostly the whole month, some shut-in months
+    tef = rng.integers(26, 32, n).astype(float)
+    tef[rng.random(n) < 0.04] = 0.0
+
+    # Hyperbolic decline of the daily oil rate
+    b = w['b_factor'].to_numpy()
+    q_oil = w['qi_oil'].to_numpy() / (1 + b * w['decline'].to_numpy() * k) ** (1 / b)
+    q_oil *= rng.lognormal(0, 0.15, n)
+
+    prod_pet = (q_oil * tef).round(2)
+    prod_gas = (prod_pet * w['gor'].to_numpy() / 1000).round(2)
+    water_cut = w['water_cut'].to_numpy()
+    prod_agua = (prod_pet * water_cut / (1 - water_cut)).round(2)
+
+    anio = month_index // 12
+    mes = month_index % 12 + 1
+    formprod = w['formprod'].to_numpy()
+
+    return pd.DataFrame({
+        'idempresa': w['empresa'].map({name: i for i, name in enumerate(OPERATORS)}).to_numpy(),
+        'anio': anio,
+        'mes': mes,
+        'idpozo': w['idpozo'].to_numpy(),
+        'prod_pet': prod_pet,
+        'prod_gas': prod_gas,
+        'prod_agua': prod_agua,
+        'iny_agua': 0.0,
+        'iny_gas': 0.0,
+        'iny_co2': 0.0,
+        'iny_otro': 0.0,
+        'tef': tef,
+        'vida_util': np.nan,
+        'tipoextraccion': np.where(k < 24, 'Surgencia Natural', 'Gas Lift'),
+        'tipoestado': np.where(tef > 0, 'Extracción Efectiva', 'Parado Transitoriamente'),
+        'tipopozo': w['tipopozo'].to_numpy(),
+        'ubicacion': 'ON',
+        'fecha_data': pd.to_datetime({'year': anio, 'month': mes, 'day': 1}).dt.strftime('%Y-%m-%d').to_numpy(),
+        'empresa': w['empresa'].to_numpy(),
+        'sigla': w['sigla'].to_numpy(),
+        'formprod': formprod,
+        'profundidad': w['profundidad'].to_numpy(),
+        'formacion': np.where(formprod == 'VMUT', 'vaca muerta', formprod.astype(str)),
+        'areapermisoconcesion': w['areayacimiento'].to_numpy(),
+        'areayacimiento': w['areayacimiento'].to_numpy(),
+        'cuenca': 'NEUQUINA',
+        'provincia': 'Neuquén',
+        'coordenadax': w['coordenadax'].to_numpy(),
+        'coordenaday': w['coordenaday'].to_numpy(),
+        'tipo_de_recurso': 'NO CONVENCIONAL',
+        'sub_tipo_recurso': np.where(formprod == 'VMUT', 'SHALE', 'TIGHT'),
+    })[PRODUCTION_COLUMNS]
+
+
+# Frac reports for a block of wells (VMUT wells, some duplicated, some below the cut-offs)
+def generate_frac(wells, seed=0):
+    rng = np.random.default_rng([seed, int(wells['idpozo'].iloc[0]), 2])
+    wells = wells[(wells['formprod'] == 'VMUT') & (rng.random(len(wells)) < FRAC_SHARE)]
+    wells = pd.concat([wells, wells[rng.random(len(wells)) < FRAC_DUPLICATE_SHARE]])
+    n = len(wells)
+
+    lateral = wells['lateral'].to_numpy()
+    stages = np.maximum((lateral / rng.uniform(55, 90, n)).round(), 1).astype(int)
+    arena = stages * rng.uniform(80, 260, n)
+    imported = rng.uniform(0, 0.4, n) * (rng.random(n) < 0.3)
+
+    # Frac date: a couple of months before first production
+    month_index = wells['start'].to_numpy() - rng.integers(1, 4, n)
+    anio, mes = month_index // 12, month_index % 12 + 1
+    start_date = pd.to_datetime({'year': anio, 'month': mes, 'day': rng.integers(1, 15, n)})
+    end_date = start_date + pd.to_timedelta(rng.integers(5, 40, n), unit='D')
+
+    return pd.DataFrame({
+        'id_base_fractura_adjiv': wells['idpozo'].to_numpy() * 10 + wells.groupby('idpozo').cumcount().to_numpy(),
+        'idpozo': wells['idpozo'].to_numpy(),
+        'sigla': wells['sigla'].to_numpy(),
+        'cuenca': 'NEUQUINA',
+        'areapermisoconcesion': wells['areayacimiento'].to_numpy(),
+        'yacimiento': wells['areayacimiento'].to_numpy(),
+        'formacion_productiva': 'vaca muerta',
+        'tipo_reservorio': 'NO CONVENCIONAL',
+        'subtipo_reservorio': 'SHALE',
+        'longitud_rama_horizontal_m': lateral.round(1),
+        'cantidad_fracturas': stages,
+        'tipo_terminacion': 'Plug & Perf',
+        'arena_bombeada_nacional_tn': (arena * (1 - imported)).round(1),
+        'arena_bombeada_importada_tn': (arena * imported).round(1),
+        'agua_inyectada_m3': (arena * rng.uniform(6, 14, n)).round(1),
+        'co2_inyectado_m3': 0.0,
+        'presion_maxima_psi': rng.normal(11000, 1200, n).round(),
+        'potencia_equipos_fractura_hp': rng.normal(45000, 8000, n).round(),
+        'fecha_inicio_fractura': start_date.dt.strftime('%Y-%m-%d').to_numpy(),
+        'fecha_fin_fractura': end_date.dt.strftime('%Y-%m-%d').to_numpy(),
+        'fecha_data': end_date.dt.strftime('%Y-%m-%d').to_numpy(),
+        'anio_if': anio,
+        'mes_if': mes,
+        'anio_ff': end_date.dt.year.to_numpy(),
+        'mes_ff': end_date.dt.month.to_numpy(),
+        'anio_carga': end_date.dt.year.to_numpy(),
+        'mes_carga': end_date.dt.month.to_numpy(),
+        'empresa_informante': wells['empresa'].to_numpy(),
+        'mes': mes,
+        'anio': anio,
+    })[FRAC_COLUMNS]
+
+
+# Write production.csv and frac.csv for `scale` x BASE_WELLS wells into `out_dir`
+def write_dataset(out_dir, scale=1, seed=0, block_wells=5000):
+    os.makedirs(out_dir, exist_ok=True)
+    production_path = os.path.join(out_dir, 'production.csv')
+    frac_path = os.path.join(out_dir, 'frac.csv')
+
+    n_wells = int(BASE_WELLS * scale)
+    for path in (production_path, frac_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    for offset in range(0, n_wells, block_wells):
+        wells = generate_wells(min(block_wells, n_wells - offset), seed=seed, offset=offset)
+        header = offset == 0
+        generate_production(wells, seed).to_csv(production_path, mode='a', header=header, index=False)
+        generate_frac(wells, seed).to_csv(frac_path, mode='a', header=header, index=False)
+
+    return production_path, frac_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos de producción y fractura")
+    parser.add_argument('--scale', type=float, default=1, help="múltiplo de la cantidad de pozos actual")
+    parser.add_argument('--out', default='bench_data', help="carpeta de salida")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    production_path, frac_path = write_dataset(args.out, scale=args.scale, seed=args.seed)
+    print(production_path)
+    print(frac_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import os
+import pickle
+
+import pandas as pd
+import streamlit as st
+
+from capiv.pipeline import build_frac_report_tables
+from capiv.timing import mark_cache_miss, stage
+
+# Intermediate frac + production tables shared by the Ranking, FracData and
+# Data Management pages: a single st.cache_data entry per snapshot for all of
+# them (instead of one per page). When CAPIV_TABLE_CACHE points to a directory
+# the tables are also kept on disk, so other processes working on the same
+# snapshot (e.g. the capiv.report and capiv.precompute workers) compute them
+# only once.
+#
+# The same disk layer (cached_artifact) keeps the other per-snapshot artifacts
+# of the pages: rankings, quality cube, peak-rate percentiles and figures.
+
+TABLE_CACHE_ENV = 'CAPIV_TABLE_CACHE'
+
+
+def artifact_path(name, snapshot):
+    cache_dir = os.environ.get(TABLE_CACHE_ENV)
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, f"{name}-{snapshot}.pkl")
+
+
+# Artifact stored by any process for this snapshot, None if there is none
+def load_artifact(name, snapshot):
+    path = artifact_path(name, snapshot)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def store_artifact(name, snapshot, value):
+    path = artifact_path(name, snapshot)
+    if not path:
+        return
+    # Write to a temporary file first so readers never see a partial pickle
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+# Read the artifact if another process already built it, otherwise build and store it
+def cached_artifact(name, snapshot, build):
+    value = load_artifact(name, snapshot)
+    if value is None:
+        value = build()
+        store_artifact(name, snapshot, value)
+    return value
+
+
+# Extensions of the per-snapshot files (pickled artifacts and capiv.export files)
+ARTIFACT_EXTENSIONS = ('.pkl', '.csv', '.parquet', '.xlsx', '.zip')
+
+
+# Remove the artifacts of every snapshot not in `keep` (production ids and
+# production+frac ids); returns the number of files removed
+def prune_artifacts(keep):
+    cache_dir = os.environ.get(TABLE_CACHE_ENV)
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        stem, extension = os.path.splitext(name)
+        if extension in ARTIFACT_EXTENSIONS and not any(stem.endswith(f"-{snapshot}") for snapshot in keep):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+@st.cache_data(show_spinner="Procesando datos de fractura y producción...")
+def _frac_report_tables(snapshot, _data_filtered, _df_frac):
+    mark_cache_miss()
+    return cached_artifact(
+        'frac_report_tables', snapshot, lambda: build_frac_report_tables(_data_filtered, _df_frac)
+    )
+
+
+# Returns (cum_df, df_merged_final, df_merged_VMUT), see capiv.pipeline
+def get_frac_report_tables(snapshot, data_filtered, df_frac):
+    with stage('tablas fractura + producción', cached=True):
+        return _frac_report_tables(snapshot, data_filtered, df_frac)
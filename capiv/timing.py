@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+# Per-rerun timing of the pipeline stages.
+#
+# Each page calls start_rerun() at the top and render_timing_panel() at the
+# bottom; code in between wraps its stages in `with stage('name'):`. Streamlit
+# runs every session's script in its own thread, so the active trace is kept in
+# a thread-local: capiv.pipeline and the figure cache can be instrumented
+# without knowing about sessions, and outside a page (bench, reports) there is
+# no trace and stage() costs a single attribute lookup.
+#
+# Cached calls are wrapped with stage(name, cached=True) and the cached function
+# calls mark_cache_miss() when its body actually runs; otherwise it is a hit.
+#
+# CAPIV_TIMING=0 turns the instrumentation off, CAPIV_TIMING_LOG=<path> appends
+# every finished trace to a JSON-lines file.
+
+ENABLED = os.environ.get('CAPIV_TIMING', '1') != '0'
+LOG_PATH = os.environ.get('CAPIV_TIMING_LOG')
+
+# Finished traces kept per session for the JSON export
+HISTORY_SIZE = 50
+HISTORY_KEY = '_capiv_timing_history'
+
+_local = threading.local()
+
+
+# Stages recorded during one rerun of one page
+class Trace:
+
+    def __init__(self, page):
+        self.page = page
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.stages = []
+        self._open = []
+        self._start = time.perf_counter()
+
+    @property
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self._start) * 1000, 2)
+
+    def to_dict(self):
+        total_ms = self.elapsed_ms
+        tracked_ms = sum(s.get('ms', 0) for s in self.stages if s['depth'] == 0)
+        return {
+            'page': self.page,
+            'started_at': self.started_at,
+            'total_ms': total_ms,
+            'untracked_ms': round(total_ms - tracked_ms, 2),
+            'stages': [dict(s) for s in self.stages],
+        }
+
+
+def start_rerun(page):
+    _local.trace = Trace(page) if ENABLED else None
+    return _local.trace
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def stage(name, cached=False):
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+
+    # Recorded when it starts so nested stages are listed after their parent
+    record = {'name': name, 'depth': len(trace._open), 'cache': 'hit' if cached else None}
+    trace.stages.append(record)
+    trace._open.append(record)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record['ms'] = round((time.perf_counter() - start) * 1000, 2)
+        trace._open.pop()
+
+
+# Called from inside a cached function: the innermost cached stage was a miss
+def mark_cache_miss():
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return
+    for record in reversed(trace._open):
+        if record['cache'] is not None:
+            record['cache'] = 'miss'
+            return
+
+
+# Decorator form of stage()
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _append_log(trace_dict):
+    try:
+        with open(LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trace_dict, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+
+
+# Collapsible sidebar breakdown of the current rerun plus JSON export of the
+# session's last traces. Call it at the end of the page.
+def render_timing_panel():
+    trace = current_trace()
+    if trace is None:
+        return
+    _local.trace = None
+
+    import pandas as pd
+    import streamlit as st
+
+    trace_dict = trace.to_dict()
+    history = st.session_state.setdefault(HISTORY_KEY, [])
+    history.append(trace_dict)
+    del history[:-HISTORY_SIZE]
+    if LOG_PATH:
+        _append_log(trace_dict)
+
+    stages = trace_dict['stages']
+    hits = sum(s['cache'] == 'hit' for s in stages)
+    misses = sum(s['cache'] == 'miss' for s in stages)
+
+    with st.sidebar.expander("⏱️ Tiempos de ejecución", expanded=False):
+        st.caption(
+            f"Total: {trace_dict['total_ms']:,.0f} ms · sin instrumentar: "
+            f"{trace_dict['untracked_ms']:,.0f} ms · caché: {hits} aciertos / {misses} fallos"
+        )
+        if stages:
+            st.dataframe(
+                pd.DataFrame({
+                    'Etapa': [' ' * s['depth'] + s['name'] for s in stages],
+                    'ms': [s.get('ms') for s in stages],
+                    'Caché': [{'hit': 'acierto', 'miss': 'fallo'}.get(s['cache'], '') for s in stages],
+                }),
+                use_container_width=True,
+                hide_index=True,
+            )
+        st.download_button(
+            "Exportar trazas (JSON)",
+            data=json.dumps(history, ensure_ascii=False, indent=2),
+            file_name=f"capiv_timing_{trace.page}.json",
+            mime="application/json",
+        )
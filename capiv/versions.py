@@ -0,0 +1,248 @@
+import os
+import queue
+import threading
+import time
+import traceback
+import weakref
+from datetime import datetime
+
+import streamlit as st
+
+from capiv.figure_cache import get_figure_cache
+from capiv.precompute import read_status
+from capiv.refresh import poll_interval
+from capiv.tables import TABLE_CACHE_ENV, load_artifact
+
+# Versioned production frames shared by every session of the server process.
+#
+# A new snapshot is published by swapping the current version under a lock, so
+# a session that starts afterwards gets the new data right away and never sees
+# a half-loaded frame. Each session pins the version it started with (the pin
+# lives in its session_state) and keeps that consistent view on every page
+# until it loads the new data. The sessions share one frame per version, and
+# an old version is released, together with its cached figures, as soon as its
+# last reader is gone: the session asks for the new data or its session_state
+# is dropped.
+#
+# The versions own the frames: the loader is not cached by Streamlit, so a
+# released version is really freed. With CAPIV_TABLE_CACHE set, the production
+# frame warmed by capiv.precompute (capiv.refresh) is published once its
+# artifacts are ready. Without it the source is downloaded again on a
+# background thread, on the capiv.refresh schedule (more often around the
+# official close), and published when its snapshot id changed.
+
+PIN_KEY = '_capiv_snapshot_pin'
+
+# Seconds between checks of the precompute status
+CHECK_INTERVAL = 30
+
+
+class SnapshotPin:
+
+    def __init__(self, versions, version, df):
+        self.version = version
+        self.df = df
+        self._versions = versions
+        # Released explicitly or when the session state holding the pin is collected
+        self._release = weakref.finalize(self, versions._unpin, version)
+
+    def release(self):
+        self._release()
+        self._versions.collect()
+
+
+class SnapshotVersions:
+
+    def __init__(self, on_release=None):
+        self.on_release = on_release
+        self.last_check = 0.0
+        self.next_reload = 0.0
+        self.unchanged_reloads = 0
+        # Held while the first version is loaded, so concurrent sessions load it once
+        self.load_lock = threading.Lock()
+        self._reloading = False
+        self._frames = {}
+        self._readers = {}
+        self._current = None
+        # Versions unpinned by a finalizer, applied under the lock by the next call
+        self._unpinned = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def publish(self, version, df):
+        with self._lock:
+            released = self._drain_unpins()
+            if version != self._current:
+                previous = self._current
+                # A version still pinned by a session keeps its own frame
+                self._frames.setdefault(version, df)
+                self._readers.setdefault(version, 0)
+                self._current = version
+                if previous is not None and not self._readers.get(previous):
+                    self._drop(previous)
+                    released.append(previous)
+        self._notify(released)
+
+    # Pin the current version (or `version`, if it is still loaded)
+    def pin(self, version=None):
+        with self._lock:
+            released = self._drain_unpins()
+            if version not in self._frames:
+                version = self._current
+            pin = None
+            if version is not None:
+                self._readers[version] += 1
+                pin = SnapshotPin(self, version, self._frames[version])
+        self._notify(released)
+        return pin
+
+    # Finalizer of a pin: it may run from the garbage collector inside any
+    # call holding the lock, so it only queues the version
+    def _unpin(self, version):
+        self._unpinned.put(version)
+
+    # Apply the queued unpins (lock held); returns the released versions
+    def _drain_unpins(self):
+        released = []
+        while True:
+            try:
+                version = self._unpinned.get_nowait()
+            except queue.Empty:
+                return released
+            if version not in self._readers:
+                continue
+            self._readers[version] -= 1
+            if not self._readers[version] and version != self._current:
+                self._drop(version)
+                released.append(version)
+
+    def _notify(self, released):
+        if self.on_release:
+            for version in released:
+                self.on_release(version)
+
+    # Release the versions whose last pin is gone
+    def collect(self):
+        with self._lock:
+            released = self._drain_unpins()
+        self._notify(released)
+
+    def _drop(self, version):
+        self._frames.pop(version, None)
+        self._readers.pop(version, None)
+
+    # Next download of the source, sooner inside the close window and later
+    # after every download without changes
+    def schedule_reload(self):
+        self.next_reload = time.monotonic() + poll_interval(datetime.now(), self.unchanged_reloads)
+
+    # Download the source again on a background thread when it is due;
+    # `load` returns (version, df)
+    def reload_in_background(self, load):
+        with self._lock:
+            if self._reloading or time.monotonic() < self.next_reload:
+                return False
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(load,), name='capiv-reload', daemon=True).start()
+        return True
+
+    def _reload(self, load):
+        try:
+            version, df = load()
+            if version == self._current or df.empty:
+                self.unchanged_reloads += 1
+            else:
+                self.unchanged_reloads = 0
+                self.publish(version, df)
+        except Exception as e:
+            print(f"Error al recargar los datos de producción: {e}")
+            traceback.print_exc()
+        finally:
+            self.schedule_reload()
+            with self._lock:
+                self._reloading = False
+
+    # [{'version', 'readers', 'current'}] of every loaded version
+    def stats(self):
+        with self._lock:
+            released = self._drain_unpins()
+            stats = [
+                {'version': v, 'readers': n, 'current': v == self._current}
+                for v, n in self._readers.items()
+            ]
+        self._notify(released)
+        return stats
+
+
+# Figures of a released production snapshot (alone or combined with a frac snapshot)
+def _release_figures(version):
+    get_figure_cache().drop_production(version)
+
+
+# One set of versions per server process, shared by every session
+@st.cache_resource
+def get_snapshot_versions():
+    return SnapshotVersions(on_release=_release_figures)
+
+
+# Publish the production frame of the last ready precompute if it is newer
+def publish_precomputed(versions, force=False):
+    if not os.environ.get(TABLE_CACHE_ENV):
+        return
+    now = time.monotonic()
+    if not force and now - versions.last_check < CHECK_INTERVAL:
+        return
+    versions.last_check = now
+
+    status = read_status(os.environ[TABLE_CACHE_ENV])
+    production = status.get('produccion')
+    if status['state'] != 'ready' or not production or production == versions.current:
+        return
+    df = load_artifact('session', production)
+    if df is not None:
+        versions.publish(production, df)
+
+
+# Pin this session to a version and expose it as session_state['df'] /
+# session_state['snapshot_id']. `load` returns (version, df) when nothing has
+# been published yet. Returns the pin; a pinned session keeps its version.
+def pin_session(session_state, versions, load):
+    pin = session_state.get(PIN_KEY)
+    if pin is not None:
+        return pin
+
+    publish_precomputed(versions, force=versions.current is None)
+    with versions.load_lock:
+        if versions.current is None:
+            versions.publish(*load())
+            versions.schedule_reload()
+    pin = versions.pin()
+    session_state[PIN_KEY] = pin
+    session_state['df'] = pin.df
+    session_state['snapshot_id'] = pin.version
+    return pin
+
+
+# Move this session to the current version (e.g. "load new data" button)
+def repin_session(session_state, versions):
+    pin = session_state.pop(PIN_KEY, None)
+    session_state.pop('df', None)
+    session_state.pop('snapshot_id', None)
+    if pin is not None:
+        pin.release()
+
+
+# Whether a newer version than the session's pin has been published; first
+# publishes the last precompute, or reloads the source with `load` when there
+# is no CAPIV_TABLE_CACHE
+def newer_version_available(session_state, versions, load=None):
+    versions.collect()
+    if os.environ.get(TABLE_CACHE_ENV):
+        publish_precomputed(versions)
+    elif load is not None:
+        versions.reload_in_background(load)
+    pin = session_state.get(PIN_KEY)
+    return pin is not None and versions.current is not None and pin.version != versions.current
@@ -25,9 +25,8 @@ import plotly.express as px
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
+    # date and rates come with the data; the frame is shared by every session
+    # pinned to this version (capiv.versions), so it is not modified in place
     data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
     
     st.info("Utilizando datos recuperados de la memoria.")
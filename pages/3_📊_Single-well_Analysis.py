@@ -1,8 +1,14 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
 
+from capiv.export import COHORTS, available_formats, cohort_options, export_cohort, export_target
+from capiv.search import get_sigla_index, sigla_multiselect, sigla_selectbox
+from capiv.snapshot import snapshot_id
+
 # #Load and sort the data
 # @st.cache_data
 # def load_and_sort_data(dataset_url):
@@ -24,9 +30,8 @@ from PIL import Image
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
+    # date and rates come with the data; the frame is shared by every session
+    # pinned to this version (capiv.versions), so it is not modified in place
     data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
     
     st.info("Utilizando datos recuperados de la memoria.")
@@ -64,8 +69,14 @@ matching_data = data_sorted[
 # Get unique 'sigla' values based on selected 'empresa' and 'tipo pozo'
 siglas_for_selected_empresa = matching_data['sigla'].unique()
 
+# Siglas are searched on the server (see capiv.search): only the top matches are sent
+current_snapshot = st.session_state.get('snapshot_id') or snapshot_id(st.session_state['df'])
+sigla_index = get_sigla_index(current_snapshot, st.session_state['df']['sigla'])
+
 # Create a dropdown list for 'sigla'
-selected_sigla = st.sidebar.selectbox("Seleccionar sigla del pozo", siglas_for_selected_empresa)
+selected_sigla = sigla_selectbox(
+    sigla_index, "Seleccionar sigla del pozo", allowed=siglas_for_selected_empresa, container=st.sidebar
+)
 
 # Filter data for matching 'empresa' and 'sigla'
 matching_data = data_sorted[
@@ -198,22 +209,51 @@ matching_data_renamed = prepare_dataframe_for_download(matching_data)
 # Display the data table with renamed columns
 st.write(matching_data_renamed)
 
-# Define the function to convert DataFrame to CSV
-@st.cache
-def convert_dataframe_to_csv(data):
-    # Convert DataFrame to CSV and encode it as utf-8
-    csv = data.to_csv(index=False).encode('utf-8')
-    return csv
-
-# Call the function to convert DataFrame to CSV
-csv_data = convert_dataframe_to_csv(matching_data_renamed)
-
-# Add a button to download the CSV file
-if st.button(f"Descargar tabla como archivo CSV"):
-    st.download_button(
-        label="Descargar CSV",
-        data=csv_data,
-        file_name=f'{selected_sigla}.csv',
-        mime='text/csv',
-    )
-
+# --- Export ---
+# Files are written once per snapshot and selection (see capiv.export), so the
+# selected well is ready to download and a repeated download is instant
+export_df = st.session_state['df']
+export_snapshot = current_snapshot
+
+
+def download_export(target, label, key):
+    path, file_name, mime = target
+    with open(path, 'rb') as f:
+        st.download_button(label=label, data=f, file_name=file_name, mime=mime, key=key)
+
+
+well_export = export_cohort(export_df, export_snapshot, 'Pozos', [selected_sigla], file_name=selected_sigla)
+if well_export:
+    download_export(well_export, "Descargar tabla como archivo CSV", 'export_pozo')
+
+
+@st.cache_data
+def get_cohort_options(snapshot, cohort, _df):
+    return cohort_options(_df, cohort)
+
+
+with st.expander("Exportar varios pozos"):
+    cohort = st.selectbox("Exportar por", list(COHORTS), key='export_cohort')
+    if cohort == 'Pozos':
+        export_values = sigla_multiselect(sigla_index, "Seleccionar pozos", key='export_siglas')
+    else:
+        export_values = st.multiselect(
+            f"Seleccionar {cohort.lower()}", get_cohort_options(export_snapshot, cohort, export_df), key='export_values'
+        )
+
+    split_options = {"Un archivo": None, "Un archivo por pozo (ZIP)": 'sigla'}
+    if cohort != 'Pozos':
+        split_options[f"Un archivo por {cohort.lower()} (ZIP)"] = COHORTS[cohort]
+    col1, col2 = st.columns(2)
+    export_format = col1.selectbox("Formato", available_formats(), key='export_format')
+    split = split_options[col2.selectbox("Archivos", list(split_options), key='export_split')]
+
+    if export_values:
+        file_name = f"{cohort.lower()}-{export_values[0]}" if len(export_values) == 1 else cohort.lower()
+        args = (export_snapshot, cohort, export_values, export_format, split, file_name)
+        target = export_target(*args)
+        if not os.path.exists(target[0]) and st.button("Preparar archivo", key='export_build'):
+            with st.spinner("Escribiendo archivo..."):
+                target = export_cohort(export_df, *args)
+        if target and os.path.exists(target[0]):
+            download_export(target, f"Descargar {target[1]}", 'export_cohorte')
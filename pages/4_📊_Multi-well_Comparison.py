@@ -3,6 +3,12 @@ import pandas as pd
 import plotly.graph_objects as go
 from PIL import Image
 
+from capiv.comparison import align_wells, peak_rate_table, picker_options, picker_siglas, well_picker_index
+from capiv.search import get_sigla_index, sigla_multiselect
+from capiv.snapshot import snapshot_id
+from capiv.tables import cached_artifact
+from capiv.timing import mark_cache_miss, stage
+
 COLUMNS = [
     'sigla',  # atemporal
     'anio',  # temporal
@@ -62,11 +68,10 @@ water_wp_palette = ['#0000FF', '#0000CD', '#00008B', '#000080', '#191970', '#7B6
 #Verificamos si los datos ya fueron cargados en la Main Page
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
+    # date and rates come with the data; the frame is shared by every session
+    # pinned to this version (capiv.versions), so it is not modified in place.
+    # The selected wells are sorted when they are aligned (see capiv.comparison)
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
-    data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
     
     st.info("Utilizando datos recuperados de la memoria.")
     
@@ -74,27 +79,20 @@ else:
     st.warning("⚠️ No se han cargado los datos. Por favor, vuelve a la Página Principal.")
 
 
-# Add a new column "date" by combining year and month
-data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-data_sorted['date'] = pd.to_datetime(data_sorted['date'])
+# Peak rates, GOR and McCain fluid of every well, computed once per snapshot
+# (also kept on disk, see capiv.tables) and indexed by fluid, company and
+# campaign so the well picker is narrowed by a lookup
+current_snapshot = st.session_state.get('snapshot_id') or snapshot_id(data_sorted)
 
-# Create a Pivot Table to Calculate Maximum Oil and Gas Rates for Each Well
-pivot_table = data_sorted.pivot_table(
-    values=['gas_rate', 'oil_rate', 'water_rate'],
-    index=['sigla'],
-    aggfunc={'gas_rate': 'max', 'oil_rate': 'max', 'water_rate': 'max'}
-)
 
-# Step 2: Create a New DataFrame with Maximum Oil and Gas Rates
-max_rates_df = pivot_table.reset_index()
-max_rates_df['GOR'] = max_rates_df['gas_rate'] / max_rates_df['oil_rate']
-max_rates_df['GOR'] = max_rates_df['GOR'].fillna(100000)
+@st.cache_data(show_spinner=False)
+def get_well_picker_index(snapshot, _df):
+    mark_cache_miss()
+    return well_picker_index(cached_artifact('peak_rates', snapshot, lambda: peak_rate_table(_df)))
 
-# Add a new column "Fluido McCain" based on conditions
-max_rates_df['Fluido McCain'] = max_rates_df.apply(
-    lambda row: 'Gas' if row['oil_rate'] == 0 or row['GOR'] > 3000 else 'Petróleo',
-    axis=1
-)
+
+with stage('tabla de caudales pico', cached=True):
+    picker_index = get_well_picker_index(current_snapshot, data_sorted)
 
 st.header(f":blue[Capítulo IV Dataset - Producción No Convencional]")
 image = Image.open('Vaca Muerta rig.png')
@@ -102,33 +100,47 @@ st.sidebar.image(image)
 st.sidebar.title("Por favor filtrar aquí: ")
 
 # Create a dropdown list for "Fluido McCain"
-selected_fluido = st.sidebar.selectbox("Seleccionar tipo de fluido según McCain:", max_rates_df['Fluido McCain'].unique())
+selected_fluido = st.sidebar.selectbox(
+    "Seleccionar tipo de fluido según McCain:", picker_index.index.get_level_values('Fluido McCain').unique()
+)
 
-# Create a multiselect list for 'sigla'
-selected_sigla = st.sidebar.multiselect("Seleccionar siglas de los pozos a comparar", max_rates_df['sigla'])
+# Narrow the wells by company and campaign of the selected fluid
+ALL = "Todas"
+selected_empresa = st.sidebar.selectbox(
+    "Seleccionar operadora:", [ALL] + picker_options(picker_index, 'empresaNEW', selected_fluido)
+)
+empresa_filter = None if selected_empresa == ALL else selected_empresa
+selected_campania = st.sidebar.selectbox(
+    "Seleccionar campaña:",
+    [ALL] + [int(year) for year in picker_options(picker_index, 'campania', selected_fluido, empresa_filter)],
+)
+campania_filter = None if selected_campania == ALL else selected_campania
+
+# Create a multiselect list for 'sigla': searched on the server (see
+# capiv.search), only the top matches of the filtered wells are sent
+sigla_index = get_sigla_index(current_snapshot, data_sorted['sigla'])
+selected_sigla = sigla_multiselect(
+    sigla_index,
+    "Seleccionar siglas de los pozos a comparar",
+    allowed=picker_siglas(picker_index, selected_fluido, empresa_filter, campania_filter),
+    key='comparar_siglas',
+    container=st.sidebar,
+)
 
-# Filter data for matching 'sigla'
-filtered_data = data_sorted[
-    (data_sorted['sigla'].isin(selected_sigla))
-]
+# Selected wells aligned by month on production (wells × metric/month), in one pass
+aligned_wells = align_wells(data_sorted, selected_sigla)
 
 
 # Plot gas rate using Plotly
 gas_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
+    well = aligned_wells.loc[sigla]
     
     gas_rate_fig.add_trace(
         go.Scatter(
-            x=filtered_well_data['counter'],  # Use the counter as x-axis
-            y=filtered_well_data['gas_rate'],
+            x=well['gas_rate'].index,  # Months on production
+            y=well['gas_rate'],
             mode='lines+markers',
             name=f'Gas Rate - {sigla}',
             line=dict(color=gas_gp_palette[i % len(gas_gp_palette)]),  # Use the Gas Rate and Gp palette
@@ -150,18 +162,12 @@ oil_color_list = ['#008000', '#006400', '#90EE90', '#98FB98', '#8FBC8F', '#3CB37
 oil_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
+    well = aligned_wells.loc[sigla]
     
     oil_rate_fig.add_trace(
         go.Scatter(
-            x=filtered_well_data['counter'],  # Use the counter as x-axis
-            y=filtered_well_data['oil_rate'],
+            x=well['oil_rate'].index,  # Months on production
+            y=well['oil_rate'],
             mode='lines+markers',
             name=f'Oil Rate - {sigla}',
             line=dict(color=oil_np_palette[i % len(oil_np_palette)]),  # Use the Oil Rate and Np palette
@@ -183,18 +189,12 @@ water_color_list = ['#0000FF', '#0000CD', '#00008B', '#000080', '#191970', '#7B6
 water_rate_fig = go.Figure()
 
 for i, sigla in enumerate(selected_sigla):
-    filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-    
-    # Filter data to start when 'Np' is different from zero
-    filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-    
-    # Add a counter column to the filtered data
-    filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
+    well = aligned_wells.loc[sigla]
     
     water_rate_fig.add_trace(
         go.Scatter(
-            x=filtered_well_data['counter'],  # Use the counter as x-axis
-            y=filtered_well_data['water_rate'],
+            x=well['water_rate'].index,  # Months on production
+            y=well['water_rate'],
             mode='lines+markers',
             name=f'Water Rate - {sigla}',
             line=dict(color=water_wp_palette[i % len(water_wp_palette)]),  # Use the Water Rate and Wp palette
@@ -218,19 +218,13 @@ if selected_fluido and selected_sigla:
     wp_fig = go.Figure()
 
     for i, sigla in enumerate(selected_sigla):
-        filtered_well_data = filtered_data[filtered_data['sigla'] == sigla]
-
-        # Filter data to start when 'Np' is different from zero
-        filtered_well_data = filtered_well_data[filtered_well_data['Gp'] != 0]
-
-        # Add a counter column to the filtered data
-        filtered_well_data['counter'] = range(1, len(filtered_well_data) + 1)
+        well = aligned_wells.loc[sigla]
 
         # Plot Np (oil_rate) vs cumulative oil production (Np)
         np_fig.add_trace(
             go.Scatter(
-                x=filtered_well_data['Np'],  # Use cumulative oil production (Np) as x-axis
-                y=filtered_well_data['oil_rate'],  # Use oil_rate as y-axis
+                x=well['Np'],  # Use cumulative oil production (Np) as x-axis
+                y=well['oil_rate'],  # Use oil_rate as y-axis
                 mode='lines+markers',
                 name=f'Oil Rate - {sigla}',
                 line=dict(color=oil_np_palette[i % len(oil_np_palette)]),  # Use the Oil Rate palette
@@ -240,8 +234,8 @@ if selected_fluido and selected_sigla:
         # Plot Gp (gas_rate) vs cumulative gas production (Gp)
         gp_fig.add_trace(
             go.Scatter(
-                x=filtered_well_data['Gp'] / 1000, # Use cumulative gas production (Gp) as x-axis
-                y=filtered_well_data['gas_rate'],  # Use gas_rate as y-axis
+                x=well['Gp'] / 1000, # Use cumulative gas production (Gp) as x-axis
+                y=well['gas_rate'],  # Use gas_rate as y-axis
                 mode='lines+markers',
                 name=f'Gas Rate - {sigla}',
                 line=dict(color=gas_gp_palette[i % len(gas_gp_palette)]),  # Use the Gas Rate palette
@@ -251,8 +245,8 @@ if selected_fluido and selected_sigla:
         # Plot Wp (water_rate) vs cumulative water production (Wp)
         wp_fig.add_trace(
             go.Scatter(
-                x=filtered_well_data['Wp'],  # Use cumulative water production (Wp) as x-axis
-                y=filtered_well_data['water_rate'],  # Use water_rate as y-axis
+                x=well['Wp'],  # Use cumulative water production (Wp) as x-axis
+                y=well['water_rate'],  # Use water_rate as y-axis
                 mode='lines+markers',
                 name=f'Water Rate - {sigla}',
                 line=dict(color=water_wp_palette[i % len(water_wp_palette)]),  # Use the Water Rate palette
@@ -5,6 +5,20 @@ import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
+from capiv.figure_cache import get_figure_cache
+from capiv.memory import ENABLED_KEY, render_memory_panel, start_memory_accounting, track_memory
+from capiv.quantiles import grouped_quantiles, quantile_column
+from capiv.pipeline import read_frac
+from capiv.sources import frac_url
+from capiv.snapshot import snapshot_id
+from capiv.snapshot_store import record_snapshot
+from capiv.tables import get_frac_report_tables
+from capiv.timing import mark_cache_miss, render_timing_panel, stage, start_rerun
+
+# Time every stage of this rerun and measure memory when enabled (sidebar panels at the end of the page)
+start_rerun('fracdata')
+start_memory_accounting(st.session_state.get(ENABLED_KEY, False))
+
 # Load and sort the data
 # @st.cache_data
 # def load_and_sort_data(dataset_url):
@@ -26,27 +40,18 @@ from PIL import Image
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
-    data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
+    with stage('orden por pozo y fecha'):
+        # date and rates come with the data; the frame is shared by every session
+        # pinned to this version (capiv.versions), so it is not modified in place
+        data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
+    track_memory('data_sorted (copia ordenada)', data_sorted)
     
     st.info("Utilizando datos recuperados de la memoria.")
     
 else:
     st.warning("⚠️ No se han cargado los datos. Por favor, vuelve a la Página Principal.")
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
+# Operator names (empresaNEW) are unified at load time with the alias registry (see capiv.operators)
 
 # Sidebar filters
 st.header(f":blue[Reporte Extensivo de Completación y Producción en Vaca Muerta]")
@@ -55,6 +60,7 @@ st.sidebar.image(image)
 
 # Filter out rows where TEF is zero for calculating metrics
 data_filtered = data_sorted[(data_sorted['tef'] > 0)]
+track_memory('data_filtered', data_filtered)
 
 # Find the latest date in the dataset
 latest_date = data_filtered['date'].max()
@@ -78,38 +84,26 @@ latest_data = data_filtered[data_filtered['date'] == latest_date]
 @st.cache_data
 # Load and preprocess the fracture data
 def load_and_sort_data_frac(dataset_url):
-    df_frac = pd.read_csv(dataset_url)
-    return df_frac
+    mark_cache_miss()
+    with stage('descarga CSV fractura'):
+        return read_frac(dataset_url)
 
 # URL of the fracture dataset
-dataset_frac_url = "http://datos.energia.gob.ar/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+dataset_frac_url = frac_url()
 
 # Load the fracture data
-df_frac = load_and_sort_data_frac(dataset_frac_url)
-
+with stage('carga fractura', cached=True):
+    df_frac = load_and_sort_data_frac(dataset_frac_url)
 
-# Create a new column for the total amount of arena (sum of national and imported arena)
-df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
+# Results are cached per (production snapshot + frac snapshot)
+figure_cache = get_figure_cache()
+with stage('snapshot_id'):
+    frac_snapshot = snapshot_id(df_frac)
+    current_snapshot = f"{st.session_state.get('snapshot_id') or snapshot_id(data_sorted)}+{frac_snapshot}"
 
-# Apply the cut-off conditions:
-# longitud_rama_horizontal_m > 100
-# cantidad_fracturas > 6
-# arena_total_tn > 100
-df_frac = df_frac[
-    (df_frac['longitud_rama_horizontal_m'] > 100) &
-    (df_frac['cantidad_fracturas'] > 6) &
-    (df_frac['arena_total_tn'] > 100)
-]
-
-# Check the filtered data
-print(df_frac.info())
-
-# Define the columns to check for outliers (now using 'arena_total_tn' as the total arena)
-columns_to_check = [
-    'longitud_rama_horizontal_m',
-    'cantidad_fracturas',
-    'arena_total_tn',
-]
+# Keep the download in the snapshot history (once per snapshot, see capiv.snapshot_store)
+with stage('historial de snapshots'):
+    record_snapshot(df_frac, 'fractura', frac_snapshot)
 
 # ------------------------ Fluido segun McCain ------------------------
 
@@ -123,162 +117,30 @@ en el criterio de GOR según McCain. Esto permite reclasificar estos pozos como
 image = Image.open('McCain.png')
 st.sidebar.image(image)
 
-# Step 1: Create a Pivot Table with Cumulated Values
-pivot_table = data_filtered.pivot_table(
-    values=['Np', 'Gp', 'Wp'],
-    index=['sigla'],
-    aggfunc={'Np': 'max', 'Gp': 'max', 'Wp': 'max'}
-)
-
-print(pivot_table.info())
-
-# Step 2: Create a New DataFrame with GOR
-cum_df = pivot_table.reset_index()
-cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
-cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
-
-# Step 3: Add a new column "Fluido McCain" based on conditions
-cum_df['Fluido McCain'] = cum_df.apply(
-    lambda row: 'Gasífero' if row['Np'] == 0 or row['GOR'] > 3000 else 'Petrolífero',
-    axis=1
-)
-
-# Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
-tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
-cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
-
-# Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
-cum_df['tipopozoNEW'] = cum_df.apply(
-    lambda row: row['Fluido McCain'] if row['tipopozo'] == 'Otro tipo' else row['tipopozo'],
-    axis=1
+# Frac outliers are flagged once in the pipeline (see capiv.outliers); excluding
+# them only filters the cached table
+exclude_outliers = st.sidebar.toggle(
+    "Excluir outliers de fractura",
+    key='excluir_outliers',
+    help="Pozos con longitud de rama, etapas o arena fuera de los límites IQR/MAD de su campaña y fluido"
 )
 
-# Step 6: Calculate WOR and WGR
-cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
-cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
-cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
-cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
-
-# Step 7: Create the final table with the desired columns
-cum_df = cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
-
-# Step 8: Merge `tipopozoNEW` back into `data_filtered`
-data_filtered = data_filtered.merge(
-    cum_df[['sigla', 'tipopozoNEW']],
-    on='sigla',
-    how='left'
-)
-
-# Display the updated data_filtered
-print(data_filtered.columns)
-print(cum_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged = pd.merge(
-    df_frac,
-    cum_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-print(df_merged.info())
-
-# --- Tabla consolidada por siglas para usar en reporte ---------
-
-# Calculate additional metrics and create the new DataFrame
-def create_summary_dataframe(data_filtered):
-    # Calculate Qo peak and Qg peak (maximum oil and gas rates)
-    data_filtered['Qo_peak'] = data_filtered[['sigla','oil_rate']].groupby('sigla').transform('max') 
-    data_filtered['Qg_peak'] = data_filtered[['sigla','gas_rate']].groupby('sigla').transform('max') 
-    
-    # Determine the starting year for each well
-    data_filtered['start_year'] = data_filtered.groupby('sigla')['anio'].transform('min')
-
-    # Calculate EUR at 30, 90, and 180 days based on dates
-    def calculate_eur(group):
-        group = group.sort_values('date')  # Ensure the data is sorted by date
-        
-        # Get the start date for the group
-        start_date = group['date'].iloc[0]
-        
-        # Define target dates
-        target_dates = {
-            'EUR_30': start_date + relativedelta(days=30),
-            'EUR_90': start_date + relativedelta(days=90),
-            'EUR_180': start_date + relativedelta(days=180)
-        }
-        
-        # Initialize EUR columns
-        for key, target_date in target_dates.items():
-            group[key] = group.loc[
-                group['date'] <= target_date,
-                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
-            ].max()
-        
-        return group
-
-    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
-    
-    # Create the new DataFrame with selected columns
-    summary_df = data_filtered.groupby('sigla').agg({
-        'date': 'first',
-        'start_year': 'first',
-        'empresaNEW': 'first',
-        'formprod': 'first',
-        'sub_tipo_recurso': 'first',
-        'Np': 'max',
-        'Gp': 'max',
-        'Wp': 'max',
-        'Qo_peak': 'max',
-        'Qg_peak': 'max',
-        'EUR_30': 'max',
-        'EUR_90': 'max',
-        'EUR_180': 'max'
-    }).reset_index()
-    
-    return summary_df
-
-# Generate the summary DataFrame
-summary_df = create_summary_dataframe(data_filtered)
-
-
-print(summary_df.info())
-print(summary_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged_final = pd.merge(
-    df_merged,
-    summary_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-# Filter out rows where 'id_base_fractura_adjiv' is null
-# df_merged_final = df_merged_final[df_merged_final['id_base_fractura_adjiv'].notna()] 
-
-# Check the dataframe info and columns
-print(df_merged_final.info())
-print(df_merged_final.columns)
-
-# -----------------------------------------------
-
-# Only keep VMUT as the target formation and filter for SHALE resource type
-df_merged_VMUT = df_merged_final[
-    (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
-]
+# Frac cut-offs, McCain classification, per-well summary and merges (see capiv.tables).
+# Only computed when the selected section is not cached yet for this snapshot.
+def get_df_merged_VMUT():
+    _, _, df_merged_VMUT = get_frac_report_tables(current_snapshot, data_filtered, df_frac)
+    if exclude_outliers:
+        return df_merged_VMUT[~df_merged_VMUT['outlier']].copy()
+    return df_merged_VMUT.copy()
 
 
 # ----------------------- Pivot Tables + Plots ------------
 
-# Create tabs
-tab1, tab2, tab3 = st.tabs(["Indicadores de Actividad", "Estrategia de Completación", "Productividad"])
 
 # --- Tab 1: Indicadores de Actividad ---
-with tab1:
+def build_tab_actividad_figures():
+    df_merged_VMUT = get_df_merged_VMUT()
+    figures = []
 
     #------------------
     # Group by 'start_year' and 'tipopozoNEW', then count the number of wells
@@ -356,15 +218,11 @@ with tab1:
     # Show the plot
     #fig.show()
     
-    st.plotly_chart(fig, use_container_width=True)
+    figures.append(fig)
 
     #------------------
 
-    st.divider()
     
-    import streamlit as st
-    import pandas as pd
-    import plotly.graph_objects as go
     
     # Filtrar solo pozos que tienen datos de fractura
     df_con_frac = df_merged_VMUT[df_merged_VMUT['id_base_fractura_adjiv'].notna()].copy()
@@ -435,23 +293,21 @@ with tab1:
     )
     
     
-    # Display the DataFrame in Streamlit
-    st.write("### Evolución de Arena Bombeada")
-
-    
     # fig_arena_plot.show()
-    st.plotly_chart(fig_arena_plot)
+    figures.append(fig_arena_plot)
+
+    return figures
 
 # --- Tab 2: Estrategia de Completación ---
-with tab2:
+def build_tab_completacion_figures():
+    df_merged_VMUT = get_df_merged_VMUT()
+    figures = []
   
     # ----------------
 
-    import plotly.graph_objects as go
-    import streamlit as st
     
-    # Remove rows where longitud_rama_horizontal_m is zero and drop duplicates based on 'sigla'
-    df_merged_VMUT_filtered = df_merged_VMUT[df_merged_VMUT['longitud_rama_horizontal_m'] > 0].drop_duplicates(subset='sigla')
+    # Remove rows where longitud_rama_horizontal_m is zero (one row per sigla already)
+    df_merged_VMUT_filtered = df_merged_VMUT[df_merged_VMUT['longitud_rama_horizontal_m'] > 0].copy()
     
     # Aggregate data to calculate min, median, max, avg, and standard deviation by year and type of well (tipopozoNEW)
     statistics = df_merged_VMUT_filtered.groupby(['start_year']).agg(
@@ -532,7 +388,7 @@ with tab2:
     )
     
     # Show the plot
-    st.plotly_chart(fig, use_container_width=True)
+    figures.append(fig)
 
 
     #----------------
@@ -605,7 +461,7 @@ with tab2:
     
     # Show the plot
     #fig.show()
-    st.plotly_chart(fig, use_container_width=True)
+    figures.append(fig)
 
     #----------------
     
@@ -681,7 +537,7 @@ with tab2:
             )
         )
     
-    st.plotly_chart(fig, use_container_width=True)
+    figures.append(fig)
 
     # -----------------------------
 
@@ -780,7 +636,7 @@ with tab2:
     
     
     # Mostrar en Streamlit
-    st.plotly_chart(fig_lines, use_container_width=True)
+    figures.append(fig_lines)
 
 #-----------
 
@@ -829,11 +685,10 @@ with tab2:
     )
     
     # Streamlit render
-    st.plotly_chart(fig_agua_plot, use_container_width=True)
+    figures.append(fig_agua_plot)
 
     # -------------------- Prop x Etapa --------------------
 
-    st.divider()
 
     df_merged_VMUT['prop_x_etapa'] = (
     df_merged_VMUT['arena_total_tn'] / df_merged_VMUT['cantidad_fracturas']
@@ -958,11 +813,10 @@ with tab2:
     )
     
     # Render
-    st.plotly_chart(fig, use_container_width=True)
+    figures.append(fig)
 
     # -----------------------------------------------------
 
-    st.divider()
 
     df_merged_VMUT['AS_x_volumen_inyectado'] = (
     df_merged_VMUT['arena_total_tn'] / (df_merged_VMUT['agua_inyectada_m3'] / 1000)
@@ -1036,12 +890,11 @@ with tab2:
    
     
     # Mostrar en Streamlit
-    st.plotly_chart(fig_as, use_container_width=True)
+    figures.append(fig_as)
 
     # ------------------------------------------------
     # Proppant Intensity
 
-    st.divider()
 
     df_merged_VMUT['proppant_intensity'] = (
     df_merged_VMUT['arena_total_tn'] / df_merged_VMUT['longitud_rama_horizontal_m'] 
@@ -1115,31 +968,75 @@ with tab2:
    
     
     # Mostrar en Streamlit
-    st.plotly_chart(fig_pi, use_container_width=True)
+    figures.append(fig_pi)
+
+    return figures
 
 # --- Tab 3: Productividad ---
-with tab3:
 
+# Peak rates (total and per stage) whose max and P10/P50/P90 are plotted per campaign
+PEAK_RATE_METRICS = ['Qo_peak', 'Qg_peak', 'Qo_peak_x_etapa', 'Qg_peak_x_etapa']
+
+# Max and percentiles of every peak-rate metric per fluid type and campaign,
+# computed in a single sorted pass (see capiv.quantiles)
+@st.cache_data(show_spinner=False)
+def get_peak_rate_quantiles(snapshot, exclude_outliers):
+    mark_cache_miss()
+    df_merged_VMUT = get_df_merged_VMUT()
+
+    # --- CÁLCULO DE COLUMNAS POR ETAPA ---
+    df_merged_VMUT['Qo_peak_x_etapa'] = (
+        df_merged_VMUT['Qo_peak'] / df_merged_VMUT['cantidad_fracturas']
+    ).replace([np.inf, -np.inf], np.nan)
     
-    #------------------------------------
+    df_merged_VMUT['Qg_peak_x_etapa'] = (
+        df_merged_VMUT['Qg_peak'] / df_merged_VMUT['cantidad_fracturas']
+    ).replace([np.inf, -np.inf], np.nan)
+
+    return grouped_quantiles(
+        df_merged_VMUT,
+        ['tipopozoNEW', 'start_year'],
+        PEAK_RATE_METRICS,
+        quantiles=(0.1, 0.5, 0.9),
+        stats=('max',)
+    )
+
+# Per-campaign table for one fluid type and metric with the plot column names.
+# `columns` names [max, P50, 90th percentile, 10th percentile] in that order.
+def peak_rate_table(peak_quantiles, fluid, metric, columns, min_year=None):
+    if fluid in peak_quantiles.index.get_level_values('tipopozoNEW'):
+        table = peak_quantiles.xs(fluid, level='tipopozoNEW')
+    else:
+        table = peak_quantiles.iloc[0:0].droplevel('tipopozoNEW')
+
+    table = table[[
+        f"{metric}_max",
+        quantile_column(metric, 0.5),
+        quantile_column(metric, 0.9),
+        quantile_column(metric, 0.1),
+    ]]
+    table.columns = columns
+    table = table.reset_index()
+
+    if min_year is not None:
+        table = table[table['start_year'] > min_year]
+    return table
+
+def build_tab_productividad_figures():
+    with stage('percentiles caudal pico', cached=True):
+        peak_quantiles = get_peak_rate_quantiles(current_snapshot, exclude_outliers)
+    figures = []
 
-    import numpy as np
     
+    #------------------------------------
+
     
-    # Step 1: Process Data for Petrolífero to get max and average oil rate
-    grouped_petrolifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Petrolífero'].groupby(
-        ['start_year']
-    ).agg({
-        'Qo_peak': [
-                'max',
-                lambda x: np.percentile(x, 50),
-                lambda x: np.percentile(x, 90),
-                lambda x: np.percentile(x, 10)
-            ]
-    }).reset_index()
     
-    # Flatten column names
-    grouped_petrolifero.columns = ['start_year', 'max_oil_rate', 'avg_oil_rate', 'p10_oil_rate', 'p90_oil_rate']
+    # Step 1: Max and percentiles of the oil peak rate per campaign (Petrolífero)
+    grouped_petrolifero = peak_rate_table(
+        peak_quantiles, 'Petrolífero', 'Qo_peak',
+        ['max_oil_rate', 'avg_oil_rate', 'p10_oil_rate', 'p90_oil_rate']
+    )
     
     # Step 2: Plot the data
     fig = go.Figure()
@@ -1228,23 +1125,14 @@ with tab3:
     )
     
      #fig.show()
-    st.plotly_chart(fig,use_container_width=True)
-    
-    
-    # Step 1: Process Data for Gasífero to get max and average gas rate
-    grouped_gasifero = df_merged_VMUT[df_merged_VMUT['tipopozoNEW'] == 'Gasífero'].groupby(
-        ['start_year']
-    ).agg({
-        'Qg_peak': [
-                'max',
-                lambda x: np.percentile(x, 50),
-                lambda x: np.percentile(x, 90),
-                lambda x: np.percentile(x, 10)
-            ]
-    }).reset_index()
+    figures.append(fig)
     
-    # Flatten column names
-    grouped_gasifero.columns = ['start_year', 'max_gas_rate', 'avg_gas_rate', 'p10_gas_rate', 'p90_gas_rate']
+    
+    # Step 1: Max and percentiles of the gas peak rate per campaign (Gasífero)
+    grouped_gasifero = peak_rate_table(
+        peak_quantiles, 'Gasífero', 'Qg_peak',
+        ['max_gas_rate', 'avg_gas_rate', 'p10_gas_rate', 'p90_gas_rate']
+    )
     
     # Step 2: Plot the data
     fig = go.Figure()
@@ -1333,37 +1221,19 @@ with tab3:
     )
     
      #fig.show()
-    st.plotly_chart(fig,use_container_width=True)
+    figures.append(fig)
 
 # --------------------
 
 
-    # --- CÁLCULO DE COLUMNAS POR ETAPA ---
-    df_merged_VMUT['Qo_peak_x_etapa'] = (
-        df_merged_VMUT['Qo_peak'] / df_merged_VMUT['cantidad_fracturas']
-    ).replace([np.inf, -np.inf], np.nan)
-    
-    df_merged_VMUT['Qg_peak_x_etapa'] = (
-        df_merged_VMUT['Qg_peak'] / df_merged_VMUT['cantidad_fracturas']
-    ).replace([np.inf, -np.inf], np.nan)
-    
     # =================================================================
     # GRÁFICO 3: Petrolífero por Etapa
     # =================================================================
-    grouped_petrolifero_etapa = df_merged_VMUT[
-    (df_merged_VMUT['tipopozoNEW'] == 'Petrolífero') & 
-    (df_merged_VMUT['start_year'] > 2012)
-    ].groupby(['start_year']).agg({
-        'Qo_peak_x_etapa': [
-            'max',
-            lambda x: np.nanpercentile(x, 50) if not x.dropna().empty else np.nan,
-            lambda x: np.nanpercentile(x, 90) if not x.dropna().empty else np.nan,
-            lambda x: np.nanpercentile(x, 10) if not x.dropna().empty else np.nan
-        ]
-    }).reset_index()
-    
-    # Nombres de columnas consistentes
-    grouped_petrolifero_etapa.columns = ['start_year', 'max_oil', 'p50_oil', 'p90_oil', 'p10_oil']
+    grouped_petrolifero_etapa = peak_rate_table(
+        peak_quantiles, 'Petrolífero', 'Qo_peak_x_etapa',
+        ['max_oil', 'p50_oil', 'p90_oil', 'p10_oil'],
+        min_year=2012
+    )
     
     fig_oil_etapa = go.Figure()
     
@@ -1402,25 +1272,17 @@ with tab3:
         xaxis_title="Campaña", yaxis_title="Caudal de Petróleo (m3/d/etapa)",
         template="plotly_white", legend=dict(orientation='h', y=1.1, x=0.5, xanchor='center')
     )
-    st.plotly_chart(fig_oil_etapa, use_container_width=True)
+    figures.append(fig_oil_etapa)
     
     
     # =================================================================
     # GRÁFICO 4: Gasífero por Etapa (CORREGIDO)
     # =================================================================
-    grouped_gasifero_etapa = df_merged_VMUT[
-    (df_merged_VMUT['tipopozoNEW'] == 'Gasífero') & 
-    (df_merged_VMUT['start_year'] > 2012)
-    ].groupby(['start_year']).agg({
-        'Qo_peak_x_etapa': [
-            'max',
-            lambda x: np.nanpercentile(x, 50) if not x.dropna().empty else np.nan,
-            lambda x: np.nanpercentile(x, 90) if not x.dropna().empty else np.nan,
-            lambda x: np.nanpercentile(x, 10) if not x.dropna().empty else np.nan
-        ]
-    }).reset_index()
-    
-    grouped_gasifero_etapa.columns = ['start_year', 'max_gas', 'p50_gas', 'p90_gas', 'p10_gas']
+    grouped_gasifero_etapa = peak_rate_table(
+        peak_quantiles, 'Gasífero', 'Qg_peak_x_etapa',
+        ['max_gas', 'p50_gas', 'p90_gas', 'p10_gas'],
+        min_year=2012
+    )
     
     fig_gas_etapa = go.Figure()
     
@@ -1459,4 +1321,49 @@ with tab3:
         xaxis_title="Campaña", yaxis_title="Caudal de gas (km3/d/etapa)",
         template="plotly_white", legend=dict(orientation='h', y=1.1, x=0.5, xanchor='center')
     )
-    st.plotly_chart(fig_gas_etapa, use_container_width=True)
+    figures.append(fig_gas_etapa)
+    return figures
+
+
+def render_tab_actividad(figures):
+    fig_pozos, fig_arena_plot = figures
+    st.plotly_chart(fig_pozos, use_container_width=True)
+    st.divider()
+    # Display the DataFrame in Streamlit
+    st.write("### Evolución de Arena Bombeada")
+    st.plotly_chart(fig_arena_plot)
+
+
+def render_tab_completacion(figures):
+    for fig in figures[:5]:
+        st.plotly_chart(fig, use_container_width=True)
+    # Prop x Etapa, AS x volumen inyectado and proppant intensity
+    for fig in figures[5:]:
+        st.divider()
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def render_tab_productividad(figures):
+    for fig in figures:
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# Streamlit evaluates every st.tabs body on each rerun, so the sections are
+# selected with a horizontal radio and only the visible one is computed.
+# Each section's figures are cached on their own for the current snapshot.
+TABS = {
+    "Indicadores de Actividad": ('frac.tab_actividad', build_tab_actividad_figures, render_tab_actividad),
+    "Estrategia de Completación": ('frac.tab_completacion', build_tab_completacion_figures, render_tab_completacion),
+    "Productividad": ('frac.tab_productividad', build_tab_productividad_figures, render_tab_productividad),
+}
+
+selected_tab = st.radio(
+    "Sección", list(TABS), horizontal=True, label_visibility="collapsed", key="frac_report_tab"
+)
+figure_id, build_figures, render_figures = TABS[selected_tab]
+render_figures(figure_cache.get_or_build(
+    current_snapshot, figure_id, build_figures, toggles={'excluir_outliers': exclude_outliers}
+))
+
+render_timing_panel()
+render_memory_panel()
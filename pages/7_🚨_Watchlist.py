@@ -25,9 +25,8 @@ from PIL import Image
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
+    # date and rates come with the data; the frame is shared by every session
+    # pinned to this version (capiv.versions), so it is not modified in place
     data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
     
     st.info("Utilizando datos recuperados de la memoria.")
@@ -35,19 +34,7 @@ if 'df' in st.session_state:
 else:
     st.warning("⚠️ No se han cargado los datos. Por favor, vuelve a la Página Principal.")
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL',
-    'PLUSPETROL S.A.': 'PLUSPETROL',
-    'PLUSPETROL CUENCA NEUQUINA S.R.L.': 'PLUSPETROL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
+# Operator names (empresaNEW) are unified at load time with the alias registry (see capiv.operators)
 
 # Sidebar filters
 st.header(f":blue[🚨 Watchlist - Nuevos Pozos en Vaca Muerta]")
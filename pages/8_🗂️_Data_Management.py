@@ -4,6 +4,21 @@ import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
+from capiv.figure_cache import get_figure_cache
+from capiv.memory import ENABLED_KEY, render_memory_panel, start_memory_accounting, track_memory
+from capiv.operators import near_duplicate_operators
+from capiv.pipeline import read_frac
+from capiv.quality import build_quality_cube, company_slice
+from capiv.sources import frac_url
+from capiv.snapshot import snapshot_id
+from capiv.snapshot_store import record_snapshot
+from capiv.tables import cached_artifact, get_frac_report_tables
+from capiv.timing import mark_cache_miss, render_timing_panel, stage, start_rerun
+
+# Time every stage of this rerun and measure memory when enabled (sidebar panels at the end of the page)
+start_rerun('data_management')
+start_memory_accounting(st.session_state.get(ENABLED_KEY, False))
+
 # Load and sort the data
 # @st.cache_data
 # def load_and_sort_data(dataset_url):
@@ -25,10 +40,11 @@ from PIL import Image
 if 'df' in st.session_state:
     # Recuperamos los datos de la memoria sin esperar un segundo
     data_sorted = st.session_state['df']
-    data_sorted['date'] = pd.to_datetime(data_sorted['anio'].astype(str) + '-' + data_sorted['mes'].astype(str) + '-1')
-    data_sorted['gas_rate'] = data_sorted['prod_gas'] / data_sorted['tef']
-    data_sorted['oil_rate'] = data_sorted['prod_pet'] / data_sorted['tef']
-    data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
+    with stage('orden por pozo y fecha'):
+        # date and rates come with the data; the frame is shared by every session
+        # pinned to this version (capiv.versions), so it is not modified in place
+        data_sorted = data_sorted.sort_values(by=['sigla', 'date'], ascending=True)
+    track_memory('data_sorted (copia ordenada)', data_sorted)
     
     st.info("Utilizando datos recuperados de la memoria.")
     
@@ -36,17 +52,7 @@ else:
     st.warning("⚠️ No se han cargado los datos. Por favor, vuelve a la Página Principal.")
 
 
-# Replace company names in production data
-replacement_dict = {
-    'PAN AMERICAN ENERGY (SUCURSAL ARGENTINA) LLC': 'PAN AMERICAN ENERGY',
-    'PAN AMERICAN ENERGY SL': 'PAN AMERICAN ENERGY',
-    'VISTA ENERGY ARGENTINA SAU': 'VISTA',
-    'Vista Oil & Gas Argentina SA': 'VISTA',
-    'VISTA OIL & GAS ARGENTINA SAU': 'VISTA',
-    'WINTERSHALL DE ARGENTINA S.A.': 'WINTERSHALL',
-    'WINTERSHALL ENERGÍA S.A.': 'WINTERSHALL'
-}
-data_sorted['empresaNEW'] = data_sorted['empresa'].replace(replacement_dict)
+# Operator names (empresaNEW) are unified at load time with the alias registry (see capiv.operators)
 
 # Sidebar filters
 st.header(f":blue[Reporte Extensivo de Completación y Producción en Vaca Muerta]")
@@ -55,6 +61,7 @@ st.sidebar.image(image)
 
 # Filter out rows where TEF is zero for calculating metrics
 data_filtered = data_sorted[(data_sorted['tef'] > 0)]
+track_memory('data_filtered', data_filtered)
 
 # Find the latest date in the dataset
 latest_date = data_filtered['date'].max()
@@ -78,38 +85,27 @@ latest_data = data_filtered[data_filtered['date'] == latest_date]
 @st.cache_data
 # Load and preprocess the fracture data
 def load_and_sort_data_frac(dataset_url):
-    df_frac = pd.read_csv(dataset_url)
-    return df_frac
+    mark_cache_miss()
+    with stage('descarga CSV fractura'):
+        return read_frac(dataset_url)
 
 # URL of the fracture dataset
-dataset_frac_url = "http://datos.energia.gob.ar/dataset/71fa2e84-0316-4a1b-af68-7f35e41f58d7/resource/2280ad92-6ed3-403e-a095-50139863ab0d/download/datos-de-fractura-de-pozos-de-hidrocarburos-adjunto-iv-actualizacin-diaria.csv"
+dataset_frac_url = frac_url()
 
 # Load the fracture data
-df_frac = load_and_sort_data_frac(dataset_frac_url)
-
-
-# Create a new column for the total amount of arena (sum of national and imported arena)
-df_frac['arena_total_tn'] = df_frac['arena_bombeada_nacional_tn'] + df_frac['arena_bombeada_importada_tn']
+with stage('carga fractura', cached=True):
+    df_frac = load_and_sort_data_frac(dataset_frac_url)
 
-# Apply the cut-off conditions:
-# longitud_rama_horizontal_m > 100
-# cantidad_fracturas > 6
-# arena_total_tn > 100
-df_frac = df_frac[
-    (df_frac['longitud_rama_horizontal_m'] > 100) &
-    (df_frac['cantidad_fracturas'] > 6) &
-    (df_frac['arena_total_tn'] > 100)
-]
+# Figures are cached per (production snapshot + frac snapshot, figure, selection)
+figure_cache = get_figure_cache()
+with stage('snapshot_id'):
+    frac_snapshot = snapshot_id(df_frac)
+    current_snapshot = f"{st.session_state.get('snapshot_id') or snapshot_id(data_sorted)}+{frac_snapshot}"
 
-# Check the filtered data
-print(df_frac.info())
+# Keep the download in the snapshot history (once per snapshot, see capiv.snapshot_store)
+with stage('historial de snapshots'):
+    record_snapshot(df_frac, 'fractura', frac_snapshot)
 
-# Define the columns to check for outliers (now using 'arena_total_tn' as the total arena)
-columns_to_check = [
-    'longitud_rama_horizontal_m',
-    'cantidad_fracturas',
-    'arena_total_tn',
-]
 
 # ------------------------ Fluido segun McCain ------------------------
 
@@ -123,168 +119,19 @@ en el criterio de GOR según McCain. Esto permite reclasificar estos pozos como
 image = Image.open('McCain.png')
 st.sidebar.image(image)
 
-# Step 1: Create a Pivot Table with Cumulated Values
-pivot_table = data_filtered.pivot_table(
-    values=['Np', 'Gp', 'Wp'],
-    index=['sigla'],
-    aggfunc={'Np': 'max', 'Gp': 'max', 'Wp': 'max'}
-)
-
-print(pivot_table.info())
-
-# Step 2: Create a New DataFrame with GOR
-cum_df = pivot_table.reset_index()
-cum_df['GOR'] = (cum_df['Gp'] / cum_df['Np']) * 1000
-cum_df['GOR'] = cum_df['GOR'].fillna(100000)  # Handle NaN values
-
-# Step 3: Add a new column "Fluido McCain" based on conditions
-cum_df['Fluido McCain'] = cum_df.apply(
-    lambda row: 'Gasífero' if row['Np'] == 0 or row['GOR'] > 3000 else 'Petrolífero',
-    axis=1
-)
-
-# Step 4: Ensure `tipopozo` is unique for each `sigla` and merge it
-tipopozo_unique = data_filtered[['sigla', 'tipopozo']].drop_duplicates(subset=['sigla'])
-cum_df = cum_df.merge(tipopozo_unique, on='sigla', how='left')
-
-# Step 5: Create the 'tipopozoNEW' column based on the 'tipopozo' and 'Fluido McCain'
-cum_df['tipopozoNEW'] = cum_df.apply(
-    lambda row: row['Fluido McCain'] if row['tipopozo'] == 'Otro tipo' else row['tipopozo'],
-    axis=1
-)
-
-# Step 6: Calculate WOR and WGR
-cum_df['WOR'] = cum_df['Wp'] / cum_df['Np']
-cum_df['WOR'] = cum_df['WOR'].fillna(100000)  # Handle NaN values
-cum_df['WGR'] = (cum_df['Wp'] / cum_df['Gp']) * 1000
-cum_df['WGR'] = cum_df['WGR'].fillna(100000)  # Handle NaN values
-
-# Step 7: Create the final table with the desired columns
-cum_df = cum_df[['sigla', 'WGR', 'WOR', 'GOR', 'Fluido McCain', 'tipopozoNEW']]
-
-# Step 8: Merge `tipopozoNEW` back into `data_filtered`
-data_filtered = data_filtered.merge(
-    cum_df[['sigla', 'tipopozoNEW']],
-    on='sigla',
-    how='left'
-)
-
-# Display the updated data_filtered
-print(data_filtered.columns)
-print(cum_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged = pd.merge(
-    df_frac,
-    cum_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-print(df_merged.info())
-
-# --- Tabla consolidada por siglas para usar en reporte ---------
+# Frac cut-offs, McCain classification, per-well summary and merges (see capiv.tables)
+cum_df, df_merged_final, df_merged_VMUT = get_frac_report_tables(current_snapshot, data_filtered, df_frac)
 
-# Calculate additional metrics and create the new DataFrame
-def create_summary_dataframe(data_filtered):
-    # Calculate Qo peak and Qg peak (maximum oil and gas rates)
-    data_filtered['Qo_peak'] = data_filtered[['sigla','oil_rate']].groupby('sigla').transform('max') 
-    data_filtered['Qg_peak'] = data_filtered[['sigla','gas_rate']].groupby('sigla').transform('max') 
-    
-    # Determine the starting year for each well
-    data_filtered['start_year'] = data_filtered.groupby('sigla')['anio'].transform('min')
-
-    # Calculate EUR at 30, 90, and 180 days based on dates
-    def calculate_eur(group):
-        group = group.sort_values('date')  # Ensure the data is sorted by date
-        
-        # Get the start date for the group
-        start_date = group['date'].iloc[0]
-        
-        # Define target dates
-        target_dates = {
-            'EUR_30': start_date + relativedelta(days=30),
-            'EUR_90': start_date + relativedelta(days=90),
-            'EUR_180': start_date + relativedelta(days=180)
-        }
-        
-        # Initialize EUR columns
-        for key, target_date in target_dates.items():
-            group[key] = group.loc[
-                group['date'] <= target_date,
-                'Np' if group['tipopozoNEW'].iloc[0] == 'Petrolífero' else 'Gp'
-            ].max()
-        
-        return group
-
-    data_filtered = data_filtered.groupby('sigla', group_keys=False).apply(calculate_eur)
-    
-    # Create the new DataFrame with selected columns
-    summary_df = data_filtered.groupby('sigla').agg({
-        'date': 'first',
-        'start_year': 'first',
-        'empresaNEW': 'first',
-        'formprod': 'first',
-        'sub_tipo_recurso': 'first',
-        'Np': 'max',
-        'Gp': 'max',
-        'Wp': 'max',
-        'Qo_peak': 'max',
-        'Qg_peak': 'max',
-        'EUR_30': 'max',
-        'EUR_90': 'max',
-        'EUR_180': 'max'
-    }).reset_index()
-    
-    return summary_df
-
-# Generate the summary DataFrame
-summary_df = create_summary_dataframe(data_filtered)
-
-
-print(summary_df.info())
-print(summary_df.columns)
-
-# -----------------------------------------------
-
-# Merge the dataframes on 'sigla'
-df_merged_final = pd.merge(
-    df_merged,
-    summary_df,
-    on='sigla',
-    how='outer'
-).drop_duplicates()
-
-# Filter out rows where 'id_base_fractura_adjiv' is null
-# df_merged_final = df_merged_final[df_merged_final['id_base_fractura_adjiv'].notna()] 
-
-# Check the dataframe info and columns
-print(df_merged_final.info())
-print(df_merged_final.columns)
+# Quality aggregates materialized once per snapshot (see capiv.quality); the
+# views below and the per-company drilldown are lookups into this cube
+@st.cache_data(show_spinner="Calculando cubo de calidad...")
+def get_quality_cube(snapshot, _df_merged_final):
+    mark_cache_miss()
+    return cached_artifact('quality_cube', snapshot, lambda: build_quality_cube(_df_merged_final))
 
-# -----------------------------------------------
-
-# Only keep VMUT as the target formation and filter for SHALE resource type
-df_merged_VMUT = df_merged_final[
-    (df_merged_final['formprod'] == 'VMUT') & (df_merged_final['sub_tipo_recurso'] == 'SHALE')
-]
-
-# ================================================
-# NUEVAS COLUMNAS — se calculan una sola vez acá
-# y se reutilizan en todo lo que sigue
-# ================================================
-
-df_merged_final['prod_total']     = df_merged_final['Np'].fillna(0) + df_merged_final['Gp'].fillna(0)
-df_merged_final['sin_datos_frac'] = df_merged_final['id_base_fractura_adjiv'].isna()
-df_merged_final['anio_inicio']    = pd.to_datetime(df_merged_final['date']).dt.year
-
-# Score de calidad por pozo (0–100): completitud de los 3 campos críticos de fractura
-campos_criticos = ['longitud_rama_horizontal_m', 'cantidad_fracturas', 'arena_total_tn']
-df_merged_final['score_calidad'] = (
-    df_merged_final[campos_criticos].notna().sum(axis=1) / len(campos_criticos) * 100
-).round(1)
+with stage('cubo de calidad', cached=True):
+    quality = get_quality_cube(current_snapshot, df_merged_final)
+track_memory('cubo de calidad', quality)
 
 # ------------------------------------------------
 st.subheader("Diagnóstico de Calidad de Datos por Empresa", divider="blue")
@@ -301,13 +148,13 @@ tienen información crítica incompleta que puede afectar análisis y rankings.
 # NUEVO: KPIs GLOBALES
 # ================================================
 
-_df_dedup         = df_merged_final.drop_duplicates('sigla')
-total_pozos_g     = _df_dedup['sigla'].nunique()
-pozos_sin_frac_g  = int(_df_dedup['sin_datos_frac'].sum())
-prod_total_g      = df_merged_final['prod_total'].sum()
-prod_sin_frac_g   = df_merged_final[df_merged_final['sin_datos_frac']]['prod_total'].sum()
-pct_prod_g        = prod_sin_frac_g / prod_total_g * 100 if prod_total_g else 0
-score_medio_g     = _df_dedup['score_calidad'].mean()
+kpis_g            = quality['global']
+total_pozos_g     = kpis_g['pozos']
+pozos_sin_frac_g  = kpis_g['pozos_sin_frac']
+prod_total_g      = kpis_g['prod_total']
+prod_sin_frac_g   = kpis_g['prod_sin_frac']
+pct_prod_g        = kpis_g['pct_prod_incompleto']
+score_medio_g     = kpis_g['score_medio']
 
 st.subheader("Resumen Global", divider="grey")
 _c1, _c2, _c3, _c4, _c5 = st.columns(5)
@@ -326,28 +173,11 @@ st.divider()
 # ==============================
 st.subheader("Ranking Data Management: Impacto por Producción sin Datos de Fractura")
 
-df_dm = df_merged_final.copy()
-
-# Ranking por empresa — cálculo seguro sin lambda sobre df externo
-_sin_frac_stats = (
-    df_dm[df_dm['sin_datos_frac']]
-    .groupby('empresaNEW')
-    .agg(prod_sin_frac=('prod_total', 'sum'), pozos_sin_frac=('sigla', 'nunique'))
-    .reset_index()
-)
-ranking_dm = (
-    df_dm.groupby('empresaNEW')
-    .agg(prod_total=('prod_total', 'sum'), pozos_total=('sigla', 'nunique'))
-    .reset_index()
-    .merge(_sin_frac_stats, on='empresaNEW', how='left')
-)
-ranking_dm[['prod_sin_frac', 'pozos_sin_frac']] = ranking_dm[['prod_sin_frac', 'pozos_sin_frac']].fillna(0)
-
-# % incompleto
-ranking_dm['pct_incompleto'] = (ranking_dm['prod_sin_frac'] / ranking_dm['prod_total']) * 100
+# Ranking por empresa, ordenado por impacto absoluto (producción sin datos de fractura)
+ranking_dm = quality['empresas'].reset_index().rename(columns={'pozos': 'pozos_total'})
 
-# Ordenar por impacto absoluto
-ranking_dm = ranking_dm.sort_values('prod_sin_frac', ascending=False)
+# % incompleto (de la producción)
+ranking_dm['pct_incompleto'] = ranking_dm['pct_prod_incompleto']
 
 # Formatear números con separadores de miles
 ranking_dm['prod_total_fmt']     = ranking_dm['prod_total'].map('{:,.0f}'.format)
@@ -373,47 +203,51 @@ st.dataframe(
 # 3 dimensiones: prod total / % incompleto / volumen en riesgo
 # ================================================
 
-fig_dm = px.scatter(
-    ranking_dm,
-    x='pct_incompleto',
-    y='prod_total',
-    size='prod_sin_frac',
-    size_max=60,
-    color='pct_incompleto',
-    color_continuous_scale='RdYlGn_r',
-    range_color=[0, 100],
-    hover_name='empresaNEW',
-    hover_data={
-        'prod_total':     ':,.0f',
-        'prod_sin_frac':  ':,.0f',
-        'pct_incompleto': ':.1f',
-        'pozos_total':    True,
-        'pozos_sin_frac': True,
-    },
-    text='empresaNEW',
-    title='Mapa de Riesgo: Producción Total vs % Datos Incompletos',
-    labels={
-        'pct_incompleto': '% Producción sin datos de fractura',
-        'prod_total':     'Producción Total',
-        'prod_sin_frac':  'Prod. sin datos de fractura',
-    },
-)
-fig_dm.update_traces(
-    textposition='top center',
-    textfont=dict(size=10),
-    marker=dict(line=dict(width=1, color='white')),
-)
-fig_dm.update_layout(
-    template='plotly_white',
-    xaxis_title='% Producción sin datos de fractura',
-    yaxis_title='Producción Total',
-    yaxis_tickformat=',',
-    coloraxis_colorbar=dict(title='% Incompleto', ticksuffix='%'),
-)
-fig_dm.add_vline(x=50, line_dash='dash', line_color='orange',
-                 annotation_text='50% umbral', annotation_position='top right')
-fig_dm.add_vline(x=80, line_dash='dash', line_color='red',
-                 annotation_text='80% crítico', annotation_position='top right')
+def build_fig_dm():
+    fig_dm = px.scatter(
+        ranking_dm,
+        x='pct_incompleto',
+        y='prod_total',
+        size='prod_sin_frac',
+        size_max=60,
+        color='pct_incompleto',
+        color_continuous_scale='RdYlGn_r',
+        range_color=[0, 100],
+        hover_name='empresaNEW',
+        hover_data={
+            'prod_total':     ':,.0f',
+            'prod_sin_frac':  ':,.0f',
+            'pct_incompleto': ':.1f',
+            'pozos_total':    True,
+            'pozos_sin_frac': True,
+        },
+        text='empresaNEW',
+        title='Mapa de Riesgo: Producción Total vs % Datos Incompletos',
+        labels={
+            'pct_incompleto': '% Producción sin datos de fractura',
+            'prod_total':     'Producción Total',
+            'prod_sin_frac':  'Prod. sin datos de fractura',
+        },
+    )
+    fig_dm.update_traces(
+        textposition='top center',
+        textfont=dict(size=10),
+        marker=dict(line=dict(width=1, color='white')),
+    )
+    fig_dm.update_layout(
+        template='plotly_white',
+        xaxis_title='% Producción sin datos de fractura',
+        yaxis_title='Producción Total',
+        yaxis_tickformat=',',
+        coloraxis_colorbar=dict(title='% Incompleto', ticksuffix='%'),
+    )
+    fig_dm.add_vline(x=50, line_dash='dash', line_color='orange',
+                     annotation_text='50% umbral', annotation_position='top right')
+    fig_dm.add_vline(x=80, line_dash='dash', line_color='red',
+                     annotation_text='80% crítico', annotation_position='top right')
+    return fig_dm
+
+fig_dm = figure_cache.get_or_build(current_snapshot, 'dm.risk_map', build_fig_dm)
 st.plotly_chart(fig_dm, use_container_width=True)
 
 # ================================================
@@ -423,38 +257,36 @@ st.plotly_chart(fig_dm, use_container_width=True)
 st.subheader("Evolución Temporal de Datos Incompletos por Empresa", divider="grey")
 st.caption("Porcentaje de pozos sin datos de fractura por empresa y año. Verde = completo. Rojo = crítico.")
 
-pivot_temporal = (
-    df_dm.groupby(['empresaNEW', 'anio_inicio'])['sin_datos_frac']
-    .mean()
-    .mul(100)
-    .round(1)
-    .unstack(fill_value=None)
-)
-# Ordenar: empresas con más datos faltantes arriba
-pivot_temporal = pivot_temporal.loc[
-    pivot_temporal.mean(axis=1).sort_values(ascending=False).index
-]
-
-fig_heat = go.Figure(data=go.Heatmap(
-    z=pivot_temporal.values,
-    x=pivot_temporal.columns.astype(str).tolist(),
-    y=pivot_temporal.index.tolist(),
-    colorscale='RdYlGn_r',
-    zmin=0,
-    zmax=100,
-    text=pivot_temporal.applymap(lambda v: f"{v:.0f}%" if pd.notna(v) else "N/D").values,
-    texttemplate='%{text}',
-    textfont=dict(size=10),
-    hoverongaps=False,
-    colorbar=dict(title='% Incompleto', ticksuffix='%'),
-))
-fig_heat.update_layout(
-    template='plotly_white',
-    title='% Pozos sin Datos de Fractura — Empresa × Año',
-    xaxis_title='Año',
-    yaxis_title='Empresa',
-    height=max(350, 30 * len(pivot_temporal)),
-)
+def build_fig_heat():
+    pivot_temporal = quality['empresa_anio']['pct_incompleto'].round(1).unstack()
+    # Ordenar: empresas con más datos faltantes arriba
+    pivot_temporal = pivot_temporal.loc[
+        pivot_temporal.mean(axis=1).sort_values(ascending=False).index
+    ]
+
+    fig_heat = go.Figure(data=go.Heatmap(
+        z=pivot_temporal.values,
+        x=pivot_temporal.columns.astype(str).tolist(),
+        y=pivot_temporal.index.tolist(),
+        colorscale='RdYlGn_r',
+        zmin=0,
+        zmax=100,
+        text=(pivot_temporal.round(0).astype('Int64').astype(str) + '%').where(pivot_temporal.notna(), 'N/D').values,
+        texttemplate='%{text}',
+        textfont=dict(size=10),
+        hoverongaps=False,
+        colorbar=dict(title='% Incompleto', ticksuffix='%'),
+    ))
+    fig_heat.update_layout(
+        template='plotly_white',
+        title='% Pozos sin Datos de Fractura — Empresa × Año',
+        xaxis_title='Año',
+        yaxis_title='Empresa',
+        height=max(350, 30 * len(pivot_temporal)),
+    )
+    return fig_heat
+
+fig_heat = figure_cache.get_or_build(current_snapshot, 'dm.heatmap', build_fig_heat)
 st.plotly_chart(fig_heat, use_container_width=True)
 
 # ================================================
@@ -464,39 +296,42 @@ st.plotly_chart(fig_heat, use_container_width=True)
 st.subheader("Score de Calidad de Datos por Formación", divider="grey")
 st.caption("Score promedio (0–100) según completitud de: longitud de rama, cantidad de fracturas y arena total.")
 
-score_form = (
-    df_merged_final.groupby('formprod')
-    .agg(score_medio=('score_calidad', 'mean'), pozos=('sigla', 'nunique'))
-    .reset_index()
-    .sort_values('score_medio', ascending=True)
-)
-score_form['score_medio'] = score_form['score_medio'].round(1)
-score_form['color'] = score_form['score_medio'].apply(
-    lambda s: '#1E8449' if s >= 70 else ('#F39C12' if s >= 40 else '#C0392B')
-)
+def build_fig_score():
+    score_form = (
+        quality['formaciones'][['score_medio', 'pozos']]
+        .reset_index()
+        .sort_values('score_medio', ascending=True)
+    )
+    score_form['score_medio'] = score_form['score_medio'].round(1)
+    score_form['color'] = score_form['score_medio'].apply(
+        lambda s: '#1E8449' if s >= 70 else ('#F39C12' if s >= 40 else '#C0392B')
+    )
 
-fig_score = go.Figure(go.Bar(
-    x=score_form['score_medio'],
-    y=score_form['formprod'],
-    orientation='h',
-    text=score_form['score_medio'].astype(str) + ' pts',
-    textposition='outside',
-    marker_color=score_form['color'],
-    customdata=score_form['pozos'],
-    hovertemplate='<b>%{y}</b><br>Score: %{x:.1f}<br>Pozos: %{customdata}<extra></extra>',
-))
-fig_score.update_layout(
-    template='plotly_white',
-    title='Score de Calidad Promedio por Formación',
-    xaxis_title='Score de Calidad (0–100)',
-    yaxis_title='Formación',
-    xaxis_range=[0, 115],
-    height=max(300, 35 * len(score_form)),
-)
-fig_score.add_vline(x=70, line_dash='dot', line_color='#1E8449',
-                    annotation_text='Umbral aceptable (70)', annotation_position='top right')
-fig_score.add_vline(x=40, line_dash='dot', line_color='#C0392B',
-                    annotation_text='Umbral crítico (40)', annotation_position='bottom right')
+    fig_score = go.Figure(go.Bar(
+        x=score_form['score_medio'],
+        y=score_form['formprod'],
+        orientation='h',
+        text=score_form['score_medio'].astype(str) + ' pts',
+        textposition='outside',
+        marker_color=score_form['color'],
+        customdata=score_form['pozos'],
+        hovertemplate='<b>%{y}</b><br>Score: %{x:.1f}<br>Pozos: %{customdata}<extra></extra>',
+    ))
+    fig_score.update_layout(
+        template='plotly_white',
+        title='Score de Calidad Promedio por Formación',
+        xaxis_title='Score de Calidad (0–100)',
+        yaxis_title='Formación',
+        xaxis_range=[0, 115],
+        height=max(300, 35 * len(score_form)),
+    )
+    fig_score.add_vline(x=70, line_dash='dot', line_color='#1E8449',
+                        annotation_text='Umbral aceptable (70)', annotation_position='top right')
+    fig_score.add_vline(x=40, line_dash='dot', line_color='#C0392B',
+                        annotation_text='Umbral crítico (40)', annotation_position='bottom right')
+    return fig_score
+
+fig_score = figure_cache.get_or_build(current_snapshot, 'dm.score_formacion', build_fig_score)
 st.plotly_chart(fig_score, use_container_width=True)
 
 
@@ -506,21 +341,18 @@ st.plotly_chart(fig_score, use_container_width=True)
 
 empresa_objetivo = st.selectbox(
     "Seleccionar Empresa",
-    sorted(df_merged_final['empresaNEW'].dropna().unique())
+    sorted(quality['empresas'].index)
 )
 
-df_emp = df_merged_final.drop_duplicates('sigla').copy()
-
-df_emp = df_emp[df_emp['empresaNEW'] == empresa_objetivo]
-
-# Métricas
-total_pozos    = df_emp['sigla'].nunique()
-pozos_sin_frac = df_emp['sin_datos_frac'].sum()
+# Métricas (fila de la empresa en el cubo)
+kpis_emp       = quality['empresas'].loc[empresa_objetivo]
+total_pozos    = int(kpis_emp['pozos'])
+pozos_sin_frac = kpis_emp['pozos_sin_frac']
 pct            = (pozos_sin_frac / total_pozos) * 100 if total_pozos > 0 else 0
-prod_emp       = df_emp['prod_total'].sum()
-prod_sin_emp   = df_emp[df_emp['sin_datos_frac']]['prod_total'].sum()
+prod_emp       = kpis_emp['prod_total']
+prod_sin_emp   = kpis_emp['prod_sin_frac']
 pct_prod_emp   = (prod_sin_emp / prod_emp * 100) if prod_emp > 0 else 0
-score_emp      = df_emp['score_calidad'].mean()
+score_emp      = kpis_emp['score_medio']
 
 # KPIs — ampliado a 5 columnas
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -536,39 +368,39 @@ col5.metric("Score Calidad",      f"{score_emp:.1f} / 100")
 # -----------------------------
 # 📊 Breakdown por tipo
 # -----------------------------
-resumen_tipo = (
-    df_emp.groupby('tipopozoNEW')
-    .agg(
-        total=('sigla', 'count'),
-        sin_frac=('sin_datos_frac', 'sum')
+def build_fig_tipo():
+    resumen_tipo = (
+        company_slice(quality['empresa_tipo'], empresa_objetivo)
+        .reset_index()
+        .rename(columns={'pozos': 'total', 'pozos_sin_frac': 'sin_frac', 'pct_incompleto': 'pct'})
     )
-    .reset_index()
-)
 
-resumen_tipo['pct'] = (resumen_tipo['sin_frac'] / resumen_tipo['total']) * 100
-resumen_tipo['color'] = resumen_tipo['pct'].apply(
-    lambda p: '#1E8449' if p < 40 else ('#F39C12' if p < 70 else '#C0392B')
-)
+    resumen_tipo['color'] = resumen_tipo['pct'].apply(
+        lambda p: '#1E8449' if p < 40 else ('#F39C12' if p < 70 else '#C0392B')
+    )
 
-fig_tipo = go.Figure(go.Bar(
-    x=resumen_tipo['tipopozoNEW'],
-    y=resumen_tipo['pct'],
-    text=resumen_tipo['pct'].round(1).astype(str) + '%',
-    textposition='outside',
-    marker_color=resumen_tipo['color'],
-    customdata=resumen_tipo[['total', 'sin_frac']].values,
-    hovertemplate=(
-        '<b>%{x}</b><br>% incompleto: %{y:.1f}%<br>'
-        'Total: %{customdata[0]}<br>Sin fractura: %{customdata[1]}<extra></extra>'
-    ),
-))
-fig_tipo.update_layout(
-    template='plotly_white',
-    title='Datos Incompletos por Tipo de Pozo',
-    yaxis_title='% Incompleto',
-    xaxis_title='Tipo de Pozo',
-    yaxis_range=[0, 115],
-)
+    fig_tipo = go.Figure(go.Bar(
+        x=resumen_tipo['tipopozoNEW'],
+        y=resumen_tipo['pct'],
+        text=resumen_tipo['pct'].round(1).astype(str) + '%',
+        textposition='outside',
+        marker_color=resumen_tipo['color'],
+        customdata=resumen_tipo[['total', 'sin_frac']].values,
+        hovertemplate=(
+            '<b>%{x}</b><br>% incompleto: %{y:.1f}%<br>'
+            'Total: %{customdata[0]}<br>Sin fractura: %{customdata[1]}<extra></extra>'
+        ),
+    ))
+    fig_tipo.update_layout(
+        template='plotly_white',
+        title='Datos Incompletos por Tipo de Pozo',
+        yaxis_title='% Incompleto',
+        xaxis_title='Tipo de Pozo',
+        yaxis_range=[0, 115],
+    )
+    return fig_tipo
+
+fig_tipo = figure_cache.get_or_build(current_snapshot, 'dm.empresa_tipo', build_fig_tipo, params={'empresa': empresa_objetivo})
 st.plotly_chart(fig_tipo, use_container_width=True)
 
 # ================================================
@@ -577,35 +409,34 @@ st.plotly_chart(fig_tipo, use_container_width=True)
 
 st.markdown("#### Evolución Temporal de Completitud")
 
-df_emp_full = df_merged_final[df_merged_final['empresaNEW'] == empresa_objetivo].copy()
-evol_anio = (
-    df_emp_full.groupby('anio_inicio')['sin_datos_frac']
-    .agg(total='count', sin_frac='sum')
-    .reset_index()
-)
-evol_anio['pct_incompleto'] = (evol_anio['sin_frac'] / evol_anio['total'] * 100).round(1)
-evol_anio['pct_completo']   = 100 - evol_anio['pct_incompleto']
-
-fig_evol = go.Figure()
-fig_evol.add_trace(go.Bar(
-    x=evol_anio['anio_inicio'], y=evol_anio['pct_completo'],
-    name='Con datos', marker_color='#1E8449',
-    hovertemplate='%{x}: %{y:.1f}% completo<extra></extra>',
-))
-fig_evol.add_trace(go.Bar(
-    x=evol_anio['anio_inicio'], y=evol_anio['pct_incompleto'],
-    name='Sin datos', marker_color='#C0392B',
-    hovertemplate='%{x}: %{y:.1f}% incompleto<extra></extra>',
-))
-fig_evol.update_layout(
-    template='plotly_white',
-    title=f'Completitud de Datos de Fractura — {empresa_objetivo}',
-    barmode='stack',
-    yaxis_title='% Pozos',
-    xaxis_title='Año de Inicio',
-    yaxis_range=[0, 110],
-    legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1),
-)
+def build_fig_evol():
+    evol_anio = company_slice(quality['empresa_anio'], empresa_objetivo).reset_index()
+    evol_anio['pct_incompleto'] = evol_anio['pct_incompleto'].round(1)
+    evol_anio['pct_completo']   = 100 - evol_anio['pct_incompleto']
+
+    fig_evol = go.Figure()
+    fig_evol.add_trace(go.Bar(
+        x=evol_anio['anio_inicio'], y=evol_anio['pct_completo'],
+        name='Con datos', marker_color='#1E8449',
+        hovertemplate='%{x}: %{y:.1f}% completo<extra></extra>',
+    ))
+    fig_evol.add_trace(go.Bar(
+        x=evol_anio['anio_inicio'], y=evol_anio['pct_incompleto'],
+        name='Sin datos', marker_color='#C0392B',
+        hovertemplate='%{x}: %{y:.1f}% incompleto<extra></extra>',
+    ))
+    fig_evol.update_layout(
+        template='plotly_white',
+        title=f'Completitud de Datos de Fractura — {empresa_objetivo}',
+        barmode='stack',
+        yaxis_title='% Pozos',
+        xaxis_title='Año de Inicio',
+        yaxis_range=[0, 110],
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1),
+    )
+    return fig_evol
+
+fig_evol = figure_cache.get_or_build(current_snapshot, 'dm.empresa_evolucion', build_fig_evol, params={'empresa': empresa_objetivo})
 st.plotly_chart(fig_evol, use_container_width=True)
 
 # -----------------------------
@@ -613,10 +444,37 @@ st.plotly_chart(fig_evol, use_container_width=True)
 # -----------------------------
 with st.expander("Ver pozos sin datos de fractura"):
     st.dataframe(
-        df_emp[df_emp['sin_datos_frac']]
-        [['sigla', 'tipopozoNEW', 'formprod', 'score_calidad']]  # + score_calidad
-        .sort_values('score_calidad')
-        .head(20),
+        company_slice(quality['pozos_sin_frac'], empresa_objetivo)
+        [['sigla', 'tipopozoNEW', 'formprod', 'score_calidad']],  # + score_calidad
         use_container_width=True,
         hide_index=True,
     )
+
+# -----------------------------
+# 🏷️ Nombres de operadoras sin unificar
+# -----------------------------
+@st.cache_data(show_spinner=False)
+def get_operator_near_duplicates(snapshot, _names):
+    mark_cache_miss()
+    return near_duplicate_operators(_names)
+
+with stage('alias de operadoras', cached=True):
+    operator_near_duplicates = get_operator_near_duplicates(current_snapshot, data_sorted['empresa'])
+
+with st.expander(f"Nombres de operadoras parecidos sin alias ({len(operator_near_duplicates)})"):
+    st.caption("Pares de nombres informados que parecen la misma empresa pero se muestran por separado. "
+               "Se unifican agregándolos al registro de alias (capiv/operators.py).")
+    st.dataframe(
+        operator_near_duplicates.rename(columns={
+            'empresa':            'Empresa',
+            'empresa_similar':    'Nombre parecido',
+            'empresaNEW':         'Se muestra como',
+            'empresaNEW_similar': 'Parecido se muestra como',
+            'similitud':          'Similitud',
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+render_timing_panel()
+render_memory_panel()
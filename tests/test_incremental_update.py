@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capiv.pipeline import PRODUCTION_COLUMNS, PRODUCTION_KEY, add_production_rates, update_production_rates
+from capiv.snapshot_store import changed_rows
+
+TEXT_COLUMNS = ['empresa', 'areayacimiento', 'formprod', 'sub_tipo_recurso', 'tipopozo']
+
+
+# Raw production of `wells` wells over `months` months starting in January 2023
+def raw_production(wells=6, months=14, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f"W-{w}", 2023 + m // 12, m % 12 + 1) for w in range(wells) for m in range(months)]
+    df = pd.DataFrame(rows, columns=PRODUCTION_KEY)
+    for column in ('prod_pet', 'prod_gas', 'prod_agua'):
+        df[column] = rng.uniform(0, 1000, len(df)).round(1)
+    df['tef'] = rng.integers(1, 31, len(df)).astype(float)
+    for column in PRODUCTION_COLUMNS:
+        if column not in df:
+            df[column] = 'x' if column in TEXT_COLUMNS else 0.0
+    return df[PRODUCTION_COLUMNS]
+
+
+def full_rebuild(raw):
+    return add_production_rates(raw.copy())
+
+
+def assert_same_frame(updated, expected):
+    columns = list(expected.columns)
+    updated = updated[columns].sort_values(PRODUCTION_KEY).reset_index(drop=True)
+    expected = expected.sort_values(PRODUCTION_KEY).reset_index(drop=True)
+    pd.testing.assert_frame_equal(updated, expected, check_dtype=False)
+
+
+@pytest.fixture
+def old():
+    return raw_production()
+
+
+def test_new_month_for_every_well(old):
+    new = pd.concat([old, raw_production(months=15, seed=1).query('anio == 2024 and mes == 3')], ignore_index=True)
+    changes, removed = changed_rows(old, new)
+    assert removed == 0 and len(changes) == 6
+    assert_same_frame(update_production_rates(full_rebuild(old), changes), full_rebuild(new))
+
+
+def test_revised_months_and_a_new_well(old):
+    new = old.copy()
+    revised = (new['sigla'] == 'W-2') & (new['anio'] == 2023) & (new['mes'].isin([3, 4]))
+    new.loc[revised, 'prod_gas'] += 500
+    new_well = raw_production(wells=1, months=3, seed=2).assign(sigla='W-9')
+    new = pd.concat([new, new_well], ignore_index=True)
+
+    changes, removed = changed_rows(old, new)
+    assert removed == 0 and len(changes) == 5
+    updated = update_production_rates(full_rebuild(old), changes)
+    assert_same_frame(updated, full_rebuild(new))
+    # Np/Gp/Wp of the later months of the revised well follow the revision
+    last = updated[(updated['sigla'] == 'W-2')].sort_values(['anio', 'mes']).iloc[-1]
+    assert last['Gp'] == pytest.approx(new.loc[new['sigla'] == 'W-2', 'prod_gas'].sum())
+
+
+def test_no_changes(old):
+    changes, removed = changed_rows(old, old.copy())
+    assert removed == 0 and changes.empty
+    assert_same_frame(update_production_rates(full_rebuild(old), changes), full_rebuild(old))
+
+
+def test_removed_rows_are_reported(old):
+    changes, removed = changed_rows(old, old.iloc[1:])
+    assert removed == 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capiv.quantiles import grouped_quantiles, quantile_column
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        'start_year': rng.integers(2015, 2020, n),
+        'tipopozoNEW': rng.choice(['Petrolífero', 'Gasífero'], n),
+        'Qo_peak': rng.lognormal(4, 1, n),
+        'Qg_peak': rng.lognormal(5, 1, n),
+    })
+    df.loc[rng.random(n) < 0.2, 'Qo_peak'] = np.nan
+    return df
+
+
+def test_matches_nanpercentile(df):
+    by, metrics = ['start_year', 'tipopozoNEW'], ['Qo_peak', 'Qg_peak']
+    result = grouped_quantiles(df, by, metrics, QUANTILES, stats=('min', 'max', 'count'))
+
+    for key, group in df.groupby(by):
+        for metric in metrics:
+            values = group[metric].to_numpy()
+            row = result.loc[key]
+            for q in QUANTILES:
+                assert row[quantile_column(metric, q)] == pytest.approx(np.nanpercentile(values, q * 100))
+            assert row[f"{metric}_min"] == pytest.approx(np.nanmin(values))
+            assert row[f"{metric}_max"] == pytest.approx(np.nanmax(values))
+            assert row[f"{metric}_count"] == np.count_nonzero(~np.isnan(values))
+
+
+def test_groups_without_values_give_nan():
+    df = pd.DataFrame({'g': ['a', 'a', 'b'], 'x': [1.0, 3.0, np.nan]})
+    result = grouped_quantiles(df, 'g', 'x', (0.5,), stats=('max', 'count'))
+    assert result.loc['a', 'x_p50'] == 2.0
+    assert np.isnan(result.loc['b', 'x_p50']) and np.isnan(result.loc['b', 'x_max'])
+    assert result.loc['b', 'x_count'] == 0
+
+
+def test_rows_without_key_are_left_out():
+    df = pd.DataFrame({'g': ['a', None, 'a'], 'x': [1.0, 100.0, 2.0]})
+    result = grouped_quantiles(df, 'g', 'x', (0.9,))
+    assert list(result.index) == ['a']
+    assert result.loc['a', 'x_max'] == 2.0
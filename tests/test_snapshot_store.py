@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from capiv.pipeline import PRODUCTION_COLUMNS
+from capiv.snapshot_store import SnapshotStore
+
+
+TEXT_COLUMNS = ['empresa', 'areayacimiento', 'formprod', 'sub_tipo_recurso', 'tipopozo']
+
+
+# Production rows (sigla, anio, mes, prod_pet) with the other columns constant
+def production(rows):
+    df = pd.DataFrame(rows, columns=['sigla', 'anio', 'mes', 'prod_pet'])
+    for column in PRODUCTION_COLUMNS:
+        if column not in df:
+            df[column] = 'x' if column in TEXT_COLUMNS else 1.0
+    return df[PRODUCTION_COLUMNS]
+
+
+V1 = production([
+    ('A', 2024, 1, 10.0), ('A', 2024, 2, 11.0),
+    ('B', 2024, 1, 20.0), ('B', 2024, 2, 21.0),
+])
+# B 2024-02 revised, A 2024-03 added, B 2024-01 removed
+V2 = production([
+    ('A', 2024, 1, 10.0), ('A', 2024, 2, 11.0), ('A', 2024, 3, 12.0),
+    ('B', 2024, 2, 25.0),
+])
+
+
+def assert_same_rows(stored, expected):
+    expected = expected.sort_values(['sigla', 'anio', 'mes']).reset_index(drop=True)
+    assert stored[['sigla', 'anio', 'mes', 'prod_pet']].values.tolist() == \
+        expected[['sigla', 'anio', 'mes', 'prod_pet']].values.tolist()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'produccion'))
+    store.add(V1, fetched_at=pd.Timestamp('2024-03-01', tz='UTC'))
+    store.add(V2, fetched_at=pd.Timestamp('2024-04-01', tz='UTC'))
+    return store
+
+
+def test_round_trip(store):
+    first, second = store.snapshots()['id']
+    assert_same_rows(store.load(first), V1)
+    assert_same_rows(store.load(second), V2)
+    assert store.snapshots()[['upserts', 'deletes']].values.tolist() == [[4, 0], [2, 1]]
+
+
+def test_same_data_is_not_stored_again(store):
+    assert store.add(V2) == store.latest()
+    assert len(store) == 2
+
+
+def test_query_reads_only_the_requested_months(store):
+    assert_same_rows(store.query(start='2024-02', end='2024-02'), V2[V2['mes'] == 2])
+
+
+def test_as_of(store):
+    assert_same_rows(store.as_of('2024-03-15'), V1)
+    assert_same_rows(store.as_of('2024-04-15'), V2)
+    with pytest.raises(KeyError):
+        store.as_of('2024-01-01')
+
+
+def test_diff(store):
+    diff = store.diff()
+    changes = {(r.sigla, r.mes): r.cambio for r in diff.rows.itertuples()}
+    assert changes == {('A', 3): 'agregado', ('B', 1): 'eliminado', ('B', 2): 'revisado'}
+    assert diff.months.set_index('mes')['cambio'].to_dict() == {1: 'revisado', 2: 'revisado', 3: 'agregado'}
+
+
+def test_writers_with_a_stale_manifest_do_not_overwrite_each_other(tmp_path):
+    root = str(tmp_path / 'produccion')
+    SnapshotStore(root).add(V1)
+    first, second = SnapshotStore(root), SnapshotStore(root)
+    first.add(V2)
+    v3 = production([('C', 2024, 1, 30.0)])
+    second.add(v3)
+
+    store = SnapshotStore(root)
+    assert len(store) == 3
+    assert_same_rows(store.load(store.snapshots()['id'][1]), V2)
+    assert_same_rows(store.load(), v3)
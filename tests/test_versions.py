@@ -0,0 +1,76 @@
+import gc
+import weakref
+
+import pandas as pd
+
+from capiv.versions import PIN_KEY, SnapshotVersions, pin_session, repin_session
+
+
+def frame(value):
+    return pd.DataFrame({'prod_pet': [value]})
+
+
+def new_versions():
+    released = []
+    return SnapshotVersions(on_release=released.append), released
+
+
+def test_old_version_released_after_last_unpin():
+    versions, released = new_versions()
+    versions.publish('v1', frame(1))
+    first, second = versions.pin(), versions.pin()
+    versions.publish('v2', frame(2))
+    assert released == []
+
+    first.release()
+    assert released == []
+    second.release()
+    assert released == ['v1']
+    assert [s['version'] for s in versions.stats()] == ['v2']
+
+
+def test_unpinned_version_released_on_publish():
+    versions, released = new_versions()
+    versions.publish('v1', frame(1))
+    versions.publish('v2', frame(2))
+    assert released == ['v1']
+
+
+def test_current_version_is_kept_without_readers():
+    versions, released = new_versions()
+    versions.publish('v1', frame(1))
+    versions.pin().release()
+    assert released == []
+    assert versions.pin().df['prod_pet'].tolist() == [1]
+
+
+def test_collected_session_state_releases_its_pin():
+    versions, released = new_versions()
+    versions.publish('v1', frame(1))
+    state = {}
+    state['self'] = state  # session states are freed through cycles
+    pin_session(state, versions, load=None)
+    versions.publish('v2', frame(2))
+    frame_ref = weakref.ref(state['df'])
+
+    del state
+    # The finalizer may run while the lock is held: it must not take it
+    with versions._lock:
+        gc.collect()
+    versions.collect()
+    assert released == ['v1']
+    assert frame_ref() is None
+
+
+def test_pin_session_keeps_its_version_until_repinned():
+    versions, _ = new_versions()
+    state = {}
+    pin_session(state, versions, load=lambda: ('v1', frame(1)))
+    versions.publish('v2', frame(2))
+    assert pin_session(state, versions, load=None).version == 'v1'
+    assert state['snapshot_id'] == 'v1'
+
+    repin_session(state, versions)
+    assert PIN_KEY not in state
+    pin_session(state, versions, load=None)
+    assert state['snapshot_id'] == 'v2'